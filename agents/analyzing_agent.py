@@ -1,14 +1,18 @@
 import os
 from pathlib import Path
-import pymupdf  # PyMuPDF
-from core.analyzer import analyze_text
-
-DOWNLOAD_DIR = Path("downloads")
+from core.analyzer import analyze_pages, analyze_stream, merge_results
+from core.cache import analysis_cache
+from core.config import DOWNLOAD_DIR, INCREMENTAL_ANALYSIS
+from core.downloads import download_manifest
+from core.file_utils import iter_pdf_pages, sha256_file
+from core.incremental import analyze_incremental, stream_incremental
+from core.metrics import instrument
 
 class AnalyzingAgent:
     def __init__(self):
         self.download_dir = DOWNLOAD_DIR
 
+    @instrument("file_discovery")
     def get_latest_pdf(self):
         pdf_files = list(self.download_dir.glob("*.pdf"))
         if not pdf_files:
@@ -17,19 +21,70 @@ class AnalyzingAgent:
         latest_file = max(pdf_files, key=lambda x: x.stat().st_mtime)
         return latest_file
 
+    def _source_url(self, digest):
+        provenance = download_manifest.by_hash(digest) if digest else None
+        return provenance["url"] if provenance else None
+
+    def _analyze_file(self, pdf_path, digest=None):
+        if INCREMENTAL_ANALYSIS:
+            # New versions of a known document only re-analyze changed blocks
+            return analyze_incremental(iter_pdf_pages(pdf_path), pdf_path.name, digest, self._source_url(digest))
+        # Pages are streamed into the analyzer rather than concatenated first
+        return analyze_pages(iter_pdf_pages(pdf_path))
+
+    def _stream_file(self, pdf_path, digest):
+        if INCREMENTAL_ANALYSIS:
+            yield from stream_incremental(iter_pdf_pages(pdf_path), pdf_path.name, digest, self._source_url(digest))
+            return
+        results = []
+        for page, result in analyze_stream(iter_pdf_pages(pdf_path)):
+            results.append(result)
+            yield "chunk", page, result
+        yield "result", merge_results(results)
+
+    def _annotate(self, analysis: dict, pdf_path, digest: str) -> dict:
+        analysis["filename"] = pdf_path.name
+        analysis["source_sha256"] = digest
+
+        # Where the monitoring agent got this document from, if it downloaded it
+        provenance = download_manifest.by_hash(digest)
+        if provenance:
+            analysis["provenance"] = {k: provenance[k] for k in ["url", "source", "title", "downloaded_at"]}
+        return analysis
+
     def analyze_latest(self):
         latest_pdf = self.get_latest_pdf()
         if not latest_pdf:
             return {"error": "No PDF found in downloads folder."}
 
         try:
-            text = ""
-            with pymupdf.open(latest_pdf) as doc:
-                for page in doc:
-                    text += page.get_text()
-            # Analyze the extracted text
-            analysis = analyze_text(text)
-            analysis["filename"] = latest_pdf.name
-            return analysis
+            # Same PDF bytes as an earlier run -> reuse that analysis
+            digest = sha256_file(latest_pdf)
+            analysis = analysis_cache.get_or_compute(digest, lambda: self._analyze_file(latest_pdf, digest))
+            return self._annotate(analysis, latest_pdf, digest)
         except Exception as e:
             return {"error": str(e)}
+
+    def analyze_latest_stream(self):
+        """
+        Streaming form of analyze_latest(): yields ("chunk", page, result) as
+        each chunk is analyzed, then ("result", analysis). A cached analysis
+        comes back as a single chunk. Raises FileNotFoundError when there is
+        no PDF to analyze.
+        """
+        latest_pdf = self.get_latest_pdf()
+        if not latest_pdf:
+            raise FileNotFoundError("No PDF found in downloads folder.")
+
+        digest = sha256_file(latest_pdf)
+        analysis = analysis_cache.get(digest)
+        if analysis is not None:
+            yield "chunk", None, analysis
+        else:
+            for event in self._stream_file(latest_pdf, digest):
+                if event[0] == "result":
+                    analysis = event[1]
+                    analysis_cache.put(digest, analysis)
+                else:
+                    yield event
+        yield "result", self._annotate(analysis, latest_pdf, digest)
@@ -1,40 +1,62 @@
 from agents.extraction_agent import ExtractionAgent
-from core.file_utils import save_json_audit
+from core.audit_index import INTERNAL
+from core.audit_store import write_audit
+from core.config import INTERNAL_POLICY_DIR
 from pathlib import Path
 from fastapi import UploadFile
-import os
 
-INTERNAL_POLICY_DIR = Path("audit_logs/internal")
 INTERNAL_POLICY_DIR.mkdir(parents=True, exist_ok=True)
 
 class CompanyPolicyAgent:
     """
     Wrapper agent for extracting and saving internal company compliance policy data.
+
+    Each distinct document gets its own audit file, named after the upload
+    and its content hash: two different policies uploaded under the same
+    filename are both kept, and re-uploading the same policy overwrites
+    its own file only.
     """
 
-    def __init__(self, file: UploadFile):
+    def __init__(self, file: UploadFile, filename: str = None):
         self.file = file
+        # Plain file objects (e.g. from the Streamlit app) pass the upload's name separately
+        self.filename = filename or file.filename
 
-    def extract_and_save(self) -> dict:
+    def extract_and_save(self, progress=None) -> dict:
         """
         Extract structured data from company policy document and save it to internal audit logs.
 
+        Args:
+            progress: Optional callback, passed on to ExtractionAgent.run().
+
         Returns:
             dict: Extracted data with metadata.
         """
         extraction_agent = ExtractionAgent(self.file)
-        result = extraction_agent.run()
+        result = extraction_agent.run(progress=progress)
+        return self._save(result, extraction_agent.digest)
+
+    def extract_and_save_stream(self):
+        """
+        Streaming form of extract_and_save(): yields ("chunk", page, result)
+        as the policy is analyzed, then ("result", saved data).
+        """
+        extraction_agent = ExtractionAgent(self.file)
+        for event in extraction_agent.run_stream():
+            if event[0] == "result":
+                yield "result", self._save(event[1], extraction_agent.digest)
+            else:
+                yield event
 
+    def _save(self, result: dict, digest: str) -> dict:
         # Tag this as internal policy data
         result["source"] = "internal_policy"
         result["compliance_type"] = "internal"
-        result["filename"] = self.file.filename
+        result["filename"] = self.filename
 
         # Save to dedicated internal directory
-        json_path = INTERNAL_POLICY_DIR / f"{self.file.filename}.json"
-        with open(json_path, "w", encoding="utf-8") as f:
-            import json
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        json_path = INTERNAL_POLICY_DIR / f"{Path(self.filename).stem}_{digest[:12]}.json"
+        write_audit(json_path, result, INTERNAL, indent=2, ensure_ascii=False, source_hash=digest)
 
         result["audit_saved_to"] = str(json_path)
         return result
@@ -0,0 +1,81 @@
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from agents.risk_flagger_agent import RiskFlaggerAgent, InternalPolicyIndex
+from core.audit_store import load_audit
+from core.config import MATRIX_WORKERS
+from core.jobs import nested_workers
+from core.metrics import metrics, reset_worker_metrics, run_drained
+
+# Per-process corpus, loaded once by the pool initializer
+_worker_corpus = []
+
+
+def _load_corpus(internal_paths: list) -> list:
+    return [InternalPolicyIndex(load_audit(p)) for p in internal_paths]
+
+
+def _init_worker(internal_paths: list):
+    global _worker_corpus
+    reset_worker_metrics()
+    _worker_corpus = _load_corpus(internal_paths)
+
+
+def _compare_with_worker_corpus(external_data: dict, internal_idx: int) -> dict:
+    return RiskFlaggerAgent.from_data(external_data, _worker_corpus[internal_idx]).compare()
+
+
+class ComplianceMatrixAgent:
+    """
+    Compares regulations against a corpus of internal policies in one pass.
+
+    Internal policies are parsed and indexed once (once per worker process
+    when running in parallel) and shared by every comparison, instead of
+    being reloaded for each regulation/policy pair. Inside a job worker the
+    pool is capped to that worker's share of the CPUs, as for parallel PDF
+    extraction.
+    """
+
+    def __init__(self, external_paths: list, internal_paths: list):
+        self.external_paths = [Path(p) for p in external_paths]
+        self.internal_paths = [Path(p) for p in internal_paths]
+
+    def _pairs(self, externals: list):
+        for e, data in enumerate(externals):
+            for i in range(len(self.internal_paths)):
+                yield e, i, data
+
+    def run(self, workers: int = MATRIX_WORKERS) -> dict:
+        externals = [load_audit(p) for p in self.external_paths]
+        pairs = list(self._pairs(externals))
+        workers = nested_workers(max(1, min(workers, len(pairs))))
+
+        if workers == 1:
+            corpus = _load_corpus(self.internal_paths)
+            results = [RiskFlaggerAgent.from_data(data, corpus[i]).compare() for _, i, data in pairs]
+        else:
+            initargs = ([str(p) for p in self.internal_paths],)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+                results = []
+                for result, snap in executor.map(functools.partial(run_drained, _compare_with_worker_corpus),
+                                                 [data for _, _, data in pairs], [i for _, i, _ in pairs]):
+                    metrics.merge(snap)
+                    results.append(result)
+
+        scores = [[None] * len(self.internal_paths) for _ in self.external_paths]
+        comparisons = []
+        for (e, i, _), result in zip(pairs, results):
+            scores[e][i] = result["compliance_score"]
+            comparisons.append({
+                "external": self.external_paths[e].name,
+                "internal": self.internal_paths[i].name,
+                "compliance_score": result["compliance_score"],
+                "risk_flags": result["risk_flags"]
+            })
+
+        return {
+            "externals": [p.name for p in self.external_paths],
+            "internals": [p.name for p in self.internal_paths],
+            "scores": scores,
+            "comparisons": comparisons
+        }
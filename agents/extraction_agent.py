@@ -1,10 +1,46 @@
-from core.analyzer import analyze_text
-from core.file_utils import extract_text_from_pdf
+from core.analyzer import analyze_pages, analyze_stream, merge_results
+from core.cache import analysis_cache
+from core.file_utils import iter_pdf_pages, open_pdf, sha256_stream
 
 class ExtractionAgent:
     def __init__(self, pdf_file):
         self.pdf_file = pdf_file
+        # SHA-256 of the document, set once run() or run_stream() has read it
+        self.digest = None
 
-    def run(self):
-        text = extract_text_from_pdf(self.pdf_file)
-        return analyze_text(text)
\ No newline at end of file
+    def run(self, progress=None):
+        # progress, if given, is called with (pages extracted, total pages) as the document is read
+        digest = self.digest = sha256_stream(self.pdf_file)
+        return analysis_cache.get_or_compute(digest, lambda: analyze_pages(self._pages(progress)))
+
+    def run_stream(self):
+        """
+        Yields ("chunk", page, result) as each chunk is analyzed, then
+        ("result", analysis) with what run() returns. A cached analysis
+        comes back as a single chunk.
+        """
+        digest = self.digest = sha256_stream(self.pdf_file)
+        analysis = analysis_cache.get(digest)
+        if analysis is not None:
+            yield "chunk", None, analysis
+        else:
+            results = []
+            for page, result in analyze_stream(iter_pdf_pages(self.pdf_file)):
+                results.append(result)
+                yield "chunk", page, result
+            analysis = merge_results(results)
+            analysis_cache.put(digest, analysis)
+        yield "result", analysis
+
+    def _pages(self, progress):
+        if progress is None:
+            return iter_pdf_pages(self.pdf_file)
+        return self._tracked_pages(progress)
+
+    def _tracked_pages(self, progress):
+        with open_pdf(self.pdf_file) as doc:
+            total = doc.page_count
+        progress(0, total)
+        for done, text in enumerate(iter_pdf_pages(self.pdf_file), start=1):
+            progress(done, total)
+            yield text
@@ -1,49 +1,65 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-from pathlib import Path
-import os
+import asyncio
+from core.config import DOWNLOAD_DIR
+from core.crawler import RegulatoryCrawler, load_sources
+from core.downloads import DownloadManager
 
-DOWNLOAD_DIR = Path("downloads")
 DOWNLOAD_DIR.mkdir(exist_ok=True)
 
+
+def _run_or_schedule(coro):
+    """
+    Runs coro to completion for synchronous callers. Called from inside a
+    running event loop, it returns a task on that loop to await instead,
+    since waiting for the result there would block the loop thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    return asyncio.ensure_future(coro)
+
 class MonitoringAgent:
-    def __init__(self, urls):
-        self.urls = urls
+    def __init__(self, urls=None, transport=None):
+        # Bare URLs or source configs; defaults to the configured regulator sources
+        self.urls = urls if urls is not None else load_sources()
+        self.crawler = RegulatoryCrawler(self.urls, transport=transport)
+        self.source_status = {}
 
-    def fetch_and_extract(self):
-        updates = []
-        for url in self.urls:
-            try:
-                res = requests.get(url, timeout=10)
-                soup = BeautifulSoup(res.text, "html.parser")
-                for link in soup.find_all("a"):
-                    text = link.get_text(strip=True)
-                    href = link.get("href")
-                    if href and ".pdf" in href.lower() and any(k in text.lower() for k in ["update", "policy", "regulatory"]):
-                        full_url = urljoin(url, href)
-                        updates.append({"title": text, "url": full_url})
-            except Exception as e:
-                updates.append({"error": f"Failed to fetch from {url}: {e}"})
+    async def fetch_and_extract_async(self, client=None):
+        updates, self.source_status = await self.crawler.crawl(client)
         return updates
 
-def monitor_and_download_top_pdf(urls):
-    agent = MonitoringAgent(urls)
-    updates = agent.fetch_and_extract()
-
-    if updates and "url" in updates[0]:
-        pdf_url = updates[0]["url"]
-        try:
-            response = requests.get(pdf_url)
-            filename = os.path.basename(urlparse(pdf_url).path)
-            save_path = DOWNLOAD_DIR / filename
-            if response.status_code == 200:
-                with open(save_path, "wb") as f:
-                    f.write(response.content)
-                updates[0]["downloaded_to"] = str(save_path)
-            else:
-                updates[0]["download_error"] = f"Download failed: {response.status_code}"
-        except Exception as e:
-            updates[0]["download_error"] = str(e)
-
-    return {"regulatory_updates": updates}
+    def fetch_and_extract(self):
+        # The updates list, or a task resolving to it inside a running loop
+        return _run_or_schedule(self.fetch_and_extract_async())
+
+async def monitor_and_download_pdfs(urls=None, transport=None):
+    """
+    Crawls the sources and downloads every PDF found, skipping documents
+    whose content was already downloaded.
+    """
+    agent = MonitoringAgent(urls, transport=transport)
+    manager = DownloadManager(agent.crawler)
+
+    async with agent.crawler.client() as client:
+        updates = await agent.fetch_and_extract_async(client)
+        downloads = await manager.download_all(client, updates)
+
+    for update, record in zip(updates, downloads):
+        if record is None:
+            continue
+        if "error" in record:
+            update["download_error"] = record["error"]
+        else:
+            update["download_status"] = record["status"]
+            update["downloaded_to"] = record["path"]
+            update["sha256"] = record["sha256"]
+
+    return {"regulatory_updates": updates, "sources": agent.source_status}
+
+def monitor_and_download_top_pdf(urls=None, transport=None):
+    """
+    Synchronous form kept for existing callers; every new PDF is downloaded
+    now, not just the first. Inside a running loop it returns a task.
+    """
+    return _run_or_schedule(monitor_and_download_pdfs(urls, transport))
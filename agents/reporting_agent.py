@@ -1,76 +1,214 @@
 from openpyxl import Workbook
 from fpdf import FPDF
 from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import hashlib
+import json
+import os
+import shutil
+from core.config import PORTFOLIO_PDF_MAX_ROWS
+from core.metrics import count, instrument
 
 # Directories for reports
 REPORT_DIR = Path("reports")
 EXCEL_DIR = REPORT_DIR / "excel"
 PDF_DIR = REPORT_DIR / "pdf"
+PORTFOLIO_DIR = REPORT_DIR / "portfolio"
+REPORT_CACHE_DIR = REPORT_DIR / "cache"
 FONT_DIR = Path("assets/fonts")
 FONT_FILE = FONT_DIR / "DejaVuSans.ttf"
 
 # Ensure folders exist
 EXCEL_DIR.mkdir(parents=True, exist_ok=True)
 PDF_DIR.mkdir(parents=True, exist_ok=True)
+REPORT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+PORTFOLIO_DIR.mkdir(parents=True, exist_ok=True)
+
+# Keys that end up in a report; anything else in the input doesn't affect the output
+REPORTED_KEYS = ["obligations", "penalties", "entities", "dates", "compliance_score", "risk_flags"]
+# Bump when the report layout changes so cached reports are regenerated
+REPORT_VERSION = "1"
+
+
+class CompliancePDF(FPDF):
+    def header(self):
+        self.set_font("DejaVu", "", 14)
+        self.cell(0, 10, "Compliance Summary Report", ln=True, align="C")
+
+    def add_section(self, title, items):
+        self.set_font("DejaVu", "B", 12)
+        self.cell(0, 10, title, ln=True)
+        self.set_font("DejaVu", "", 11)
+        for item in items:
+            self.multi_cell(0, 8, f"- {item}")
+        self.ln(4)
+
+
+@lru_cache(maxsize=1)
+def _pdf_template() -> CompliancePDF:
+    # Parsing the TTF is the slow part of a small report, so do it once per
+    # process and copy this blank document for every report
+    if not FONT_FILE.exists():
+        raise RuntimeError(f"Font file not found: {FONT_FILE}")
+    pdf = CompliancePDF()
+    pdf.add_font("DejaVu", "", str(FONT_FILE), uni=True)
+    pdf.add_font("DejaVu", "B", str(FONT_FILE), uni=True)
+    return pdf
+
+
+def report_digest(data: dict) -> str:
+    reported = {key: data.get(key) for key in REPORTED_KEYS}
+    payload = json.dumps(reported, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{REPORT_VERSION}\n{payload}".encode("utf-8")).hexdigest()
+
+
+def _render_excel(data: dict, out_path: str):
+    # Write-only mode streams rows to disk instead of building every cell in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Compliance Report")
+    ws.append(["Category", "Value"])
+
+    # Compliance data sections
+    for key in ["obligations", "penalties", "entities", "dates"]:
+        for item in data.get(key, []):
+            ws.append([key.title(), item])
+
+    # Compliance score
+    ws.append(["Compliance Score", data.get("compliance_score", "N/A")])
+
+    # Risk flags
+    ws.append(["Risk Flags", ""])
+    for flag in data.get("risk_flags", []):
+        ws.append(["⚠️", flag])
+
+    wb.save(out_path)
 
-class ReportingAgent:
-    def generate_excel(self, data: dict, filename: str) -> str:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Compliance Report"
-        ws.append(["Category", "Value"])
 
-        # Compliance data sections
-        for key in ["obligations", "penalties", "entities", "dates"]:
-            for item in data.get(key, []):
-                ws.append([key.title(), item])
+def _render_pdf(data: dict, out_path: str):
+    pdf = copy.deepcopy(_pdf_template())
+    pdf.add_page()
 
-        # Compliance score
-        ws.append(["Compliance Score", data.get("compliance_score", "N/A")])
+    # Standard sections
+    for key in ["obligations", "penalties", "entities", "dates"]:
+        values = data.get(key, [])
+        pdf.add_section(key.title(), values)
 
-        # Risk flags
-        ws.append(["Risk Flags", ""])
-        for flag in data.get("risk_flags", []):
-            ws.append(["⚠️", flag])
+    # Compliance score
+    pdf.add_section("Compliance Score", [str(data.get("compliance_score", "N/A"))])
 
+    # Risk flags
+    pdf.add_section("Risk Flags", data.get("risk_flags", []))
+
+    pdf.output(out_path)
+
+
+def _render_cached(render, data: dict, digest: str, ext: str, out_path: Path) -> str:
+    """
+    Renders into the content-addressed cache (unless already there) and
+    links the cached file to out_path.
+    """
+    cached = REPORT_CACHE_DIR / f"{digest}.{ext}"
+    count("cache_hits" if cached.exists() else "cache_misses", cache="reports")
+    if not cached.exists():
+        tmp = REPORT_CACHE_DIR / f"{digest}.{os.getpid()}.tmp.{ext}"
+        render(data, str(tmp))
+        os.replace(tmp, cached)
+
+    if out_path.exists() and os.path.samefile(cached, out_path):
+        return str(out_path)
+    tmp_out = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+    try:
+        os.link(cached, tmp_out)
+    except OSError:
+        shutil.copyfile(cached, tmp_out)
+    os.replace(tmp_out, out_path)
+    return str(out_path)
+
+
+class ReportingAgent:
+    @instrument("report_excel")
+    def generate_excel(self, data: dict, filename: str) -> str:
         path = EXCEL_DIR / f"{filename}.xlsx"
-        wb.save(path)
-        return str(path)
+        return _render_cached(_render_excel, data, report_digest(data), "xlsx", path)
 
+    @instrument("report_pdf")
     def generate_pdf(self, data: dict, filename: str) -> str:
-        class CompliancePDF(FPDF):
-            def header(self):
-                self.set_font("DejaVu", "", 14)
-                self.cell(0, 10, "Compliance Summary Report", ln=True, align="C")
-
-            def add_section(self, title, items):
-                self.set_font("DejaVu", "B", 12)
-                self.cell(0, 10, title, ln=True)
-                self.set_font("DejaVu", "", 11)
-                for item in items:
-                    self.multi_cell(0, 8, f"- {item}")
-                self.ln(4)
-
-        # Check font file
-        if not FONT_FILE.exists():
-            raise RuntimeError(f"Font file not found: {FONT_FILE}")
-
-        pdf = CompliancePDF()
-        pdf.add_font("DejaVu", "", str(FONT_FILE), uni=True)
-        pdf.add_font("DejaVu", "B", str(FONT_FILE), uni=True)
+        path = PDF_DIR / f"{filename}.pdf"
+        return _render_cached(_render_pdf, data, report_digest(data), "pdf", path)
+
+    @instrument("report_generation")
+    def generate_reports(self, data: dict, filename: str):
+        """
+        Renders the Excel and PDF reports at the same time; returns
+        (excel_path, pdf_path). Unchanged input is served from the report
+        cache without rendering. The PDF renders on a thread: zlib, file
+        writes and openpyxl's XML serialization release the GIL, so the two
+        overlap without the cost of spawning a process per report.
+        """
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pdf_path = pool.submit(self.generate_pdf, data, filename)
+            excel_path = self.generate_excel(data, filename)
+            return excel_path, pdf_path.result()
+
+    def generate_portfolio(self, comparisons, name: str) -> dict:
+        """
+        Renders many comparisons into one workbook (a Summary sheet with one
+        row per regulation/policy pair, and a Details sheet with one row per
+        risk flag, keyed by the pair's #) and a summary PDF. Each write-only
+        sheet holds a temp file open until save, so the sheet count stays
+        fixed however many pairs there are.
+
+        `comparisons` is consumed as an iterator and every row is written
+        straight to the write-only workbook, so memory stays flat however
+        many comparisons the portfolio has. FPDF keeps its pages in memory,
+        so the PDF lists only the first PORTFOLIO_PDF_MAX_ROWS pairs; its
+        totals still cover all of them.
+        """
+        wb = Workbook(write_only=True)
+        summary = wb.create_sheet("Summary")
+        summary.append(["#", "External Regulation", "Internal Policy", "Compliance Score", "Risk Flags"])
+        details = wb.create_sheet("Details")
+        details.append(["#", "External Regulation", "Internal Policy", "Risk Flag"])
+
+        pdf = copy.deepcopy(_pdf_template())
         pdf.add_page()
+        pdf.set_font("DejaVu", "B", 12)
+        pdf.cell(0, 10, "Portfolio Compliance Summary", ln=True)
+        pdf.set_font("DejaVu", "", 10)
 
-        # Standard sections
-        for key in ["obligations", "penalties", "entities", "dates"]:
-            values = data.get(key, [])
-            pdf.add_section(key.title(), values)
+        count = 0
+        total_score = 0
+        total_flags = 0
+        for count, item in enumerate(comparisons, start=1):
+            for flag in item.get("risk_flags", []):
+                details.append([count, item["external"], item["internal"], flag])
 
-        # Compliance score
-        pdf.add_section("Compliance Score", [str(data.get("compliance_score", "N/A"))])
+            flags = len(item.get("risk_flags", []))
+            score = item.get("compliance_score") or 0
+            summary.append([count, item["external"], item["internal"], item.get("compliance_score"), flags])
+            if count <= PORTFOLIO_PDF_MAX_ROWS:
+                pdf.multi_cell(0, 6, f"{count}. {item['external']} vs {item['internal']}: score {score}, {flags} risk flags")
+            total_score += score
+            total_flags += flags
 
-        # Risk flags
-        pdf.add_section("Risk Flags", data.get("risk_flags", []))
+        average = round(total_score / count, 1) if count else None
+        summary.append([])
+        summary.append(["Comparisons", count])
+        summary.append(["Average Compliance Score", average])
+        summary.append(["Total Risk Flags", total_flags])
 
-        out_path = PDF_DIR / f"{filename}.pdf"
-        pdf.output(str(out_path))
-        return str(out_path)
+        if count > PORTFOLIO_PDF_MAX_ROWS:
+            pdf.multi_cell(0, 6, f"... and {count - PORTFOLIO_PDF_MAX_ROWS} more pairs, listed in the workbook.")
+        pdf.ln(4)
+        pdf.set_font("DejaVu", "B", 12)
+        pdf.add_section("Totals", [f"Comparisons: {count}", f"Average compliance score: {average}",
+                                   f"Total risk flags: {total_flags}"])
+
+        excel_path = PORTFOLIO_DIR / f"{name}.xlsx"
+        pdf_path = PORTFOLIO_DIR / f"{name}.pdf"
+        wb.save(str(excel_path))
+        pdf.output(str(pdf_path))
+        return {"excel": str(excel_path), "pdf": str(pdf_path), "comparisons": count,
+                "average_compliance_score": average, "total_risk_flags": total_flags}
@@ -1,52 +1,158 @@
-from difflib import SequenceMatcher
-from datetime import datetime
+from bisect import bisect_left
+from datetime import date
+from contextlib import nullcontext
 from pathlib import Path
 import json
+from core.audit_store import load_audit
+from core.config import INCREMENTAL_COMPARE
+from core.dates import normalize_date
+from core.flagger_state import flagger_state, fingerprint
+from core.metrics import count, instrument
+from core.similarity import SimilarityIndex, similarity_ratio, item_hash
+
+COMPARED_KEYS = ["obligations", "penalties", "entities"]
+
+
+def normalized_dates(data: dict) -> list:
+    # Older audit files only carry raw DATE strings
+    if "normalized_dates" in data:
+        return data["normalized_dates"]
+    return [normalize_date(d) for d in data.get("dates", [])]
+
+
+def policy_hashes(data: dict) -> dict:
+    return {key: [item_hash(i) for i in data.get(key, [])] for key in COMPARED_KEYS}
+
+
+class InternalPolicyIndex:
+    """
+    Parsed internal policy with its similarity indexes and sorted date
+    arrays built once, so it can be compared against many regulations.
+    """
+
+    def __init__(self, data: dict):
+        self.data = data
+        self.indexes = {key: SimilarityIndex(data.get(key, [])) for key in COMPARED_KEYS}
+        self.hashes = policy_hashes(data)
+        # Identifies this exact set of internal items in the persisted match state
+        self.fingerprints = {key: fingerprint(h) for key, h in self.hashes.items()}
+        dates = normalized_dates(data)
+        self.days = sorted(date.fromisoformat(d["iso"]).toordinal() for d in dates if d["iso"])
+        self.durations = sorted(d["relative_days"] for d in dates if d["relative_days"] is not None)
+
 
 class RiskFlaggerAgent:
     def __init__(self, external_json_path: str, internal_json_path: str):
         self.external_data = self._load_json(external_json_path)
-        self.internal_data = self._load_json(internal_json_path)
+        self.internal = InternalPolicyIndex(self._load_json(internal_json_path))
+        self.internal_data = self.internal.data
         self.flags = []
+        self.session = None
+
+    @classmethod
+    def from_data(cls, external_data: dict, internal) -> "RiskFlaggerAgent":
+        """
+        Builds an agent from already loaded data; `internal` may be a dict or
+        a prebuilt InternalPolicyIndex shared between comparisons.
+        """
+        agent = cls.__new__(cls)
+        agent.external_data = external_data
+        agent.internal = internal if isinstance(internal, InternalPolicyIndex) else InternalPolicyIndex(internal)
+        agent.internal_data = agent.internal.data
+        agent.flags = []
+        agent.session = None
+        return agent
 
+    @instrument("audit_load")
     def _load_json(self, path: str) -> dict:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        # Plain JSON file or a record in a segment file, depending on the storage backend
+        return load_audit(path)
 
     def _similar(self, a, b):
-        return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+        return similarity_ratio(a, b)
 
     def _check_mismatches(self, key: str, threshold=0.75):
         external_items = self.external_data.get(key, [])
-        internal_items = self.internal_data.get(key, [])
+        # The internal side is indexed once; each external item is then
+        # scored exactly against its closest candidates only
+        index = self.internal.indexes.get(key) or SimilarityIndex(self.internal_data.get(key, []))
+        if self.session is None:
+            for ext in external_items:
+                if not index.has_match(ext, threshold):
+                    self.flags.append(f"{key.title()} mismatch or missing: '{ext}' not found in internal policy.")
+            return
+
+        # Reuse decisions made against this same set of internal items, and
+        # pair scores computed in earlier runs; only unseen pairs are scored
+        internal_hashes = self.internal.hashes[key]
+        fingerprint = self.internal.fingerprints[key]
+        decisions = self.session.decisions(key, threshold, fingerprint)
         for ext in external_items:
-            if not any(self._similar(ext, int_item) > threshold for int_item in internal_items):
+            ext_hash = item_hash(ext)
+            decision = decisions.get(ext_hash)
+            if decision is not None:
+                self.session.stats["items_reused"] += 1
+                matched = decision[0]
+            else:
+                self.session.stats["items_recomputed"] += 1
+                known = self.session.known_scores(ext_hash)
+
+                def scorer(idx):
+                    int_hash = internal_hashes[idx]
+                    if int_hash in known:
+                        self.session.stats["pairs_reused"] += 1
+                        return known[int_hash]
+                    ratio = similarity_ratio(ext, index.items[idx])
+                    known[int_hash] = ratio
+                    self.session.add_pair(ext_hash, int_hash, ratio)
+                    return ratio
+
+                # The persisted partner is the best match, not merely the first above threshold
+                idx, score = index.best_above(ext, threshold, scorer)
+                matched = idx is not None
+                partner = internal_hashes[idx] if matched else None
+                self.session.add_decision(key, ext_hash, threshold, fingerprint, matched, partner, score)
+                decisions[ext_hash] = (matched, partner, score)
+            if not matched:
                 self.flags.append(f"{key.title()} mismatch or missing: '{ext}' not found in internal policy.")
 
-    def _check_date_mismatches(self):
-        external_dates = self.external_data.get("dates", [])
-        internal_dates = self.internal_data.get("dates", [])
+    @staticmethod
+    def _has_within(sorted_values: list, value: int, tolerance: int) -> bool:
+        i = bisect_left(sorted_values, value - tolerance)
+        return i < len(sorted_values) and sorted_values[i] <= value + tolerance
 
-        try:
-            ext_parsed = [datetime.strptime(d, "%Y-%m-%d") for d in external_dates]
-            int_parsed = [datetime.strptime(d, "%Y-%m-%d") for d in internal_dates]
+    def _check_date_mismatches(self, tolerance_days: int = 2):
+        # Internal day ordinals / durations are kept sorted so each lookup is a bisect
+        int_days = self.internal.days
+        int_durations = self.internal.durations
 
-            for ed in ext_parsed:
-                if not any(abs((ed - id).days) <= 2 for id in int_parsed):  # ±2 days tolerance
-                    self.flags.append(f"Date mismatch risk: External deadline {ed.date()} not matched internally.")
-        except Exception as e:
-            self.flags.append(f"Date parsing issue: {e}")
+        for d in normalized_dates(self.external_data):
+            if d["iso"]:
+                ed = date.fromisoformat(d["iso"])
+                if not self._has_within(int_days, ed.toordinal(), tolerance_days):  # ±2 days tolerance
+                    self.flags.append(f"Date mismatch risk: External deadline {ed} not matched internally.")
+            elif d["relative_days"] is not None:
+                if not self._has_within(int_durations, d["relative_days"], tolerance_days):
+                    self.flags.append(f"Date mismatch risk: External deadline '{d['text']}' ({d['relative_days']} days) not matched internally.")
 
-    def compare(self) -> dict:
-        self._check_mismatches("obligations")
-        self._check_mismatches("penalties")
-        self._check_mismatches("entities")
-        self._check_date_mismatches()
+    @instrument("risk_compare")
+    def compare(self, incremental: bool = INCREMENTAL_COMPARE) -> dict:
+        count("comparisons")
+        with (flagger_state.session() if incremental else nullcontext()) as session:
+            self.session = session
+            self._check_mismatches("obligations")
+            self._check_mismatches("penalties")
+            self._check_mismatches("entities")
+            self._check_date_mismatches()
+            self.session = None
 
         score = max(0, 100 - len(self.flags) * 10)
-        return {
+        result = {
             "compliance_score": score,
             "risk_flags": self.flags,
             "external_source": self.external_data.get("filename", "external_unknown"),
             "internal_source": self.internal_data.get("filename", "internal_unknown")
         }
+        if session is not None:
+            result["recompute_stats"] = session.stats
+        return result
@@ -1,32 +1,113 @@
 import streamlit as st
+from agents.company_policy_agent import CompanyPolicyAgent
 from agents.extraction_agent import ExtractionAgent
 from agents.risk_flagger_agent import RiskFlaggerAgent
 from agents.reporting_agent import ReportingAgent
+from core.audit_index import audit_index, EXTERNAL, INTERNAL
 from core.file_utils import save_json_audit
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import json
+import hashlib
+import os
+import tempfile
+import time
 
 st.set_page_config(page_title="Compliance Risk Dashboard", layout="wide")
 st.title("🛡 Autonomous Compliance Risk Dashboard")
 
 st.markdown("Upload latest **MNRE regulation** and your **internal compliance policy** to begin risk comparison.")
 
+
+@st.cache_resource
+def extraction_executor():
+    # Shared by every session; extraction runs here so reruns never block on spaCy
+    return ThreadPoolExecutor(max_workers=2)
+
+
+def extract_and_save(data: bytes, filename: str, digest: str, source: str, progress: dict) -> dict:
+    """
+    Extracts one upload in the background and saves it to the audit logs once.
+    Results also land in the analysis cache, so re-uploads and other sessions reuse them.
+    """
+    def track(done, total):
+        progress.update(done=done, total=total)
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+        tmp.write(data)
+    try:
+        with open(tmp.name, "rb") as f:
+            if source != EXTERNAL:
+                # The policy agent tags and saves it the same way the API does
+                return CompanyPolicyAgent(f, filename=filename).extract_and_save(progress=track)
+            result = ExtractionAgent(f).run(progress=track)
+    finally:
+        os.unlink(tmp.name)
+
+    result["filename"] = filename
+    existing = audit_index.find_by_source_hash(digest, EXTERNAL)
+    if not (existing and audit_index.exists(existing)):
+        save_json_audit(result, filename, source_hash=digest)
+    return result
+
+
+def start_extraction(uploaded, source: str) -> tuple:
+    """
+    Starts (or reuses) the extraction for an upload, keyed by its source and
+    content hash: the same PDF uploaded as regulation and as policy is saved
+    to both places.
+    """
+    data = uploaded.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
+    key = (source, digest)
+    extractions = st.session_state.setdefault("extractions", {})
+    if key not in extractions:
+        progress = {"done": 0, "total": None}
+        future = extraction_executor().submit(extract_and_save, data, uploaded.name, digest, source, progress)
+        extractions[key] = {"name": uploaded.name, "future": future, "progress": progress}
+    return key
+
+
 col1, col2 = st.columns(2)
 
 uploaded_mnre = col1.file_uploader("📤 Upload MNRE Regulation PDF", type=["pdf"])
 uploaded_sop = col2.file_uploader("📤 Upload Internal Policy PDF", type=["pdf"])
 
-if uploaded_mnre and uploaded_sop:
-    st.success("✅ Files received. Extracting...")
+# Extraction starts as soon as each file arrives, not when both are present
+mnre_key = start_extraction(uploaded_mnre, EXTERNAL) if uploaded_mnre else None
+sop_key = start_extraction(uploaded_sop, INTERNAL) if uploaded_sop else None
+
+pending = []
+for column, key in [(col1, mnre_key), (col2, sop_key)]:
+    if key is None:
+        continue
+    job = st.session_state["extractions"][key]
+    if job["future"].done():
+        continue
+    pending.append(job)
+    done, total = job["progress"]["done"], job["progress"]["total"]
+    if total:
+        column.progress(min(done / total, 1.0), text=f"Extracting {job['name']}: {done}/{total} pages")
+    else:
+        column.progress(0.0, text=f"Extracting {job['name']}...")
+
+if pending:
+    # Poll until the background work finishes; each rerun is cheap since nothing is recomputed
+    time.sleep(0.5)
+    st.rerun()
 
-    # Run ExtractionAgent for both PDFs
-    mnre_agent = ExtractionAgent(uploaded_mnre)
-    mnre_data = mnre_agent.run()
-    mnre_path = save_json_audit(mnre_data, uploaded_mnre.name, folder="streamlit_app/extracted")
-
-    sop_agent = ExtractionAgent(uploaded_sop)
-    sop_data = sop_agent.run()
-    sop_path = save_json_audit(sop_data, uploaded_sop.name, folder="streamlit_app/extracted")
+if uploaded_mnre and uploaded_sop:
+    try:
+        mnre_data = st.session_state["extractions"][mnre_key]["future"].result()
+        sop_data = st.session_state["extractions"][sop_key]["future"].result()
+    except Exception as e:
+        st.error(f"Extraction failed: {e}")
+        # Let the next upload of the same file try again
+        for key in (mnre_key, sop_key):
+            if st.session_state["extractions"][key]["future"].exception() is not None:
+                del st.session_state["extractions"][key]
+        st.stop()
+
+    st.success("✅ Files extracted.")
 
     st.subheader("📄 Extracted Content")
     with st.expander("MNRE Regulation Data"):
@@ -35,67 +116,21 @@ if uploaded_mnre and uploaded_sop:
         st.json(sop_data)
 
     st.subheader("🔍 Compare for Compliance Risk")
-    if st.button("🚨 Run Risk Comparison"):
-        flagger = RiskFlaggerAgent(mnre_path, sop_path)
-        flagged = flagger.compare()
-        st.success("Comparison complete ✅")
-
-        st.metric("Compliance Score", f"{flagged.get('compliance_score', 'N/A')}%")
-        st.write("### ⚠️ Risk Flags")
-        for flag in flagged.get("risk_flags", []):
-            st.warning(flag)
-
-        # Generate reports
+    comparisons = st.session_state.setdefault("comparisons", {})
+    pair = (mnre_key, sop_key)
+    if st.button("🚨 Run Risk Comparison") and pair not in comparisons:
+        # Compared straight from the in-memory results; no JSON round trip
+        flagged = RiskFlaggerAgent.from_data(mnre_data, sop_data).compare()
         reporter = ReportingAgent()
         filename = Path(uploaded_mnre.name).stem + "__vs__" + Path(uploaded_sop.name).stem
         pdf_path = reporter.generate_pdf(flagged, filename)
         excel_path = reporter.generate_excel(flagged, filename)
+        comparisons[pair] = {"flagged": flagged, "filename": filename, "excel": excel_path, "pdf": pdf_path}
 
-        st.subheader("📥 Download Reports")
-        with open(pdf_path, "rb") as f:
-            st.download_button("Download PDF Report", f, file_name=f"{filename}.pdf", mime="application/pdf")
-        with open(excel_path, "rb") as f:
-            st.download_button("Download Excel Report", f, file_name=f"{filename}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-import streamlit as st
-from agents.extraction_agent import ExtractionAgent
-from agents.risk_flagger_agent import RiskFlaggerAgent
-from agents.reporting_agent import ReportingAgent
-from core.file_utils import save_json_audit
-from pathlib import Path
-import json
-
-st.set_page_config(page_title="Compliance Risk Dashboard", layout="wide")
-st.title("🛡 Autonomous Compliance Risk Dashboard")
-
-st.markdown("Upload latest **MNRE regulation** and your **internal compliance policy** to begin risk comparison.")
-
-col1, col2 = st.columns(2)
-
-uploaded_mnre = col1.file_uploader("📤 Upload MNRE Regulation PDF", type=["pdf"])
-uploaded_sop = col2.file_uploader("📤 Upload Internal Policy PDF", type=["pdf"])
-
-if uploaded_mnre and uploaded_sop:
-    st.success("✅ Files received. Extracting...")
-
-    # Run ExtractionAgent for both PDFs
-    mnre_agent = ExtractionAgent(uploaded_mnre)
-    mnre_data = mnre_agent.run()
-    mnre_path = save_json_audit(mnre_data, uploaded_mnre.name, folder="streamlit_app/extracted")
-
-    sop_agent = ExtractionAgent(uploaded_sop)
-    sop_data = sop_agent.run()
-    sop_path = save_json_audit(sop_data, uploaded_sop.name, folder="streamlit_app/extracted")
-
-    st.subheader("📄 Extracted Content")
-    with st.expander("MNRE Regulation Data"):
-        st.json(mnre_data)
-    with st.expander("Internal Policy Data"):
-        st.json(sop_data)
-
-    st.subheader("🔍 Compare for Compliance Risk")
-    if st.button("🚨 Run Risk Comparison"):
-        flagger = RiskFlaggerAgent(mnre_path, sop_path)
-        flagged = flagger.compare()
+    # Kept in session state so download clicks (which rerun the script) still show the results
+    comparison = comparisons.get(pair)
+    if comparison:
+        flagged, filename = comparison["flagged"], comparison["filename"]
         st.success("Comparison complete ✅")
 
         st.metric("Compliance Score", f"{flagged.get('compliance_score', 'N/A')}%")
@@ -103,14 +138,8 @@ if uploaded_mnre and uploaded_sop:
         for flag in flagged.get("risk_flags", []):
             st.warning(flag)
 
-        # Generate reports
-        reporter = ReportingAgent()
-        filename = Path(uploaded_mnre.name).stem + "__vs__" + Path(uploaded_sop.name).stem
-        pdf_path = reporter.generate_pdf(flagged, filename)
-        excel_path = reporter.generate_excel(flagged, filename)
-
         st.subheader("📥 Download Reports")
-        with open(pdf_path, "rb") as f:
+        with open(comparison["pdf"], "rb") as f:
             st.download_button("Download PDF Report", f, file_name=f"{filename}.pdf", mime="application/pdf")
-        with open(excel_path, "rb") as f:
+        with open(comparison["excel"], "rb") as f:
             st.download_button("Download Excel Report", f, file_name=f"{filename}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
@@ -0,0 +1,239 @@
+"""
+End-to-end pipeline timings on a synthetic corpus, with a regression check.
+
+Times PDF extraction, NLP analysis, risk comparison, report rendering and
+the /report-and-notify request path (analyze-latest and a policy upload
+first, so there is a fresh pair to report on), and reports the speedup of
+parallel over serial page extraction. The median of each stage is
+written to a JSON results file and compared against a stored baseline; the
+run exits non-zero when any stage is slower than the baseline by more than
+the threshold.
+
+Runs inside a scratch working directory, so audit logs, caches and reports
+never touch the real ones.
+
+Report rendering needs assets/fonts/DejaVuSans.ttf, which is not checked
+in; without it the reports and /report-and-notify stages are skipped.
+
+    python -m benchmarks.bench_pipeline --pages 20 --repeat 3
+
+No baseline is checked in: timings depend on the machine and on the spaCy
+model, so a baseline is only meaningful where it was recorded. To set up
+the regression check on the machine that will run it:
+
+  1. Install requirements.txt and the configured model (SPACY_MODEL,
+     e.g. python -m spacy download en_core_web_sm).
+  2. Put DejaVuSans.ttf in assets/fonts/ so every stage is measured.
+  3. Run with the default corpus settings and record the baseline:
+
+         python -m benchmarks.bench_pipeline --update-baseline
+
+  4. Commit benchmarks/baseline.json. Its "environment" section records
+     the Python version, platform, CPU count and model it was taken with;
+     re-record it whenever any of those change.
+
+Later runs compare against it; without one the check is skipped.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpus import generate
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "latest.json"
+REPORT_FONT = REPO_DIR / "assets" / "fonts" / "DejaVuSans.ttf"
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def _prepare_workspace() -> Path:
+    # Config paths are relative to the working directory, so switch before
+    # importing anything from core or agents
+    workspace = Path(tempfile.mkdtemp(prefix="compliance-bench-"))
+    (workspace / "assets").symlink_to(REPO_DIR / "assets", target_is_directory=True)
+    os.chdir(workspace)
+    if str(REPO_DIR) not in sys.path:
+        sys.path.insert(0, str(REPO_DIR))
+    return workspace
+
+
+def run_stages(corpus: dict, repeat: int, reports: bool = True) -> dict:
+    from core import models
+    from core.analyzer import analyze_pages
+    from core.file_utils import iter_pdf_pages, extraction_speedup
+    from agents.risk_flagger_agent import RiskFlaggerAgent
+    from agents.reporting_agent import _render_excel, _render_pdf
+
+    load_seconds, _ = _timed(models.get_nlp)
+    timings = {"extraction": [], "nlp": [], "comparison": [], "reports": []}
+    counts = {}
+
+    for _ in range(repeat):
+        seconds, pages = _timed(lambda: list(iter_pdf_pages(str(corpus["regulation"]))))
+        timings["extraction"].append(seconds)
+        policy_pages = list(iter_pdf_pages(str(corpus["policy"])))
+
+        seconds, external = _timed(analyze_pages, pages)
+        timings["nlp"].append(seconds)
+        internal = analyze_pages(policy_pages)
+
+        seconds, flagged = _timed(lambda: RiskFlaggerAgent.from_data(external, internal).compare(incremental=False))
+        timings["comparison"].append(seconds)
+
+        if reports:
+            with tempfile.TemporaryDirectory() as out:
+                start = time.perf_counter()
+                _render_excel(flagged, os.path.join(out, "report.xlsx"))
+                _render_pdf(flagged, os.path.join(out, "report.pdf"))
+                timings["reports"].append(time.perf_counter() - start)
+
+        counts = {"pages": len(pages), "policy_pages": len(policy_pages),
+                  "obligations": len(external.get("obligations", [])), "risk_flags": len(flagged.get("risk_flags", []))}
+
+    # Informational only: depends on core count more than on code changes
+    speedup = extraction_speedup(corpus["regulation"])
+    return {"model_load_seconds": load_seconds, "timings": timings, "counts": counts, "extraction_speedup": speedup}
+
+
+def run_end_to_end(args, repeat: int) -> list:
+    """
+    Drives the real app through its HTTP endpoints. Each repeat uses a
+    freshly generated pair so no analysis or report cache is reused.
+    """
+    from fastapi.testclient import TestClient
+    from core.config import DOWNLOAD_DIR
+    from main import app
+
+    timings = []
+    with TestClient(app) as client:
+        for i in range(repeat):
+            corpus = generate(Path("bench_corpus") / f"e2e_{i}", args.pages, args.policy_pages,
+                              args.density, args.coverage, args.seed + 1000 + i, name=f"e2e_{i}")
+            shutil.copy(corpus["regulation"], DOWNLOAD_DIR / corpus["regulation"].name)
+
+            start = time.perf_counter()
+            client.get("/documents/analyze-latest").raise_for_status()
+            with open(corpus["policy"], "rb") as f:
+                client.post("/upload-company-policy/",
+                            files={"file": (corpus["policy"].name, f, "application/pdf")}).raise_for_status()
+            client.post("/report-and-notify").raise_for_status()
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(timings: dict) -> dict:
+    return {stage: {"median": round(statistics.median(values), 4), "min": round(min(values), 4),
+                    "max": round(max(values), 4), "runs": len(values)}
+            for stage, values in timings.items() if values}
+
+
+def check_regressions(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Returns (stage, baseline, current, ratio) for every stage slower than
+    baseline * (1 + threshold).
+    """
+    regressions = []
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous or not previous["median"]:
+            continue
+        ratio = current["median"] / previous["median"]
+        if ratio > 1 + threshold:
+            regressions.append((stage, previous["median"], current["median"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compliance pipeline on a synthetic corpus.")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--policy-pages", type=int, default=8)
+    parser.add_argument("--density", type=float, default=0.3)
+    parser.add_argument("--coverage", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--skip-e2e", action="store_true", help="skip the /report-and-notify request path")
+    parser.add_argument("--keep-workspace", action="store_true")
+    args = parser.parse_args()
+
+    output, baseline_path = args.output.resolve(), args.baseline.resolve()
+    reports = REPORT_FONT.exists()
+    if not reports:
+        print(f"{REPORT_FONT.relative_to(REPO_DIR)} not found; skipping the reports and report_and_notify stages.")
+    workspace = _prepare_workspace()
+    try:
+        corpus = generate(Path("bench_corpus"), args.pages, args.policy_pages, args.density, args.coverage, args.seed)
+        stages = run_stages(corpus, args.repeat, reports)
+        timings = stages["timings"]
+        if reports and not args.skip_e2e:
+            timings["report_and_notify"] = run_end_to_end(args, args.repeat)
+    finally:
+        os.chdir(REPO_DIR)
+        if not args.keep_workspace:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    from core.config import SPACY_MODEL
+    results = {
+        "created_at": time.time(),
+        "corpus": {"pages": args.pages, "policy_pages": args.policy_pages, "density": args.density,
+                   "coverage": args.coverage, "seed": args.seed},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count(), "spacy_model": SPACY_MODEL},
+        "model_load_seconds": round(stages["model_load_seconds"], 4),
+        "counts": stages["counts"],
+        "extraction_speedup": stages["extraction_speedup"],
+        "stages": summarize(timings),
+    }
+    pages = stages["counts"].get("pages")
+    if pages:
+        results["pages_per_second"] = {stage: round(pages / s["median"], 2)
+                                       for stage, s in results["stages"].items() if s["median"]}
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"{'stage':>18} {'median s':>9} {'min s':>8} {'max s':>8}")
+    for stage, s in results["stages"].items():
+        print(f"{stage:>18} {s['median']:>9.3f} {s['min']:>8.3f} {s['max']:>8.3f}")
+    speedup = results["extraction_speedup"]
+    print(f"Parallel extraction: {speedup['speedup']}x over serial with {speedup['workers']} workers "
+          f"({speedup['pages']} pages, identical={speedup['identical']})")
+    print(f"Results written to {output}")
+
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2))
+        print(f"Baseline updated: {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}; skipping the regression check. "
+              "See the module docstring for how to record one.")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text())
+    if baseline.get("corpus") != results["corpus"]:
+        print("Baseline was recorded with different corpus settings; skipping the regression check.")
+        return 0
+    regressions = check_regressions(results, baseline, args.threshold)
+    for stage, before, after, ratio in regressions:
+        print(f"REGRESSION {stage}: {before:.3f}s -> {after:.3f}s ({(ratio - 1) * 100:.0f}% slower)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Sentence classification throughput as the number of rule categories grows.
+
+Compares the single-pass PhraseMatcher RuleEngine against one regex search
+per category per sentence. Uses a blank English pipeline with a rule-based
+sentencizer, so no trained model is needed.
+
+    python -m benchmarks.bench_rules
+"""
+import random
+import re
+import time
+
+import spacy
+
+from core.rules import RuleEngine
+
+WORDS = ["solar", "module", "developer", "tariff", "grid", "capacity", "quarter", "meter",
+         "project", "plant", "inspection", "commission", "state", "agency", "energy", "efficiency"]
+
+
+def make_rules(n_categories: int, phrases_per_category: int, rng: random.Random) -> dict:
+    rules = {}
+    for c in range(n_categories):
+        rules[f"category_{c}"] = [f"kw{c}x{p}" if p % 2 else f"kw{c}x{p} {rng.choice(WORDS)}"
+                                  for p in range(phrases_per_category)]
+    return rules
+
+
+def make_text(rules: dict, n_sentences: int, rng: random.Random) -> str:
+    phrases = [p for plist in rules.values() for p in plist]
+    sentences = []
+    for _ in range(n_sentences):
+        words = [rng.choice(WORDS) for _ in range(18)]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(phrases))
+        sentences.append(" ".join(words).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def regex_classify(doc, patterns: dict) -> int:
+    hits = 0
+    for sent in doc.sents:
+        sentence = sent.text
+        for pattern in patterns.values():
+            if pattern.search(sentence):
+                hits += 1
+    return hits
+
+
+def main(n_sentences: int = 5000, phrases_per_category: int = 10):
+    rng = random.Random(42)
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+
+    print(f"{'categories':>10} {'engine sent/s':>14} {'regex sent/s':>13}")
+    for n_categories in [2, 4, 8, 16, 32, 64]:
+        rules = make_rules(n_categories, phrases_per_category, rng)
+        doc = nlp(make_text(rules, n_sentences, rng))
+        n_sents = sum(1 for _ in doc.sents)
+
+        engine = RuleEngine(rules, nlp)
+        start = time.perf_counter()
+        for _ in engine.classify_sentences(doc):
+            pass
+        engine_rate = n_sents / (time.perf_counter() - start)
+
+        patterns = {c: re.compile(r"\b(" + "|".join(map(re.escape, p)) + r")\b", re.IGNORECASE)
+                    for c, p in rules.items()}
+        start = time.perf_counter()
+        regex_classify(doc, patterns)
+        regex_rate = n_sents / (time.perf_counter() - start)
+
+        print(f"{n_categories:>10} {engine_rate:>14.0f} {regex_rate:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Synthetic regulation and internal policy (SOP) PDFs for benchmarking.
+
+Sentences are drawn from the phrases in assets/rules.json plus filler text,
+named agencies and dates, so the analyzer and risk flagger have realistic
+work to do. Everything is generated offline and is reproducible from the
+seed.
+
+    python -m benchmarks.corpus --out bench_corpus --pages 20 --density 0.3
+"""
+import argparse
+import json
+import random
+import re
+from pathlib import Path
+
+from fpdf import FPDF
+
+RULES_FILE = Path(__file__).resolve().parent.parent / "assets" / "rules.json"
+
+FILLER = ["solar", "module", "developer", "tariff", "grid", "capacity", "meter", "project", "plant",
+          "inspection", "rooftop", "inverter", "installation", "consumer", "distribution", "licensee",
+          "energy", "efficiency", "storage", "transmission", "scheme", "application", "agency"]
+AGENCIES = ["the Ministry of New and Renewable Energy", "the Solar Energy Corporation of India",
+            "the Central Electricity Regulatory Commission", "the State Nodal Agency",
+            "the Central Electricity Authority", "the Distribution Company"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September",
+          "October", "November", "December"]
+
+SENTENCES_PER_PAGE = 24
+
+
+def load_phrases() -> dict:
+    with open(RULES_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(FILLER) for _ in range(n))
+
+
+def _date(rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return f"within {rng.choice([7, 15, 30, 45, 60, 90])} days"
+    return f"on or before {rng.randint(1, 28)} {rng.choice(MONTHS)} {rng.randint(2024, 2027)}"
+
+
+def _clause(rng: random.Random, phrases: dict) -> str:
+    """
+    One sentence that hits the rule engine: an obligation, usually with a
+    deadline, and sometimes a penalty, reporting duty or subsidy condition.
+    """
+    parts = [rng.choice(AGENCIES).capitalize(), rng.choice(phrases["obligations"]), _words(rng, 5)]
+    if rng.random() < 0.7:
+        parts.append(_date(rng))
+    extra = rng.choice(["penalties", "reporting_duties", "subsidy_conditions", "exemptions", None])
+    if extra:
+        parts += ["and", rng.choice(phrases[extra]), _words(rng, 3)]
+    return " ".join(parts) + "."
+
+
+def _filler_sentence(rng: random.Random) -> str:
+    return (_words(rng, rng.randint(10, 20)) + ".").capitalize()
+
+
+def make_regulation(pages: int, density: float, rng: random.Random, phrases: dict) -> list:
+    """
+    Returns a list of pages, each a list of sentences; `density` is the
+    fraction of sentences that carry a rule hit.
+    """
+    return [[_clause(rng, phrases) if rng.random() < density else _filler_sentence(rng)
+             for _ in range(SENTENCES_PER_PAGE)] for _ in range(pages)]
+
+
+def make_policy(regulation: list, pages: int, coverage: float, rng: random.Random, phrases: dict) -> list:
+    """
+    An internal SOP that restates `coverage` of the regulation's clauses,
+    some with a changed deadline, and pads the rest with its own text.
+    """
+    clauses = [s for page in regulation for s in page if any(o in s for o in phrases["obligations"])]
+    adopted = rng.sample(clauses, int(len(clauses) * coverage)) if clauses else []
+    for i, clause in enumerate(adopted):
+        # Some deadlines drift from the regulation, which the flagger should catch
+        if rng.random() < 0.3:
+            adopted[i] = re.sub(r"within (\d+) days", lambda m: f"within {int(m.group(1)) * 2} days", clause)
+    sentences = adopted + [_filler_sentence(rng) for _ in range(max(0, pages * SENTENCES_PER_PAGE - len(adopted)))]
+    rng.shuffle(sentences)
+    return [sentences[i:i + SENTENCES_PER_PAGE] for i in range(0, len(sentences), SENTENCES_PER_PAGE)]
+
+
+def write_pdf(pages: list, path: Path, title: str) -> Path:
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=12)
+    for number, sentences in enumerate(pages, start=1):
+        pdf.add_page()
+        pdf.set_font("Helvetica", "B", 11)
+        pdf.cell(0, 8, f"{title} - page {number}", ln=True)
+        pdf.set_font("Helvetica", "", 9)
+        pdf.multi_cell(0, 5, " ".join(sentences))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pdf.output(str(path))
+    return path
+
+
+def generate(out_dir: Path, pages: int = 20, policy_pages: int = 8, density: float = 0.3,
+             coverage: float = 0.6, seed: int = 42, name: str = "synthetic") -> dict:
+    """
+    Writes one regulation PDF and one matching SOP PDF to out_dir.
+    """
+    rng = random.Random(seed)
+    phrases = load_phrases()
+    regulation = make_regulation(pages, density, rng, phrases)
+    policy = make_policy(regulation, policy_pages, coverage, rng, phrases)
+    return {
+        "regulation": write_pdf(regulation, Path(out_dir) / f"{name}_regulation.pdf", f"Regulation {name}"),
+        "policy": write_pdf(policy, Path(out_dir) / f"{name}_sop.pdf", f"Standard Operating Procedure {name}"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic regulation/SOP PDF pair.")
+    parser.add_argument("--out", default="bench_corpus")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--policy-pages", type=int, default=8)
+    parser.add_argument("--density", type=float, default=0.3, help="fraction of sentences with a rule hit")
+    parser.add_argument("--coverage", type=float, default=0.6, help="fraction of clauses the SOP restates")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    paths = generate(Path(args.out), args.pages, args.policy_pages, args.density, args.coverage, args.seed)
+    for kind, path in paths.items():
+        print(f"{kind}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,184 @@
 import re
-import spacy
+from core.config import NLP_BATCH_SIZE, NLP_N_PROCESS, NLP_CHUNK_CHARS, NLP_STREAM_BATCH_SIZE
+from core.models import get_nlp
+from core.rules import get_rule_engine, rule_categories
+from core.dates import normalize_date
+from core.metrics import count, timed_iter
 
-nlp = spacy.load("en_core_web_sm")
 
-def analyze_text(text: str):
-    doc = nlp(text)
-    obligations = []
-    penalties = []
-    entities = set()
-    dates = set()
+def iter_chunks(pages, max_chars: int = NLP_CHUNK_CHARS):
+    """
+    Lazily split pages into chunks at blank lines, packing paragraphs
+    together up to max_chars. Chunks never span a page break, and a
+    paragraph longer than max_chars is split at line boundaries.
+    """
+    for _, chunk in iter_page_chunks(pages, max_chars):
+        yield chunk
+
+
+def iter_page_chunks(pages, max_chars: int = NLP_CHUNK_CHARS):
+    """
+    Same as iter_chunks(), yielding (page number, chunk) with pages numbered from 1.
+    """
+    for number, page in enumerate(pages, start=1):
+        current = ""
+        for para in re.split(r"\n\s*\n", page):
+            if not para.strip():
+                continue
+            pieces = [para] if len(para) <= max_chars else para.splitlines(keepends=True)
+            for piece in pieces:
+                if current and len(current) + len(piece) + 2 > max_chars:
+                    yield number, current
+                    current = ""
+                current = f"{current}\n\n{piece}" if current else piece
+        if current:
+            yield number, current
+
+
+def chunk_text(text: str, max_chars: int = NLP_CHUNK_CHARS) -> list:
+    """
+    Split text into chunks at page breaks (form feed) and blank lines.
+    """
+    return list(iter_chunks(text.split("\f"), max_chars))
+
+
+def _new_result(categories) -> dict:
+    result = {category: [] for category in categories}
+    result["entities"] = set()
+    result["dates"] = set()
+    return result
+
 
+def _collect(doc, result: dict, engine):
+    # Same as engine.classify_sentences(), walking every sentence so they're counted in the same pass
+    matched_at = engine.classify(doc)
+    sentences = matched = 0
     for sent in doc.sents:
-        sentence = sent.text.strip()
-        if re.search(r'\b(must|shall|are obligated to|required to|have to|should)\b', sentence, re.IGNORECASE):
-            obligations.append(sentence)
-        if re.search(r'\b(penalt(y|ies)|fine(s)?|revocation|sanction|punishment)\b', sentence, re.IGNORECASE):
-            penalties.append(sentence)
+        sentences += 1
+        categories = matched_at.get(sent.start)
+        if categories:
+            matched += 1
+            text = sent.text.strip()
+            for category in engine.categories:
+                if category in categories:
+                    result[category].append(text)
+    count("sentences", sentences)
+    count("matched_sentences", matched)
 
     for ent in doc.ents:
         if ent.label_ in ["ORG", "PERSON", "GPE"]:
-            entities.add(ent.text)
+            result["entities"].add(ent.text)
         elif ent.label_ == "DATE":
-            dates.add(ent.text)
-
-    return {
-        "obligations": obligations,
-        "penalties": penalties,
-        "entities": list(entities),
-        "dates": list(dates)
-    }
\ No newline at end of file
+            result["dates"].add(ent.text)
+
+
+def _finalize(result: dict) -> dict:
+    result["entities"] = list(result["entities"])
+    result["dates"] = list(result["dates"])
+    # Canonical forms alongside the raw DATE strings, for date matching
+    result["normalized_dates"] = [normalize_date(d) for d in result["dates"]]
+    return result
+
+
+def analyze_texts(texts, batch_size: int = NLP_BATCH_SIZE, n_process: int = NLP_N_PROCESS):
+    """
+    Analyze many documents in one nlp.pipe stream.
+
+    Each document is either a string (pages separated by form feeds) or an
+    iterable of page strings, which is consumed lazily. Documents are chunked
+    by page/paragraph and all chunks are batched through spaCy together,
+    optionally across n_process worker processes, so at most about
+    batch_size * NLP_CHUNK_CHARS characters of text are held at once.
+    Yields one result dict per input document, in input order.
+    """
+    def numbered_chunks():
+        for index, text in enumerate(texts):
+            pages = text.split("\f") if isinstance(text, str) else text
+            empty = True
+            for chunk in iter_chunks(pages):
+                empty = False
+                yield chunk, index
+            if empty:
+                # Keep a placeholder so empty documents still yield a result
+                yield "", index
+
+    nlp = get_nlp()
+    engine = get_rule_engine()
+    current_index = None
+    result = None
+    # Exclusive, so pages extracted lazily while spaCy pulls chunks count as extraction, not NLP
+    docs = nlp.pipe(numbered_chunks(), as_tuples=True, batch_size=batch_size, n_process=n_process)
+    for doc, index in timed_iter("nlp", docs, counter="chunks", exclusive=True):
+        if index != current_index:
+            if result is not None:
+                yield _finalize(result)
+            current_index = index
+            result = _new_result(engine.categories)
+        _collect(doc, result, engine)
+
+    if result is not None:
+        yield _finalize(result)
+
+
+def analyze_text(text: str):
+    return next(analyze_texts([text], n_process=1))
+
+
+def analyze_pages(pages, batch_size: int = NLP_BATCH_SIZE) -> dict:
+    """
+    Analyze a document fed page by page, e.g. from iter_pdf_pages().
+    """
+    return next(analyze_texts([pages], batch_size=batch_size, n_process=1))
+
+
+def analyze_chunks(chunks, batch_size: int = NLP_BATCH_SIZE) -> list:
+    """
+    Analyze each chunk into its own result dict, for callers that reuse
+    results at chunk level. merge_results() combines them into the same
+    dict analyze_pages() would return for the whole document.
+    """
+    nlp = get_nlp()
+    engine = get_rule_engine()
+    results = []
+    for doc in timed_iter("nlp", nlp.pipe(chunks, batch_size=batch_size), counter="chunks", exclusive=True):
+        result = _new_result(engine.categories)
+        _collect(doc, result, engine)
+        results.append(_finalize(result))
+    return results
+
+
+def analyze_chunk_stream(items, batch_size: int = NLP_STREAM_BATCH_SIZE):
+    """
+    Analyze (chunk, context) pairs, consumed lazily, yielding (context,
+    result) for each chunk as soon as its spaCy batch is done. The first
+    result arrives after one small batch however long the input is.
+    """
+    nlp = get_nlp()
+    engine = get_rule_engine()
+    docs = nlp.pipe(items, as_tuples=True, batch_size=batch_size)
+    for doc, context in timed_iter("nlp", docs, counter="chunks", exclusive=True):
+        result = _new_result(engine.categories)
+        _collect(doc, result, engine)
+        yield context, _finalize(result)
+
+
+def analyze_stream(pages, batch_size: int = NLP_STREAM_BATCH_SIZE):
+    """
+    Streaming form of analyze_pages(): yields (page number, result) per
+    chunk. merge_results() over the yielded results gives the same dict
+    analyze_pages() returns.
+    """
+    items = ((chunk, number) for number, chunk in iter_page_chunks(pages))
+    yield from analyze_chunk_stream(items, batch_size)
+
+
+def merge_results(results) -> dict:
+    merged = _new_result(rule_categories())
+    for result in results:
+        for key, value in result.items():
+            if key in ("entities", "dates"):
+                merged[key].update(value)
+            elif key in merged and key != "normalized_dates":
+                merged[key].extend(value)
+    return _finalize(merged)
+
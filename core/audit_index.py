@@ -0,0 +1,276 @@
+"""
+SQLite index over the audit JSON files.
+
+Every audit write records one row (source, content hash, timestamps, size,
+item counts), so "latest by source" and listings are indexed queries
+instead of globbing and stat()-ing the audit directories per request.
+
+Rebuild from the files on disk with:
+
+    python -m core.audit_index rebuild
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from core.config import AUDIT_DIR, AUDIT_INDEX_DB, INTERNAL_POLICY_DIR
+
+EXTERNAL = "external"
+INTERNAL = "internal_policy"
+
+logger = logging.getLogger(__name__)
+
+COUNTED_KEYS = ["obligations", "penalties", "entities", "dates"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_files (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    filename TEXT NOT NULL,
+    source TEXT NOT NULL,
+    original_filename TEXT,
+    content_hash TEXT NOT NULL,
+    source_hash TEXT,
+    created_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    obligations INTEGER NOT NULL DEFAULT 0,
+    penalties INTEGER NOT NULL DEFAULT 0,
+    entities INTEGER NOT NULL DEFAULT 0,
+    dates INTEGER NOT NULL DEFAULT 0,
+    segment TEXT,
+    seg_offset INTEGER,
+    seg_length INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_audit_source_created ON audit_files (source, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_audit_filename ON audit_files (filename);
+CREATE INDEX IF NOT EXISTS idx_audit_source_hash ON audit_files (source_hash);
+"""
+
+# Columns added after the first schema version, added in place on older databases
+ADDED_COLUMNS = {"segment": "TEXT", "seg_offset": "INTEGER", "seg_length": "INTEGER"}
+
+
+def _row(path, data: dict, source: str, content: bytes = None, source_hash: str = None,
+         created_at: float = None, segment: str = None, seg_offset: int = None, seg_length: int = None) -> dict:
+    path = Path(path)
+    if content is None:
+        content = path.read_bytes()
+    row = {
+        "path": str(path),
+        "filename": path.name,
+        "source": source,
+        "original_filename": data.get("filename"),
+        "content_hash": hashlib.sha256(content).hexdigest(),
+        "source_hash": source_hash,
+        "created_at": created_at if created_at is not None else time.time(),
+        "size": len(content) if not segment else seg_length,
+        "segment": segment,
+        "seg_offset": seg_offset,
+        "seg_length": seg_length,
+    }
+    for key in COUNTED_KEYS:
+        row[key] = len(data.get(key, []))
+    return row
+
+
+def _insert(conn, rows: list):
+    if not rows:
+        return
+    columns = ", ".join(rows[0])
+    placeholders = ", ".join(f":{c}" for c in rows[0])
+    conn.executemany(f"INSERT OR REPLACE INTO audit_files ({columns}) VALUES ({placeholders})", rows)
+
+
+class _RebuildBatch:
+    # Stands in for the index while rebuild() collects rows, so they can
+    # replace the old ones in one transaction
+    def __init__(self):
+        self.rows = []
+
+    def record(self, *args, **kwargs) -> dict:
+        row = _row(*args, **kwargs)
+        self.rows.append(row)
+        return row
+
+
+class AuditIndex:
+    """
+    Thin wrapper around the index database. A connection is opened per
+    call, so one instance is safe to use from threads and forked workers.
+    """
+
+    def __init__(self, db_path=AUDIT_INDEX_DB):
+        self.db_path = Path(db_path)
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                existing = {r["name"] for r in conn.execute("PRAGMA table_info(audit_files)")}
+                for column, kind in ADDED_COLUMNS.items():
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE audit_files ADD COLUMN {column} {kind}")
+                self._initialized = True
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, path, data: dict, source: str, content: bytes = None,
+               source_hash: str = None, created_at: float = None,
+               segment: str = None, seg_offset: int = None, seg_length: int = None) -> dict:
+        """
+        Adds or replaces the row for an audit result that was just written,
+        either as a file or as a segment record (segment/offset/length).
+        """
+        row = _row(path, data, source, content, source_hash, created_at, segment, seg_offset, seg_length)
+        with self._connect() as conn:
+            _insert(conn, [row])
+        return row
+
+    def remove(self, path):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM audit_files WHERE path = ?", (str(path),))
+
+    def remove_segment(self, segment: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM audit_files WHERE segment = ?", (segment,))
+
+    def get(self, path):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM audit_files WHERE path = ?", (str(path),)).fetchone()
+        return dict(row) if row else None
+
+    def segment_rows(self) -> list:
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute("SELECT * FROM audit_files WHERE segment IS NOT NULL ORDER BY id")]
+
+    @staticmethod
+    def exists(row: dict) -> bool:
+        return bool(row.get("segment")) or Path(row["path"]).exists()
+
+    def latest(self, source: str):
+        """
+        Returns the newest row for a source, or None.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM audit_files WHERE source = ? ORDER BY created_at DESC, id DESC LIMIT 1",
+                (source,)).fetchone()
+        return dict(row) if row else None
+
+    def latest_path(self, source: str):
+        """
+        Returns the newest existing file for a source, dropping rows whose
+        file has been deleted outside the index.
+        """
+        while True:
+            row = self.latest(source)
+            if row is None:
+                return None
+            path = Path(row["path"])
+            if self.exists(row):
+                return path
+            self.remove(path)
+
+    def list(self, source: str = None, limit: int = 50, offset: int = 0) -> list:
+        query = "SELECT * FROM audit_files"
+        params = []
+        if source:
+            query += " WHERE source = ?"
+            params.append(source)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute(query, params)]
+
+    def paths(self, source: str) -> list:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM audit_files WHERE source = ? ORDER BY created_at, id", (source,))
+            return [Path(r["path"]) for r in rows if self.exists(dict(r))]
+
+    def find(self, filename: str, source: str = None):
+        query = "SELECT * FROM audit_files WHERE filename = ?"
+        params = [filename]
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        with self._connect() as conn:
+            row = conn.execute(query + " ORDER BY created_at DESC LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+
+    def find_by_source_hash(self, source_hash: str, source: str = None):
+        query = "SELECT * FROM audit_files WHERE source_hash = ?"
+        params = [source_hash]
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        with self._connect() as conn:
+            row = conn.execute(query + " ORDER BY created_at DESC LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+
+    def count(self, source: str = None) -> int:
+        with self._connect() as conn:
+            if source:
+                return conn.execute("SELECT COUNT(*) FROM audit_files WHERE source = ?", (source,)).fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM audit_files").fetchone()[0]
+
+    def rebuild(self) -> dict:
+        """
+        Re-indexes the audit directories and segment files from scratch,
+        using file mtimes as timestamps for plain JSON files. The files are
+        read first and the old rows swapped for the new in one transaction,
+        so readers never see an empty or partial index.
+        """
+        batch = _RebuildBatch()
+        counts = {EXTERNAL: 0, INTERNAL: 0, "skipped": 0}
+        for directory, source in [(AUDIT_DIR, EXTERNAL), (INTERNAL_POLICY_DIR, INTERNAL)]:
+            if not directory.exists():
+                continue
+            for entry in os.scandir(directory):
+                if not entry.is_file() or not entry.name.endswith(".json"):
+                    continue
+                try:
+                    content = Path(entry.path).read_bytes()
+                    data = json.loads(content)
+                except (OSError, ValueError):
+                    counts["skipped"] += 1
+                    continue
+                batch.record(entry.path, data, source, content=content, created_at=entry.stat().st_mtime)
+                counts[source] += 1
+
+        from core.audit_store import reindex_segments
+        counts["segment_records"] = reindex_segments(batch)
+
+        with self._connect() as conn:
+            conn.execute("DELETE FROM audit_files")
+            _insert(conn, batch.rows)
+        return counts
+
+    def ensure_built(self):
+        """
+        Builds the index from existing files the first time it is used.
+        """
+        if self.count() == 0:
+            counts = self.rebuild()
+            logger.info("[AuditIndex] Indexed existing audit files: %s", counts)
+
+
+audit_index = AuditIndex()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["rebuild"]:
+        print(audit_index.rebuild())
+    else:
+        print("Usage: python -m core.audit_index rebuild")
@@ -0,0 +1,265 @@
+"""
+Storage backends for audit results.
+
+"json" writes one file per result, as before. "segment" appends each result
+as a compressed record to append-only segment files under AUDIT_SEGMENT_DIR;
+the audit index stores each record's segment, offset and length, and reads
+memory-map the segment and decode only that record. Each record also
+carries its logical path and source, so the index can be rebuilt from the
+segments alone. Records keep their
+logical audit path (e.g. audit_logs/<name>_<timestamp>.json), so callers
+address results the same way under both backends.
+
+Write all segment records back out as regular JSON files with:
+
+    python -m core.audit_store export
+"""
+import fcntl
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from core.audit_index import audit_index, EXTERNAL
+from core.config import AUDIT_STORAGE, AUDIT_SEGMENT_DIR, AUDIT_SEGMENT_MAX_MB, AUDIT_SEGMENT_CODEC
+
+try:
+    import zstandard
+except ImportError:  # optional, zlib is used instead
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# magic, codec, payload length
+HEADER = struct.Struct("<4sBI")
+MAGIC = b"ACR1"
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+SEGMENT_RE = re.compile(r"^segment_(\d{6})\.seg$")
+# What a torn or garbled record raises when decoded
+DECODE_ERRORS = (zlib.error, ValueError, RuntimeError) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+def _compress(payload: bytes):
+    if AUDIT_SEGMENT_CODEC == "zstd" and zstandard is not None:
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=3).compress(payload)
+    return CODEC_ZLIB, zlib.compress(payload, 6)
+
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Segment record is zstd-compressed but zstandard is not installed.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class SegmentStore:
+    """
+    Append-only segment files of compressed JSON records.
+
+    Appends take an exclusive flock on the active segment, so several
+    processes can write to the same directory.
+    """
+
+    def __init__(self, segment_dir=AUDIT_SEGMENT_DIR, max_segment_bytes: int = AUDIT_SEGMENT_MAX_MB * 1024 * 1024):
+        self.segment_dir = Path(segment_dir)
+        self.max_segment_bytes = max_segment_bytes
+
+    def segments(self) -> list:
+        if not self.segment_dir.exists():
+            return []
+        return sorted(name for name in os.listdir(self.segment_dir) if SEGMENT_RE.match(name))
+
+    def _active_segment(self) -> str:
+        segments = self.segments()
+        if segments:
+            last = segments[-1]
+            if (self.segment_dir / last).stat().st_size < self.max_segment_bytes:
+                return last
+            number = int(SEGMENT_RE.match(last)[1]) + 1
+        else:
+            number = 1
+        return f"segment_{number:06d}.seg"
+
+    def append(self, data: dict):
+        """
+        Appends one record and returns (segment name, offset, length).
+        """
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        codec, compressed = _compress(payload)
+        record = HEADER.pack(MAGIC, codec, len(compressed)) + compressed
+
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+        segment = self._active_segment()
+        with open(self.segment_dir / segment, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(record)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return segment, offset, len(record)
+
+    def read(self, segment: str, offset: int, length: int) -> dict:
+        with open(self.segment_dir / segment, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                record = mm[offset:offset + length]
+        magic, codec, size = HEADER.unpack_from(record)
+        if magic != MAGIC:
+            raise ValueError(f"Corrupt segment record at {segment}:{offset}")
+        return json.loads(_decompress(codec, record[HEADER.size:HEADER.size + size]))
+
+    def iter_records(self, segment: str):
+        """
+        Yields (offset, length, data) for every record in a segment. Stops
+        at the first short or unreadable record, which is what a crash
+        mid-append leaves behind; an empty segment yields nothing.
+        """
+        with open(self.segment_dir / segment, "rb") as f:
+            # mmap can't map an empty file (a crash right after rotation leaves one)
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                offset = 0
+                while offset + HEADER.size <= len(mm):
+                    magic, codec, size = HEADER.unpack_from(mm, offset)
+                    length = HEADER.size + size
+                    if magic != MAGIC or offset + length > len(mm):
+                        break
+                    try:
+                        data = json.loads(_decompress(codec, mm[offset + HEADER.size:offset + length]))
+                    except DECODE_ERRORS:
+                        break
+                    yield offset, length, data
+                    offset += length
+                if offset < len(mm):
+                    logger.warning("[AuditStore] %s: ignoring %d unreadable bytes at offset %d",
+                                   segment, len(mm) - offset, offset)
+
+
+segment_store = SegmentStore()
+
+
+def _record_content(data: dict) -> bytes:
+    # What the index hashes for a segment record: the data in compact form
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def write_audit(path, data: dict, source: str, indent: int = 4, ensure_ascii: bool = True,
+                source_hash: str = None) -> str:
+    """
+    Stores an audit result under its logical path with the configured backend
+    and records it in the audit index.
+    """
+    path = Path(path)
+    # Internal policies are overwritten in place and exempt from retention,
+    # so they always stay as regular files (replaced atomically, since
+    # several workers may save the same policy at once)
+    if AUDIT_STORAGE == "segment" and source == EXTERNAL:
+        created_at = time.time()
+        envelope = {"path": str(path), "source": source, "created_at": created_at,
+                    "source_hash": source_hash, "data": data}
+        segment, offset, length = segment_store.append(envelope)
+        audit_index.record(path, data, source, content=_record_content(data), source_hash=source_hash, created_at=created_at,
+                           segment=segment, seg_offset=offset, seg_length=length)
+    else:
+        content = json.dumps(data, indent=indent, ensure_ascii=ensure_ascii).encode("utf-8")
+        # A temp file per writer: threads of one process may save the same policy too
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        audit_index.record(path, data, source, content=content, source_hash=source_hash)
+    return str(path)
+
+
+def load_audit(path) -> dict:
+    """
+    Loads an audit result by logical path from whichever backend holds it.
+    """
+    path = Path(path)
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    row = audit_index.get(path)
+    if row and row.get("segment"):
+        return segment_store.read(row["segment"], row["seg_offset"], row["seg_length"])["data"]
+    raise FileNotFoundError(f"Audit result not found: {path}")
+
+
+def read_audit_bytes(path) -> bytes:
+    """
+    Returns an audit result as JSON bytes in the regular file layout.
+    """
+    path = Path(path)
+    if path.exists():
+        return path.read_bytes()
+    return json.dumps(load_audit(path), indent=4).encode("utf-8")
+
+
+def export_segments() -> int:
+    """
+    Writes every indexed segment record back to its logical path as a
+    regular JSON file, for compatibility with the "json" layout.
+    """
+    exported = 0
+    for row in audit_index.segment_rows():
+        path = Path(row["path"])
+        data = segment_store.read(row["segment"], row["seg_offset"], row["seg_length"])["data"]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps(data, indent=4).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(content)
+        audit_index.record(path, data, row["source"], content=content,
+                           source_hash=row["source_hash"], created_at=row["created_at"])
+        exported += 1
+    return exported
+
+
+def reindex_segments(index=audit_index) -> int:
+    """
+    Re-adds every segment record to the index; later records for the same
+    logical path replace earlier ones.
+    """
+    count = 0
+    for segment in segment_store.segments():
+        for offset, length, envelope in segment_store.iter_records(segment):
+            data = envelope["data"]
+            index.record(envelope["path"], data, envelope["source"], content=_record_content(data),
+                         source_hash=envelope.get("source_hash"), created_at=envelope["created_at"],
+                         segment=segment, seg_offset=offset, seg_length=length)
+            count += 1
+    return count
+
+
+def delete_segments_older_than(cutoff: float) -> list:
+    """
+    Deletes whole segments whose last append is older than cutoff, along with their index rows.
+    """
+    deleted = []
+    for segment in segment_store.segments():
+        path = segment_store.segment_dir / segment
+        if path.stat().st_mtime < cutoff:
+            path.unlink()
+            audit_index.remove_segment(segment)
+            deleted.append(segment)
+    return deleted
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["export"]:
+        print(f"Exported {export_segments()} records to JSON files.")
+    else:
+        print("Usage: python -m core.audit_store export")
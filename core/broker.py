@@ -0,0 +1,258 @@
+"""
+Shared job queue for running the API and workers as several processes or
+hosts, backed by a local SQLite database that needs no external service.
+
+API processes enqueue jobs; workers (python -m core.worker) lease them,
+renew the lease while running and report the outcome. A job whose lease
+runs out (its worker died) goes back to other workers until its attempts
+are used up, and failed attempts are retried with backoff. Identical jobs
+still waiting in the queue are coalesced, so repeated "analyze latest" or
+"report" requests don't queue duplicate work. Files handed to a job (its
+upload) are kept across retries and deleted once the job is finished.
+
+The same database holds named leadership leases, used to make sure only
+one process runs retention cleanup. Every node must see the same database
+file, which needs a filesystem with working POSIX locks (local disk or a
+shared volume; not all network filesystems qualify). Jobs hand back file
+paths (audits, reports, downloads) and read uploads by path, so those
+directories must be shared between the API and the workers too.
+"""
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from core.config import (
+    BROKER_DB, BROKER_LEASE_SECONDS, BROKER_MAX_ATTEMPTS, BROKER_RETRY_BACKOFF_SECONDS, JOB_TTL_SECONDS
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    task TEXT NOT NULL,
+    args TEXT NOT NULL,
+    files TEXT NOT NULL DEFAULT '[]',
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    error_type TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at);
+CREATE TABLE IF NOT EXISTS leaders (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+FINISHED_STATES = ("completed", "failed", "cancelled")
+
+
+class JobBroker:
+    """
+    Connection per call, as in AuditIndex, so one instance is safe to share
+    between threads and forked processes.
+    """
+
+    def __init__(self, db_path=BROKER_DB, max_attempts: int = BROKER_MAX_ATTEMPTS,
+                 retry_backoff: float = BROKER_RETRY_BACKOFF_SECONDS):
+        self.db_path = Path(db_path)
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self, immediate: bool = False):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                self._initialized = True
+            # IMMEDIATE takes the write lock up front, so read-then-update
+            # sequences (leasing, elections) can't interleave across processes
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def enqueue(self, kind: str, task: str, args: list, max_attempts: int = None, files: list = ()) -> str:
+        """
+        Queues task(*args) and returns the job ID; an identical job that is
+        still waiting is returned instead of adding another. files are
+        deleted once the job is finished.
+        """
+        payload = json.dumps(args)
+        now = time.time()
+        with self._connect(immediate=True) as conn:
+            row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' AND task = ? AND args = ?",
+                               (task, payload)).fetchone()
+            if row:
+                return row["id"]
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, task, args, files, status, max_attempts, available_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, task, payload, json.dumps(list(files)), max_attempts or self.max_attempts, now, now))
+            # Occasional housekeeping: forget finished jobs past their TTL
+            conn.execute("DELETE FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') AND finished_at < ?",
+                         (now - JOB_TTL_SECONDS,))
+        return job_id
+
+    def lease(self, owner: str, lease_seconds: float = BROKER_LEASE_SECONDS):
+        """
+        Claims the oldest runnable job for owner, or returns None. Jobs whose
+        lease expired are runnable again unless out of attempts.
+        """
+        now = time.time()
+        with self._connect(immediate=True) as conn:
+            lost = conn.execute("SELECT files FROM jobs WHERE status = 'running' AND lease_expires < ? "
+                                "AND attempts >= max_attempts", (now,)).fetchall()
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, lease_owner = NULL, "
+                "error = 'Worker lost: lease expired on the last attempt', error_type = 'LeaseExpired' "
+                "WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts", (now, now))
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                "OR (status = 'running' AND lease_expires < ?) ORDER BY available_at, created_at LIMIT 1",
+                (now, now)).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?, lease_expires = ?, "
+                    "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (owner, now + lease_seconds, now, row["id"]))
+        for lost_row in lost:
+            _discard(lost_row["files"])
+        if row is None:
+            return None
+        job = _decode(row)
+        job["attempts"] += 1
+        return job
+
+    def heartbeat(self, job_id: str, owner: str, lease_seconds: float = BROKER_LEASE_SECONDS) -> bool:
+        """
+        Extends a running job's lease; False means owner no longer holds it.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (time.time() + lease_seconds, job_id, owner))
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, owner: str, result) -> bool:
+        with self._connect(immediate=True) as conn:
+            row = conn.execute("SELECT files FROM jobs WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                               (job_id, owner)).fetchone()
+            if row is None:
+                return False
+            conn.execute("UPDATE jobs SET status = 'completed', result = ?, finished_at = ?, lease_owner = NULL "
+                         "WHERE id = ?", (json.dumps(result, default=str), time.time(), job_id))
+        _discard(row["files"])
+        return True
+
+    def fail(self, job_id: str, owner: str, error: Exception, retry: bool = True) -> bool:
+        """
+        Records a failed attempt; the job is queued again after a backoff
+        while it has attempts left and the error is worth retrying.
+        """
+        now = time.time()
+        with self._connect(immediate=True) as conn:
+            row = conn.execute("SELECT attempts, max_attempts, files FROM jobs "
+                               "WHERE id = ? AND lease_owner = ? AND status = 'running'", (job_id, owner)).fetchone()
+            if row is None:
+                return False
+            final = not (retry and row["attempts"] < row["max_attempts"])
+            if not final:
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', available_at = ?, lease_owner = NULL, error = ?, error_type = ? "
+                    "WHERE id = ?",
+                    (now + self.retry_backoff * 2 ** (row["attempts"] - 1), str(error), type(error).__name__, job_id))
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, lease_owner = NULL, error = ?, error_type = ? "
+                    "WHERE id = ?", (now, str(error), type(error).__name__, job_id))
+        if final:
+            _discard(row["files"])
+        return True
+
+    def cancel(self, job_id: str) -> bool:
+        # Only jobs no worker has picked up yet; running work can't be interrupted
+        with self._connect(immediate=True) as conn:
+            row = conn.execute("SELECT files FROM jobs WHERE id = ? AND status = 'queued'", (job_id,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ?", (time.time(), job_id))
+        _discard(row["files"])
+        return True
+
+    def get(self, job_id: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _decode(row) if row else None
+
+    def list(self, limit: int = 100) -> list:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [_decode(row) for row in rows]
+
+    def acquire_leadership(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        Takes or renews the named leadership lease. The holder keeps it by
+        calling again within ttl; others get it only once it has lapsed.
+        """
+        now = time.time()
+        with self._connect(immediate=True) as conn:
+            row = conn.execute("SELECT owner, expires_at FROM leaders WHERE name = ?", (name,)).fetchone()
+            if row and row["owner"] != owner and row["expires_at"] > now:
+                return False
+            conn.execute("INSERT OR REPLACE INTO leaders (name, owner, expires_at) VALUES (?, ?, ?)",
+                         (name, owner, now + ttl))
+            return True
+
+    def release_leadership(self, name: str, owner: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leaders WHERE name = ? AND owner = ?", (name, owner))
+
+
+def node_id() -> str:
+    # Per process, so uvicorn workers on one host are told apart
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _discard(files: str):
+    # Only after the transaction commits, so a rolled-back update never loses a retry's input
+    for path in json.loads(files):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _decode(row) -> dict:
+    job = dict(row)
+    job["args"] = json.loads(job["args"])
+    job["files"] = json.loads(job["files"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    return job
+
+
+broker = JobBroker()
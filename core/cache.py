@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from importlib import metadata
+from core.config import SPACY_MODEL, RULES_FILE, ANALYSIS_CACHE_DIR, ANALYSIS_CACHE_MEMORY_MB, ANALYSIS_CACHE_DISK_MB
+from core.metrics import count, metrics
+
+# Bump whenever analyze_text output changes for the same input
+ANALYZER_VERSION = "3"
+
+
+def _model_version() -> str:
+    # Read from package metadata so computing the key never loads the model
+    try:
+        return metadata.version(SPACY_MODEL)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _rules_version() -> str:
+    # Editing the classification rules changes results just like a new model
+    try:
+        return hashlib.sha256(RULES_FILE.read_bytes()).hexdigest()[:8]
+    except FileNotFoundError:
+        return "none"
+
+
+def analysis_version() -> str:
+    return f"{ANALYZER_VERSION}-{SPACY_MODEL}-{_model_version()}-rules.{_rules_version()}"
+
+
+class AnalysisCache:
+    """
+    Two-tier cache of analysis results keyed by document content hash.
+
+    Results are held as serialized JSON: an in-memory LRU bounded by
+    memory_bytes in front of one file per entry on disk, bounded by
+    disk_bytes with oldest-first eviction. Every lookup returns a fresh
+    dict, so callers may mutate what they get back.
+    """
+
+    def __init__(self, cache_dir=ANALYSIS_CACHE_DIR,
+                 memory_bytes: int = ANALYSIS_CACHE_MEMORY_MB * 1024 * 1024,
+                 disk_bytes: int = ANALYSIS_CACHE_DISK_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk_size = None
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self._version = analysis_version()
+
+    def key(self, digest: str) -> str:
+        version = hashlib.sha256(self._version.encode()).hexdigest()[:12]
+        return f"{digest}_{version}"
+
+    def _path(self, key: str):
+        return self.cache_dir / f"{key}.json"
+
+    def _remember(self, key: str, payload: str):
+        with self._lock:
+            if key in self._memory:
+                self._memory_size -= len(self._memory.pop(key))
+            if len(payload) > self.memory_bytes:
+                return
+            self._memory[key] = payload
+            self._memory_size += len(payload)
+            while self._memory_size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def get(self, digest: str):
+        key = self.key(digest)
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+                count("cache_hits", cache=self.cache_dir.name, tier="memory")
+                return json.loads(payload)
+
+        path = self._path(key)
+        try:
+            payload = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            count("cache_misses", cache=self.cache_dir.name)
+            return None
+
+        # Refresh mtime so disk eviction is least-recently-used
+        os.utime(path)
+        self._remember(key, payload)
+        with self._lock:
+            self.hits["disk"] += 1
+        count("cache_hits", cache=self.cache_dir.name, tier="disk")
+        return json.loads(payload)
+
+    def put(self, digest: str, result: dict):
+        key = self.key(digest)
+        payload = json.dumps(result, ensure_ascii=False)
+        self._remember(key, payload)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, path)
+        self._account_disk(len(payload.encode("utf-8")))
+
+    def get_or_compute(self, digest: str, compute) -> dict:
+        result = self.get(digest)
+        if result is None:
+            result = compute()
+            self.put(digest, result)
+        return result
+
+    def _scan_disk(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _account_disk(self, added: int):
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = sum(size for _, size, _ in self._scan_disk())
+            else:
+                self._disk_size += added
+            if self._disk_size <= self.disk_bytes:
+                return
+
+            # Over budget: rescan (other processes share this directory) and drop oldest first
+            entries = sorted(self._scan_disk())
+            self._disk_size = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if self._disk_size <= self.disk_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                    self._disk_size -= size
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            self._disk_size = 0
+        if self.cache_dir.exists():
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".json"):
+                    os.unlink(entry.path)
+
+    def pool_stats(self) -> dict:
+        """
+        Stats for the cache as the job workers use it: hit/miss counts merged
+        into this process's metrics after each job, and what is on disk.
+        Each worker's memory tier is private to it, so it isn't reported.
+        """
+        name = self.cache_dir.name
+        try:
+            entries = self._scan_disk()
+        except FileNotFoundError:
+            entries = []
+        return {
+            "version": self._version,
+            "hits": {tier: metrics.total("cache_hits", cache=name, tier=tier) for tier in ("memory", "disk")},
+            "misses": metrics.total("cache_misses", cache=name),
+            "disk_entries": len(entries),
+            "disk_bytes": sum(size for _, size, _ in entries)
+        }
+
+    def stats(self) -> dict:
+        # Counters of this process only; see pool_stats() for the API's view
+        with self._lock:
+            return {
+                "version": self._version,
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_bytes": self._disk_size
+            }
+
+
+analysis_cache = AnalysisCache()
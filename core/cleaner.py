@@ -1,13 +1,198 @@
+import logging
+import os
 import time
-from core.config import AUDIT_DIR, RETENTION_DAYS
+from pathlib import Path
+from core.audit_index import audit_index, INTERNAL
+from core.audit_store import delete_segments_older_than, load_audit
+from core.broker import broker
+from core.downloads import download_manifest
+from core.config import (
+    AUDIT_DIR, RETENTION_DAYS, AUDIT_RETENTION_MB, INTERNAL_POLICY_DIR, INTERNAL_RETENTION_DAYS,
+    INTERNAL_RETENTION_MB, DOWNLOAD_DIR, DOWNLOAD_RETENTION_DAYS, DOWNLOAD_RETENTION_MB,
+    REPORT_RETENTION_DAYS, REPORT_RETENTION_MB, CLEANUP_SCAN_BATCH, CLEANUP_DRY_RUN, CLEANUP_INTERVAL_SECONDS,
+    UPLOAD_DIR, UPLOAD_RETENTION_DAYS
+)
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+class RetentionRule:
+    """
+    Age and size limits for the matching files in one directory.
+
+    Files older than max_age_days are deleted; if what remains is still
+    over max_bytes, the oldest files are evicted until it fits. A limit of
+    0 disables it. on_delete is called with each deleted path.
+    """
+
+    def __init__(self, name: str, directory: Path, suffixes: tuple, max_age_days: int = 0,
+                 max_bytes: int = 0, recursive: bool = False, on_delete=None):
+        self.name = name
+        self.directory = Path(directory)
+        self.suffixes = suffixes
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.recursive = recursive
+        self.on_delete = on_delete
+
+
+def default_rules() -> list:
+    return [
+        RetentionRule("audit_logs", AUDIT_DIR, (".json",), RETENTION_DAYS, AUDIT_RETENTION_MB * MB,
+                      on_delete=audit_index.remove),
+        RetentionRule("internal_policies", INTERNAL_POLICY_DIR, (".json",), INTERNAL_RETENTION_DAYS,
+                      INTERNAL_RETENTION_MB * MB, on_delete=audit_index.remove),
+        # Manifest rows go with their files, so a later 304 never reports a deleted path
+        RetentionRule("downloads", DOWNLOAD_DIR, (".pdf", ".part", ".meta"), DOWNLOAD_RETENTION_DAYS,
+                      DOWNLOAD_RETENTION_MB * MB, recursive=True, on_delete=download_manifest.remove_path),
+        RetentionRule("reports", Path("reports"), (".xlsx", ".pdf"), REPORT_RETENTION_DAYS,
+                      REPORT_RETENTION_MB * MB, recursive=True),
+        # Jobs delete their uploads when they end; this catches any whose job never did
+        RetentionRule("uploads", UPLOAD_DIR, (".pdf",), UPLOAD_RETENTION_DAYS),
+    ]
+
+
+def _scan_batches(directory: Path, suffixes: tuple, recursive: bool, batch_size: int):
+    """
+    Yields lists of (mtime, size, path) using os.scandir, batch_size at a time.
+    """
+    batch = []
+    pending = [str(directory)]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending.append(entry.path)
+                        continue
+                    if not entry.name.endswith(suffixes):
+                        continue
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except FileNotFoundError:
+                        continue
+                    batch.append((st.st_mtime, st.st_size, entry.path))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+        except FileNotFoundError:
+            continue
+    if batch:
+        yield batch
+
+
+def _delete(path: str, rule: RetentionRule, dry_run: bool) -> bool:
+    if dry_run:
+        return True
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        logger.warning("[Cleanup] Failed to delete %s: %s", path, e)
+        return False
+    if rule.on_delete:
+        rule.on_delete(Path(path))
+    return True
+
+
+def apply_rule(rule: RetentionRule, dry_run: bool = CLEANUP_DRY_RUN, now: float = None,
+               batch_size: int = CLEANUP_SCAN_BATCH) -> dict:
+    start = time.perf_counter()
+    now = now if now is not None else time.time()
+    cutoff = now - rule.max_age_days * 86400 if rule.max_age_days else None
+
+    stats = {"directory": str(rule.directory), "scanned": 0, "deleted": 0, "bytes_freed": 0,
+             "bytes_kept": 0, "dry_run": dry_run}
+    kept = []
+    for batch in _scan_batches(rule.directory, rule.suffixes, rule.recursive, batch_size):
+        stats["scanned"] += len(batch)
+        for mtime, size, path in batch:
+            if cutoff is not None and mtime < cutoff:
+                if _delete(path, rule, dry_run):
+                    stats["deleted"] += 1
+                    stats["bytes_freed"] += size
+                continue
+            stats["bytes_kept"] += size
+            if rule.max_bytes:
+                kept.append((mtime, size, path))
+
+    if rule.max_bytes and stats["bytes_kept"] > rule.max_bytes:
+        # Over the disk budget: evict oldest first until it fits
+        kept.sort()
+        for mtime, size, path in kept:
+            if stats["bytes_kept"] <= rule.max_bytes:
+                break
+            if _delete(path, rule, dry_run):
+                stats["deleted"] += 1
+                stats["bytes_freed"] += size
+                stats["bytes_kept"] -= size
+
+    stats["scan_seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def prune_flagger_state() -> dict:
+    """
+    Drops persisted flagger state for internal policies that are no longer
+    in the audit index (replaced or deleted by retention).
+    """
+    from agents.risk_flagger_agent import policy_hashes
+    from core.flagger_state import flagger_state, fingerprint
+
+    fingerprints, items = set(), set()
+    for path in audit_index.paths(INTERNAL):
+        try:
+            hashes = policy_hashes(load_audit(path))
+        except (OSError, ValueError):
+            continue
+        for values in hashes.values():
+            fingerprints.add(fingerprint(values))
+            items.update(values)
+    return flagger_state.prune(fingerprints, items)
+
+
+def run_retention(rules: list = None, dry_run: bool = CLEANUP_DRY_RUN) -> dict:
+    """
+    Applies every retention rule; meant to run in a worker thread.
+    """
+    start = time.perf_counter()
+    report = {}
+    for rule in rules if rules is not None else default_rules():
+        if not rule.max_age_days and not rule.max_bytes:
+            continue
+        report[rule.name] = apply_rule(rule, dry_run=dry_run)
+
+    if not dry_run and RETENTION_DAYS:
+        deleted = delete_segments_older_than(time.time() - RETENTION_DAYS * 86400)
+        report["segments"] = {"deleted": len(deleted)}
+    if not dry_run:
+        # After the rules, so state for policies deleted just now goes too
+        report["flagger_state"] = prune_flagger_state()
+
+    freed = sum(r.get("bytes_freed", 0) for r in report.values())
+    deleted = sum(r.get("deleted", 0) for r in report.values())
+    elapsed = round(time.perf_counter() - start, 3)
+    logger.info("[Cleanup] %s %d files (%d bytes) in %.3fs%s", "Would delete" if dry_run else "Deleted",
+                deleted, freed, elapsed, " (dry run)" if dry_run else "")
+    return {"rules": report, "files_deleted": deleted, "bytes_freed": freed, "seconds": elapsed, "dry_run": dry_run}
+
+
+def run_retention_if_leader(owner: str, ttl: float = CLEANUP_INTERVAL_SECONDS * 2):
+    """
+    Runs retention only in the process holding the "retention" leadership
+    lease, so API processes and workers on every node don't all scan and
+    delete at once. Calling this every interval keeps the lease; if the
+    leader goes away another process takes over once it lapses.
+    """
+    if not broker.acquire_leadership("retention", owner, ttl):
+        return None
+    return run_retention()
+
 
 def delete_old_audit_logs():
-    now = time.time()
-    cutoff = now - (RETENTION_DAYS * 86400)
-    for file in AUDIT_DIR.glob("*.json"):
-        if file.stat().st_mtime < cutoff:
-            try:
-                file.unlink()
-                print(f"[Cleanup] Deleted old file: {file.name}")
-            except Exception as e:
-                print(f"[Cleanup] Failed to delete {file.name}: {e}")
\ No newline at end of file
+    # Kept for existing callers; covers every configured directory now
+    return run_retention()
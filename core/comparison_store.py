@@ -0,0 +1,83 @@
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from core.config import COMPARISON_DB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS comparisons (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    external TEXT NOT NULL,
+    internal TEXT NOT NULL,
+    compliance_score INTEGER,
+    flag_count INTEGER NOT NULL,
+    risk_flags TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_comparisons_created ON comparisons (created_at);
+-- Serves the latest_only lookup of the newest row per pair
+CREATE INDEX IF NOT EXISTS idx_comparisons_pair ON comparisons (external, internal, id);
+"""
+
+
+class ComparisonStore:
+    """
+    Every regulation/policy comparison result, for portfolio reporting.
+    """
+
+    def __init__(self, db_path=COMPARISON_DB):
+        self.db_path = Path(db_path)
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                self._initialized = True
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, external: str, internal: str, result: dict) -> int:
+        flags = result.get("risk_flags", [])
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO comparisons (created_at, external, internal, compliance_score, flag_count, risk_flags) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (time.time(), external, internal, result.get("compliance_score"), len(flags), json.dumps(flags)))
+            return cursor.lastrowid
+
+    def count(self, since: float = None, latest_only: bool = False) -> int:
+        with self._connect() as conn:
+            query, params = self._query("SELECT COUNT(*) FROM", since, latest_only)
+            return conn.execute(query, params).fetchone()[0]
+
+    def _query(self, select: str, since: float, latest_only: bool):
+        query = f"{select} comparisons c WHERE c.created_at >= ?"
+        params = [since or 0]
+        if latest_only:
+            # Only the newest result for each regulation/policy pair
+            query += (" AND c.id = (SELECT MAX(id) FROM comparisons d"
+                      " WHERE d.external = c.external AND d.internal = c.internal)")
+        return query, params
+
+    def iter_comparisons(self, since: float = None, latest_only: bool = True):
+        """
+        Yields stored comparisons oldest first, one row at a time.
+        """
+        query, params = self._query("SELECT c.* FROM", since, latest_only)
+        with self._connect() as conn:
+            for row in conn.execute(query + " ORDER BY c.id", params):
+                item = dict(row)
+                item["risk_flags"] = json.loads(item["risk_flags"])
+                yield item
+
+
+comparison_store = ComparisonStore()
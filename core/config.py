@@ -9,4 +9,116 @@ AUDIT_DIR = Path("audit_logs")
 AUDIT_DIR.mkdir(exist_ok=True)
 
 RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "7"))
-CLEANUP_INTERVAL_SECONDS = 3600  # in seconds (1 hour)
\ No newline at end of file
+CLEANUP_INTERVAL_SECONDS = 3600  # in seconds (1 hour)
+
+# NLP pipeline settings
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+# When to load the model: "lazy" (first use), "startup" (background load in
+# the lifespan hook) or "import" (in the parent process, before workers fork)
+NLP_PRELOAD = os.getenv("NLP_PRELOAD", "lazy").lower()
+NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", "32"))
+NLP_N_PROCESS = int(os.getenv("NLP_N_PROCESS", "1"))
+NLP_CHUNK_CHARS = int(os.getenv("NLP_CHUNK_CHARS", "20000"))  # max characters per spaCy doc
+NLP_STREAM_BATCH_SIZE = int(os.getenv("NLP_STREAM_BATCH_SIZE", "4"))  # smaller batches for streamed results
+
+# Background job execution
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(min(4, os.cpu_count() or 1))))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))  # queued jobs beyond the running ones
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))  # how long finished jobs stay pollable
+
+# Analysis cache (keyed by PDF content hash)
+ANALYSIS_CACHE_DIR = Path(os.getenv("ANALYSIS_CACHE_DIR", "cache/analysis"))
+ANALYSIS_CACHE_MEMORY_MB = int(os.getenv("ANALYSIS_CACHE_MEMORY_MB", "64"))
+ANALYSIS_CACHE_DISK_MB = int(os.getenv("ANALYSIS_CACHE_DISK_MB", "512"))
+
+# Parallel PDF extraction
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+EXTRACT_PARALLEL_MIN_PAGES = int(os.getenv("EXTRACT_PARALLEL_MIN_PAGES", "100"))  # smaller files are extracted serially
+EXTRACT_RANGE_PAGES = int(os.getenv("EXTRACT_RANGE_PAGES", "25"))  # pages per worker task
+
+# Sentence classification rules (category -> keyword phrases)
+RULES_FILE = Path(os.getenv("RULES_FILE", "assets/rules.json"))
+
+# Risk flagger similarity search
+SIMILARITY_NGRAM = int(os.getenv("SIMILARITY_NGRAM", "3"))  # character n-gram size
+SIMILARITY_TOP_K = int(os.getenv("SIMILARITY_TOP_K", "10"))  # candidates scored exactly per item
+
+# Many-to-many compliance matrix
+MATRIX_WORKERS = int(os.getenv("MATRIX_WORKERS", str(os.cpu_count() or 1)))
+
+# SQLite index over the audit JSON files
+AUDIT_INDEX_DB = Path(os.getenv("AUDIT_INDEX_DB", str(AUDIT_DIR / "index.sqlite3")))
+INTERNAL_POLICY_DIR = AUDIT_DIR / "internal"
+
+# Audit storage backend: "json" (one pretty-printed file per result) or
+# "segment" (compressed records appended to shared segment files)
+AUDIT_STORAGE = os.getenv("AUDIT_STORAGE", "json").lower()
+AUDIT_SEGMENT_DIR = Path(os.getenv("AUDIT_SEGMENT_DIR", str(AUDIT_DIR / "segments")))
+AUDIT_SEGMENT_MAX_MB = int(os.getenv("AUDIT_SEGMENT_MAX_MB", "64"))
+AUDIT_SEGMENT_CODEC = os.getenv("AUDIT_SEGMENT_CODEC", "zstd").lower()  # falls back to zlib without zstandard
+
+# Regulatory crawler
+CRAWLER_SOURCES_FILE = Path(os.getenv("CRAWLER_SOURCES_FILE", "assets/sources.json"))
+CRAWLER_STATE_FILE = Path(os.getenv("CRAWLER_STATE_FILE", "cache/crawler_state.json"))
+CRAWLER_MAX_CONNECTIONS = int(os.getenv("CRAWLER_MAX_CONNECTIONS", "20"))
+CRAWLER_PER_HOST = int(os.getenv("CRAWLER_PER_HOST", "2"))  # concurrent requests per host
+CRAWLER_TIMEOUT_SECONDS = float(os.getenv("CRAWLER_TIMEOUT_SECONDS", "10"))
+CRAWLER_RETRIES = int(os.getenv("CRAWLER_RETRIES", "3"))
+CRAWLER_BACKOFF_SECONDS = float(os.getenv("CRAWLER_BACKOFF_SECONDS", "0.5"))
+
+# Regulation PDF downloads
+DOWNLOAD_DIR = Path("downloads")
+DOWNLOAD_MAX_MB = int(os.getenv("DOWNLOAD_MAX_MB", "200"))
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+# Chunks are buffered and written to disk in blocks of this size
+DOWNLOAD_WRITE_BYTES = 1024 * 1024
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", "4"))
+
+# Incremental re-analysis of amended documents
+INCREMENTAL_ANALYSIS = os.getenv("INCREMENTAL_ANALYSIS", "1") == "1"
+BLOCK_CACHE_DIR = Path(os.getenv("BLOCK_CACHE_DIR", "cache/blocks"))
+DOCUMENT_VERSIONS_DIR = Path(os.getenv("DOCUMENT_VERSIONS_DIR", "cache/documents"))
+
+# Persisted risk-flagger match state for incremental re-comparison
+INCREMENTAL_COMPARE = os.getenv("INCREMENTAL_COMPARE", "1") == "1"
+FLAGGER_STATE_DB = Path(os.getenv("FLAGGER_STATE_DB", "cache/flagger_state.sqlite3"))
+
+# Stored comparison results, for portfolio reports
+COMPARISON_DB = Path(os.getenv("COMPARISON_DB", "reports/comparisons.sqlite3"))
+# FPDF holds every page until output, so the portfolio PDF lists at most this many pairs (the workbook has all)
+PORTFOLIO_PDF_MAX_ROWS = int(os.getenv("PORTFOLIO_PDF_MAX_ROWS", "500"))
+
+# Retention: per-directory age (days) and size (MB) quotas; 0 disables a limit
+AUDIT_RETENTION_MB = int(os.getenv("AUDIT_RETENTION_MB", "0"))
+INTERNAL_RETENTION_DAYS = int(os.getenv("INTERNAL_RETENTION_DAYS", "0"))  # internal policies are kept by default
+INTERNAL_RETENTION_MB = int(os.getenv("INTERNAL_RETENTION_MB", "0"))
+DOWNLOAD_RETENTION_DAYS = int(os.getenv("DOWNLOAD_RETENTION_DAYS", "30"))
+DOWNLOAD_RETENTION_MB = int(os.getenv("DOWNLOAD_RETENTION_MB", "0"))
+REPORT_RETENTION_DAYS = int(os.getenv("REPORT_RETENTION_DAYS", "30"))
+REPORT_RETENTION_MB = int(os.getenv("REPORT_RETENTION_MB", "0"))
+CLEANUP_SCAN_BATCH = int(os.getenv("CLEANUP_SCAN_BATCH", "1000"))
+CLEANUP_DRY_RUN = os.getenv("CLEANUP_DRY_RUN", "0") == "1"
+
+# Profiling of job work per request (?profile=1): "off", "cprofile" or "pyinstrument"
+PROFILING = os.getenv("PROFILING", "off")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+
+# Bulk ingestion (python -m core.ingest)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 2)))
+INGEST_CHECKPOINT_DB = Path(os.getenv("INGEST_CHECKPOINT_DB", "cache/ingest.sqlite3"))
+
+# Job distribution: "local" runs jobs in this process's pool; "broker" queues
+# them in a shared SQLite broker served by `python -m core.worker` on any node.
+# Job results are paths, so with workers on other nodes the API must see the
+# same audit_logs/, downloads/, reports/ and queue/ directories (shared storage).
+JOB_BACKEND = os.getenv("JOB_BACKEND", "local").lower()
+BROKER_DB = Path(os.getenv("BROKER_DB", "queue/broker.sqlite3"))
+BROKER_LEASE_SECONDS = float(os.getenv("BROKER_LEASE_SECONDS", "120"))
+BROKER_MAX_ATTEMPTS = int(os.getenv("BROKER_MAX_ATTEMPTS", "3"))
+BROKER_RETRY_BACKOFF_SECONDS = float(os.getenv("BROKER_RETRY_BACKOFF_SECONDS", "10"))
+BROKER_POLL_SECONDS = float(os.getenv("BROKER_POLL_SECONDS", "0.5"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", str(min(4, os.cpu_count() or 1))))
+# Uploads handed to jobs; must be on storage every worker node can read in broker mode
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "queue/uploads"))
+# Backstop for uploads whose job was lost before it could delete them
+UPLOAD_RETENTION_DAYS = int(os.getenv("UPLOAD_RETENTION_DAYS", "2"))
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+import random
+import re
+import tempfile
+from urllib.parse import urljoin, urlparse
+import httpx
+from bs4 import BeautifulSoup
+from core.config import (
+    CRAWLER_SOURCES_FILE, CRAWLER_STATE_FILE, CRAWLER_MAX_CONNECTIONS, CRAWLER_PER_HOST,
+    CRAWLER_TIMEOUT_SECONDS, CRAWLER_RETRIES, CRAWLER_BACKOFF_SECONDS
+)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_SOURCE = {
+    "href_pattern": r"\.pdf",
+    "text_keywords": ["update", "policy", "regulatory"],
+    "selector": "a",
+}
+
+
+def load_sources(path=CRAWLER_SOURCES_FILE) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def as_source(source) -> dict:
+    """
+    Accepts a bare URL or a source config dict and fills in the defaults.
+    """
+    if isinstance(source, str):
+        source = {"url": source}
+    merged = {**DEFAULT_SOURCE, **source}
+    merged.setdefault("name", urlparse(merged["url"]).netloc)
+    return merged
+
+
+def extract_links(html: str, base_url: str, source: dict) -> list:
+    """
+    Finds document links on a page using the source's selector, href
+    pattern and link-text keywords (no keywords means any link text).
+    """
+    href_re = re.compile(source["href_pattern"], re.IGNORECASE)
+    keywords = [k.lower() for k in source["text_keywords"]]
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    for link in soup.select(source["selector"]):
+        text = link.get_text(strip=True)
+        href = link.get("href")
+        if href and href_re.search(href) and (not keywords or any(k in text.lower() for k in keywords)):
+            links.append({"title": text, "url": urljoin(base_url, href), "source": source["name"]})
+    return links
+
+
+class CrawlState:
+    """
+    Validators (ETag / Last-Modified) and the links extracted from each
+    page, so an unchanged page costs one 304 and no re-parsing.
+    """
+
+    def __init__(self, path=CRAWLER_STATE_FILE):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.pages = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.pages = {}
+
+    def conditional_headers(self, url: str) -> dict:
+        page = self.pages.get(url, {})
+        headers = {}
+        if page.get("etag"):
+            headers["If-None-Match"] = page["etag"]
+        if page.get("last_modified"):
+            headers["If-Modified-Since"] = page["last_modified"]
+        return headers
+
+    def save(self):
+        # Atomic replace, so a crash mid-write leaves the previous state intact
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.pages, f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+class RegulatoryCrawler:
+    """
+    Polls all regulator pages concurrently over one pooled HTTP client.
+
+    Requests are limited per host, retried with exponential backoff on
+    transport errors and 429/5xx responses, and sent as conditional GETs.
+    """
+
+    def __init__(self, sources, state: CrawlState = None, per_host: int = CRAWLER_PER_HOST,
+                 retries: int = CRAWLER_RETRIES, backoff: float = CRAWLER_BACKOFF_SECONDS, transport=None):
+        self.sources = [as_source(s) for s in sources]
+        self.state = state or CrawlState()
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.transport = transport
+        self._host_limits = {}
+
+    def client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=CRAWLER_MAX_CONNECTIONS, max_keepalive_connections=CRAWLER_MAX_CONNECTIONS)
+        return httpx.AsyncClient(timeout=CRAWLER_TIMEOUT_SECONDS, limits=limits,
+                                 follow_redirects=True, transport=self.transport)
+
+    def host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                async with self.host_limit(url):
+                    response = await client.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+            except httpx.TransportError:
+                if attempt >= self.retries:
+                    raise
+            await asyncio.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+            attempt += 1
+
+    async def _crawl_source(self, client: httpx.AsyncClient, source: dict):
+        url = source["url"]
+        response = await self.request(client, "GET", url, headers=self.state.conditional_headers(url))
+        if response.status_code == 304 and url in self.state.pages:
+            return self.state.pages[url]["links"], "not_modified"
+        if response.status_code == 304:
+            # Nothing stored to reuse (e.g. a cache in between answered for
+            # validators we never sent): ask for a full response instead
+            response = await self.request(client, "GET", url, headers={"Cache-Control": "no-cache"})
+        response.raise_for_status()
+
+        links = extract_links(response.text, url, source)
+        self.state.pages[url] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "links": links,
+        }
+        return links, "fetched"
+
+    async def crawl(self, client: httpx.AsyncClient = None):
+        """
+        Returns (updates, statuses) where statuses maps source name to
+        "fetched", "not_modified" or an error message.
+        """
+        if client is None:
+            async with self.client() as client:
+                return await self.crawl(client)
+
+        results = await asyncio.gather(*(self._crawl_source(client, s) for s in self.sources), return_exceptions=True)
+        updates = []
+        statuses = {}
+        for source, result in zip(self.sources, results):
+            if isinstance(result, Exception):
+                updates.append({"error": f"Failed to fetch from {source['url']}: {result}"})
+                statuses[source["name"]] = f"error: {result}"
+            else:
+                links, status = result
+                updates.extend(links)
+                statuses[source["name"]] = status
+        await asyncio.to_thread(self.state.save)
+        return updates, statuses
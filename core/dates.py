@@ -0,0 +1,78 @@
+import re
+from datetime import date
+from functools import lru_cache
+
+MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+_MONTH = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+
+ISO_RE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+DMY_NUMERIC_RE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})\b")
+DAY_MONTH_YEAR_RE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?(?:\s+day)?(?:\s+of)?\s+" + _MONTH + r",?\s+(\d{4})\b", re.IGNORECASE)
+MONTH_DAY_YEAR_RE = re.compile(r"\b" + _MONTH + r"\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})\b", re.IGNORECASE)
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "fifteen": 15, "twenty": 20, "thirty": 30, "forty-five": 45,
+    "sixty": 60, "ninety": 90
+}
+UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+# "30 days", "thirty (30) days", "two weeks"
+RELATIVE_RE = re.compile(
+    r"\b(\d+|" + "|".join(NUMBER_WORDS) + r")\s*(?:\((\d+)\)\s*)?(?:calendar\s+|working\s+)?(day|week|month|year)s?\b",
+    re.IGNORECASE)
+
+
+def _safe_date(year: int, month: int, day: int):
+    if year < 100:
+        year += 2000
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _parse_absolute(text: str):
+    match = ISO_RE.search(text)
+    if match:
+        return _safe_date(int(match[1]), int(match[2]), int(match[3]))
+    match = DMY_NUMERIC_RE.search(text)
+    if match:
+        # Indian notifications write numeric dates day first
+        return _safe_date(int(match[3]), int(match[2]), int(match[1]))
+    match = DAY_MONTH_YEAR_RE.search(text)
+    if match:
+        return _safe_date(int(match[3]), MONTHS[match[2].lower()], int(match[1]))
+    match = MONTH_DAY_YEAR_RE.search(text)
+    if match:
+        return _safe_date(int(match[3]), MONTHS[match[1].lower()], int(match[2]))
+    return None
+
+
+def _parse_relative(text: str):
+    match = RELATIVE_RE.search(text)
+    if not match:
+        return None
+    amount = match[2] or match[1]
+    count = int(amount) if amount.isdigit() else NUMBER_WORDS[amount.lower()]
+    return count * UNIT_DAYS[match[3].lower()]
+
+
+@lru_cache(maxsize=4096)
+def _normalize(text: str):
+    parsed = _parse_absolute(text)
+    if parsed is not None:
+        return parsed.isoformat(), None
+    return None, _parse_relative(text)
+
+
+def normalize_date(text: str) -> dict:
+    """
+    Normalizes a DATE entity string.
+
+    Absolute dates ("31st March 2025", "31/03/2025", "2025-03-31") get an ISO
+    "iso" value; durations ("within 30 days", "thirty (30) days") get
+    "relative_days". Anything else keeps both as None.
+    """
+    iso, relative_days = _normalize(text.strip())
+    return {"text": text, "iso": iso, "relative_days": relative_days}
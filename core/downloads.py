@@ -0,0 +1,307 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlparse
+import httpx
+from core.config import (
+    DOWNLOAD_DIR, DOWNLOAD_MAX_MB, DOWNLOAD_CHUNK_BYTES, DOWNLOAD_WRITE_BYTES, DOWNLOAD_CONCURRENCY, CRAWLER_RETRIES,
+)
+from core.crawler import RETRY_STATUSES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    sha256 TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    source TEXT,
+    title TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    downloaded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_downloads_url ON downloads (url);
+"""
+
+
+class DownloadTooLarge(Exception):
+    pass
+
+
+class DownloadManifest:
+    """
+    Provenance of every downloaded PDF, keyed by content hash.
+    """
+
+    def __init__(self, db_path=DOWNLOAD_DIR / "manifest.sqlite3"):
+        self.db_path = Path(db_path)
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                self._initialized = True
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def by_hash(self, sha256: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM downloads WHERE sha256 = ?", (sha256,)).fetchone()
+        return dict(row) if row else None
+
+    def by_url(self, url: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM downloads WHERE url = ? ORDER BY downloaded_at DESC LIMIT 1", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def remove_path(self, path):
+        # Called by retention when a downloaded file is deleted
+        with self._connect() as conn:
+            conn.execute("DELETE FROM downloads WHERE path = ?", (str(path),))
+
+    def add(self, record: dict):
+        columns = ", ".join(record)
+        placeholders = ", ".join(f":{c}" for c in record)
+        with self._connect() as conn:
+            conn.execute(f"INSERT OR REPLACE INTO downloads ({columns}) VALUES ({placeholders})", record)
+
+
+download_manifest = DownloadManifest()
+
+
+def _range_start(response: httpx.Response):
+    # "bytes <start>-<end>/<total>"; None if the header is missing or malformed
+    unit, _, spec = response.headers.get("Content-Range", "").partition(" ")
+    start = spec.partition("-")[0]
+    return int(start) if unit == "bytes" and start.isdigit() else None
+
+
+def _write_and_close(f, data: bytes):
+    try:
+        if data:
+            f.write(data)
+    finally:
+        f.close()
+
+
+class DownloadManager:
+    """
+    Streams PDFs to disk in chunks while hashing them.
+
+    Each download goes to downloads/.partial/<url hash>.part first, with the
+    response's validators in a .meta file next to it; an interrupted
+    download resumes from there with a Range request guarded by If-Range. A
+    .part that was already complete (416 for the remaining range) is
+    finalized as is, and one that can't be resumed, or whose 206 starts
+    somewhere other than its end, is fetched again. Transport errors and
+    retryable statuses are retried with backoff. Files over max_bytes are
+    abandoned. A finished file whose hash is already in the manifest is
+    discarded as a duplicate, and a URL already in the manifest is
+    re-checked with a conditional GET. File I/O runs in threads, in blocks
+    of DOWNLOAD_WRITE_BYTES, so the crawl's event loop never blocks on disk.
+    """
+
+    def __init__(self, crawler, download_dir=DOWNLOAD_DIR, manifest: DownloadManifest = download_manifest,
+                 max_bytes: int = DOWNLOAD_MAX_MB * 1024 * 1024, concurrency: int = DOWNLOAD_CONCURRENCY):
+        self.crawler = crawler
+        self.download_dir = Path(download_dir)
+        self.partial_dir = self.download_dir / ".partial"
+        self.manifest = manifest
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+
+    def _partial_path(self, url: str) -> Path:
+        return self.partial_dir / f"{hashlib.sha1(url.encode()).hexdigest()}.part"
+
+    def _final_path(self, url: str, sha256: str) -> Path:
+        name = os.path.basename(urlparse(url).path) or f"{sha256[:16]}.pdf"
+        path = self.download_dir / name
+        if path.exists():
+            # Never overwrite a different document that shares the basename
+            path = path.with_name(f"{path.stem}_{sha256[:8]}{path.suffix}")
+        return path
+
+    def _hash_existing(self, path: Path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_BYTES), b""):
+                digest.update(chunk)
+        return digest
+
+    def _resume_state(self, part: Path):
+        # Returns (bytes already on disk, validator they were fetched under)
+        if not part.exists():
+            return 0, None
+        meta = part.with_suffix(".meta")
+        validator = json.loads(meta.read_text()).get("validator") if meta.exists() else None
+        return part.stat().st_size, validator
+
+    def _discard_partial(self, part: Path):
+        part.unlink(missing_ok=True)
+        part.with_suffix(".meta").unlink(missing_ok=True)
+
+    async def _stream_once(self, client: httpx.AsyncClient, url: str, part: Path, known: dict):
+        headers = {}
+        meta = part.with_suffix(".meta")
+        offset, validator = await asyncio.to_thread(self._resume_state, part)
+        if offset and validator:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+        elif known:
+            if known.get("etag"):
+                headers["If-None-Match"] = known["etag"]
+            if known.get("last_modified"):
+                headers["If-Modified-Since"] = known["last_modified"]
+
+        async with self.crawler.host_limit(url):
+            async with client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304:
+                    # Unchanged since the manifest copy, so any .part left behind is stale
+                    await asyncio.to_thread(self._discard_partial, part)
+                    return None
+                if response.status_code == 416 and offset:
+                    # Nothing left past the offset: the .part finished before the
+                    # process died, unless the file changed size since
+                    total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                    if total.isdigit() and int(total) == offset:
+                        digest = await asyncio.to_thread(self._hash_existing, part)
+                        return {
+                            "sha256": digest.hexdigest(),
+                            "size": offset,
+                            "etag": response.headers.get("ETag"),
+                            "last_modified": response.headers.get("Last-Modified"),
+                        }
+                    restart = True
+                elif response.status_code == 206 and _range_start(response) != offset:
+                    # Appending bytes from anywhere else would corrupt the file
+                    restart = True
+                else:
+                    restart = False
+                    if response.status_code == 206:
+                        digest = await asyncio.to_thread(self._hash_existing, part)
+                        mode = "ab"
+                    else:
+                        response.raise_for_status()
+                        # Server ignored the range (or nothing to resume): start over
+                        digest = hashlib.sha256()
+                        offset = 0
+                        mode = "wb"
+                        validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+                        await asyncio.to_thread(meta.write_text, json.dumps({"validator": validator}))
+
+                    length = response.headers.get("Content-Length")
+                    if length and offset + int(length) > self.max_bytes:
+                        raise DownloadTooLarge(f"{url} is {offset + int(length)} bytes (limit {self.max_bytes}).")
+
+                    size = offset
+                    buffer = bytearray()
+                    f = await asyncio.to_thread(open, part, mode)
+                    try:
+                        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                            size += len(chunk)
+                            if size > self.max_bytes:
+                                raise DownloadTooLarge(f"{url} exceeded {self.max_bytes} bytes.")
+                            digest.update(chunk)
+                            buffer += chunk
+                            if len(buffer) >= DOWNLOAD_WRITE_BYTES:
+                                await asyncio.to_thread(f.write, bytes(buffer))
+                                buffer.clear()
+                    finally:
+                        # Flushed even on a dropped connection so the retry resumes after it
+                        await asyncio.to_thread(_write_and_close, f, bytes(buffer))
+
+                    return {
+                        "sha256": digest.hexdigest(),
+                        "size": size,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }
+
+        if restart:
+            # The .part can't be resumed: drop it and fetch from the start
+            await asyncio.to_thread(self._discard_partial, part)
+            return await self._stream_once(client, url, part, known)
+
+    async def download(self, client: httpx.AsyncClient, update: dict) -> dict:
+        """
+        Downloads one update's PDF and returns its provenance record, with
+        "status" set to downloaded, duplicate or not_modified.
+        """
+        url = update["url"]
+        known = await asyncio.to_thread(self.manifest.by_url, url)
+        if known and not await asyncio.to_thread(Path(known["path"]).exists):
+            # Deleted outside retention: a 304 would point at a missing file, so fetch it again
+            await asyncio.to_thread(self.manifest.remove_path, known["path"])
+            known = None
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        part = self._partial_path(url)
+
+        attempt = 0
+        while True:
+            try:
+                result = await self._stream_once(client, url, part, known)
+                break
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                # Whatever arrived stays in the .part file for the next attempt
+                if attempt >= CRAWLER_RETRIES or (
+                        isinstance(e, httpx.HTTPStatusError) and e.response.status_code not in RETRY_STATUSES):
+                    raise
+                await asyncio.sleep(self.crawler.backoff * (2 ** attempt))
+                attempt += 1
+            except DownloadTooLarge:
+                await asyncio.to_thread(self._discard_partial, part)
+                raise
+
+        await asyncio.to_thread(part.with_suffix(".meta").unlink, missing_ok=True)
+        if result is None:
+            return {**known, "status": "not_modified"}
+
+        existing = await asyncio.to_thread(self.manifest.by_hash, result["sha256"])
+        if existing and Path(existing["path"]).exists():
+            await asyncio.to_thread(part.unlink)
+            return {**existing, "status": "duplicate"}
+
+        final = self._final_path(url, result["sha256"])
+        await asyncio.to_thread(os.replace, part, final)
+        record = {
+            **result,
+            "url": url,
+            "path": str(final),
+            "source": update.get("source"),
+            "title": update.get("title"),
+            "downloaded_at": time.time(),
+        }
+        await asyncio.to_thread(self.manifest.add, record)
+        return {**record, "status": "downloaded"}
+
+    async def download_all(self, client: httpx.AsyncClient, updates: list) -> list:
+        """
+        Downloads every update with a URL concurrently; returns one record
+        or {"error": ...} per update, in order.
+        """
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def run(update):
+            async with limit:
+                try:
+                    return await self.download(client, update)
+                except Exception as e:
+                    return {"error": str(e)}
+
+        # The same PDF is often linked from several pages
+        unique = list({u["url"]: u for u in updates if "url" in u}.values())
+        results = dict(zip([u["url"] for u in unique], await asyncio.gather(*(run(u) for u in unique))))
+        return [results.get(u.get("url")) for u in updates]
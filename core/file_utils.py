@@ -1,20 +1,208 @@
 import pymupdf  # PyMuPDF
 from pathlib import Path
 from datetime import datetime
+from contextlib import contextmanager
 import json
-from core.config import AUDIT_DIR
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from core.audit_index import EXTERNAL
+from core.audit_store import write_audit
+from core.config import AUDIT_DIR, EXTRACT_WORKERS, EXTRACT_PARALLEL_MIN_PAGES, EXTRACT_RANGE_PAGES
+from core.jobs import nested_workers
+from core.metrics import metrics, instrument, timed_iter, reset_worker_metrics, run_drained
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+@instrument("hashing")
+def sha256_stream(fileobj) -> str:
+    """
+    Hashes a binary file object in chunks and rewinds it for the next reader.
+    """
+    fileobj = binary_file(fileobj)
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+@instrument("hashing")
+def sha256_file(path) -> str:
+    with open(path, "rb") as f:
+        return sha256_stream(f)
+
+def binary_file(source):
+    """
+    Returns the underlying binary file object of an upload (FastAPI UploadFile
+    exposes it as .file; Streamlit uploads and plain file objects are used as is).
+    """
+    return getattr(source, "file", source)
+
+@contextmanager
+def open_pdf(source):
+    """
+    Opens a PDF from a path or an uploaded file without reading it into memory.
+
+    MuPDF needs random access, so uploads that are not already backed by a
+    named file on disk are copied to a temporary file in chunks first.
+    """
+    tmp_path = None
+    if isinstance(source, (str, os.PathLike)):
+        path = source
+    else:
+        fileobj = binary_file(source)
+        fileobj.seek(0)
+        name = getattr(fileobj, "name", None)
+        if isinstance(name, str) and os.path.isfile(name):
+            path = name
+        else:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+                shutil.copyfileobj(fileobj, tmp, HASH_CHUNK_SIZE)
+            path = tmp_path = tmp.name
+    try:
+        with pymupdf.open(path) as doc:
+            yield doc
+    finally:
+        if tmp_path:
+            os.unlink(tmp_path)
+
+def _extract_page_range(path: str, start: int, stop: int) -> list:
+    # Runs in a worker process, which opens the file on its own
+    with pymupdf.open(path) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+def _iter_pages_parallel(path: str, page_count: int, workers: int):
+    """
+    Extracts page ranges in a process pool and yields pages in order.
+
+    Only workers * 2 ranges are in flight at a time, so a slow consumer
+    does not cause the whole document to pile up in memory.
+    """
+    ranges = deque((start, min(start + EXTRACT_RANGE_PAGES, page_count))
+                   for start in range(0, page_count, EXTRACT_RANGE_PAGES))
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=reset_worker_metrics) as executor:
+        while ranges or pending:
+            while ranges and len(pending) < workers * 2:
+                start, stop = ranges.popleft()
+                pending.append(executor.submit(run_drained, _extract_page_range, path, start, stop))
+            texts, snap = pending.popleft().result()
+            metrics.merge(snap)
+            yield from texts
+
+def iter_pdf_pages(source, workers: int = EXTRACT_WORKERS):
+    """
+    Yields the text of each page in turn without holding the whole document.
+
+    Documents with at least EXTRACT_PARALLEL_MIN_PAGES pages are split into
+    page ranges extracted by up to `workers` processes (capped to this
+    process's share of the CPUs inside a job worker); smaller ones are
+    read serially in this process.
+    """
+    workers = nested_workers(workers)
+    with open_pdf(source) as doc:
+        page_count = doc.page_count
+        start = time.perf_counter()
+        parallel = workers > 1 and page_count >= EXTRACT_PARALLEL_MIN_PAGES
+        if parallel:
+            pages = _iter_pages_parallel(doc.name, page_count, workers)
+        else:
+            pages = (page.get_text() for page in doc)
+        # Only the time spent producing pages counts, not what the consumer does between them
+        yield from timed_iter("pdf_extraction", pages, counter="pages")
+        elapsed = time.perf_counter() - start
+        if parallel:
+            logger.info("[Extract] %d pages in %.2fs with %d workers", page_count, elapsed, workers)
+
+def extraction_speedup(path, workers: int = EXTRACT_WORKERS) -> dict:
+    """
+    Times serial against parallel extraction of one PDF.
+    """
+    with pymupdf.open(path) as doc:
+        page_count = doc.page_count
+
+    start = time.perf_counter()
+    serial_pages = _extract_page_range(str(path), 0, page_count)
+    serial_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel_pages = list(_iter_pages_parallel(str(path), page_count, workers))
+    parallel_seconds = time.perf_counter() - start
+
+    return {
+        "pages": page_count,
+        "workers": workers,
+        "serial_seconds": round(serial_seconds, 3),
+        "parallel_seconds": round(parallel_seconds, 3),
+        "speedup": round(serial_seconds / parallel_seconds, 2) if parallel_seconds else None,
+        "identical": serial_pages == parallel_pages
+    }
 
 def extract_text_from_pdf(pdf_file) -> str:
-    text = ""
-    with pymupdf.open(stream=pdf_file.file.read(), filetype="pdf") as doc:
-        for page in doc:
-            text += page.get_text()
-    return text
+    # Pages are separated by form feeds so the analyzer can chunk per page
+    return "\f".join(iter_pdf_pages(pdf_file))
+
+class _ZipChunks:
+    """
+    Write-only sink that lets zipfile stream into a generator.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def iter_zip_stream(paths, chunk_size: int = HASH_CHUNK_SIZE, delete: bool = False):
+    """
+    Yields a zip archive of the given files chunk by chunk, reading each
+    file in pieces, so archives of any size stream with bounded memory.
+    With delete, the files are removed once the stream ends or is closed.
+    """
+    try:
+        sink = _ZipChunks()
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for path in paths:
+                path = Path(path)
+                with open(path, "rb") as src, archive.open(path.name, "w") as dest:
+                    for chunk in iter(lambda: src.read(chunk_size), b""):
+                        dest.write(chunk)
+                        yield sink.drain()
+                yield sink.drain()
+        yield sink.drain()
+    finally:
+        if delete:
+            for path in paths:
+                Path(path).unlink(missing_ok=True)
 
-def save_json_audit(data: dict, original_filename: str) -> str:
+@instrument("audit_save")
+def save_json_audit(data: dict, original_filename: str, source_hash: str = None) -> str:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     name = original_filename.replace(".pdf", "").replace(" ", "_")
-    output_path = AUDIT_DIR / f"{name}_{timestamp}.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
-    return str(output_path)
\ No newline at end of file
+    # The suffix keeps same-second saves of one document (other workers or nodes) from clobbering each other
+    output_path = AUDIT_DIR / f"{name}_{timestamp}_{uuid.uuid4().hex[:6]}.json"
+    return write_audit(output_path, data, EXTERNAL, indent=4, source_hash=source_hash)
\ No newline at end of file
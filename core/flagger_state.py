@@ -0,0 +1,122 @@
+import hashlib
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from core.config import FLAGGER_STATE_DB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pair_scores (
+    a TEXT NOT NULL,
+    b TEXT NOT NULL,
+    ratio REAL NOT NULL,
+    PRIMARY KEY (a, b)
+);
+CREATE TABLE IF NOT EXISTS item_state (
+    category TEXT NOT NULL,
+    item TEXT NOT NULL,
+    threshold REAL NOT NULL,
+    fingerprint TEXT NOT NULL,
+    matched INTEGER NOT NULL,
+    partner TEXT,
+    score REAL NOT NULL,
+    PRIMARY KEY (category, item, threshold, fingerprint)
+);
+"""
+
+
+def fingerprint(hashes) -> str:
+    """
+    Identifies one exact set of internal item hashes.
+    """
+    return hashlib.sha256("\n".join(sorted(hashes)).encode()).hexdigest()[:20]
+
+
+class FlaggerState:
+    """
+    Persisted match state for the risk flagger, keyed by item hash.
+
+    pair_scores memoizes exact similarity ratios between an external and an
+    internal item. item_state records each external item's decision (best
+    partner, score, matched) against a given set of internal items,
+    identified by its fingerprint. A re-run against the same internal set
+    reuses decisions outright; against a changed set it re-ranks candidates
+    but only scores pairs it has never seen. prune() drops state for
+    internal policies that no longer exist, so the database doesn't grow
+    with every policy version ever compared.
+    """
+
+    def __init__(self, db_path=FLAGGER_STATE_DB):
+        self.db_path = Path(db_path)
+        self._initialized = False
+
+    @contextmanager
+    def session(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                self._initialized = True
+            session = FlaggerSession(conn)
+            yield session
+            session.flush()
+            conn.commit()
+        finally:
+            conn.close()
+
+    def prune(self, fingerprints, item_hashes) -> dict:
+        """
+        Deletes decisions whose internal item set (fingerprint) is not among
+        fingerprints, and pair scores whose internal item is not among
+        item_hashes. Returns the number of rows deleted from each table.
+        """
+        with self.session() as session:
+            conn = session.conn
+            conn.execute("CREATE TEMP TABLE current_fingerprints (fingerprint TEXT PRIMARY KEY)")
+            conn.execute("CREATE TEMP TABLE current_items (item TEXT PRIMARY KEY)")
+            conn.executemany("INSERT OR IGNORE INTO current_fingerprints VALUES (?)", ((f,) for f in fingerprints))
+            conn.executemany("INSERT OR IGNORE INTO current_items VALUES (?)", ((h,) for h in item_hashes))
+            items = conn.execute("DELETE FROM item_state WHERE fingerprint NOT IN "
+                                 "(SELECT fingerprint FROM current_fingerprints)").rowcount
+            pairs = conn.execute("DELETE FROM pair_scores WHERE b NOT IN (SELECT item FROM current_items)").rowcount
+        return {"item_rows": items, "pair_rows": pairs}
+
+
+class FlaggerSession:
+    """
+    One comparison's view of the state; new scores and decisions are
+    buffered and written in one batch when the session closes.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.new_pairs = []
+        self.new_items = []
+        self.stats = {"items_reused": 0, "items_recomputed": 0, "pairs_reused": 0, "pairs_recomputed": 0}
+
+    def decisions(self, category: str, threshold: float, fingerprint: str) -> dict:
+        rows = self.conn.execute(
+            "SELECT item, matched, partner, score FROM item_state WHERE category = ? AND threshold = ? AND fingerprint = ?",
+            (category, threshold, fingerprint))
+        return {item: (bool(matched), partner, score) for item, matched, partner, score in rows}
+
+    def known_scores(self, a: str) -> dict:
+        return dict(self.conn.execute("SELECT b, ratio FROM pair_scores WHERE a = ?", (a,)))
+
+    def add_pair(self, a: str, b: str, ratio: float):
+        self.new_pairs.append((a, b, ratio))
+        self.stats["pairs_recomputed"] += 1
+
+    def add_decision(self, category: str, item: str, threshold: float, fingerprint: str,
+                     matched: bool, partner: str, score: float):
+        self.new_items.append((category, item, threshold, fingerprint, int(matched), partner, score))
+
+    def flush(self):
+        self.conn.executemany("INSERT OR REPLACE INTO pair_scores VALUES (?, ?, ?)", self.new_pairs)
+        self.conn.executemany("INSERT OR REPLACE INTO item_state VALUES (?, ?, ?, ?, ?, ?, ?)", self.new_items)
+        self.new_pairs = []
+        self.new_items = []
+
+
+flagger_state = FlaggerState()
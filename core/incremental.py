@@ -0,0 +1,154 @@
+"""
+Incremental re-analysis of amended documents.
+
+Every analyzed chunk (page or paragraph group, see iter_chunks) is cached
+by the hash of its text, and each document's chunk-hash list is stored
+under a key derived from its source URL (or filename, see document_key). When a new version of a known
+document arrives, only chunks whose text is new go through spaCy; the
+rest reuse their cached results. The merged result carries an
+"amendments" delta against the previous version.
+"""
+import hashlib
+import json
+import os
+import re
+from collections import deque
+from urllib.parse import urlparse
+from core.analyzer import iter_page_chunks, analyze_chunk_stream, merge_results
+from core.cache import AnalysisCache
+from core.config import BLOCK_CACHE_DIR, DOCUMENT_VERSIONS_DIR, NLP_BATCH_SIZE, NLP_STREAM_BATCH_SIZE
+from core.rules import rule_categories
+
+block_cache = AnalysisCache(cache_dir=BLOCK_CACHE_DIR)
+
+# Explicit trailing version markers only: v2, rev3, "amended", "revised" and
+# "(1)". Bare numbers are left alone, since order and notification numbers
+# are what tell documents apart.
+VERSION_SUFFIX_RE = re.compile(r"((?:[ _\-.]+(?:v\d+|rev\d*|amend\w*|revised))|[ _\-.]*\(\d+\))+$", re.IGNORECASE)
+
+
+def document_key(filename: str, url: str = None) -> str:
+    """
+    Identity shared by successive versions of a document, e.g.
+    'MNRE_Guidelines_v2.pdf' and 'MNRE Guidelines (1).pdf'. Downloaded
+    documents are keyed on their source URL instead, which also ignores
+    the hash suffix the download manager adds to avoid overwrites.
+    """
+    prefix = ""
+    if url:
+        parsed = urlparse(url)
+        prefix = f"{parsed.netloc}_"
+        filename = os.path.basename(parsed.path) or filename
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    key = VERSION_SUFFIX_RE.sub("", stem) or stem
+    return re.sub(r"[^a-z0-9]+", "_", (prefix + key).lower()).strip("_")
+
+
+def _chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+def _versions_path(key: str):
+    return DOCUMENT_VERSIONS_DIR / f"{key}.json"
+
+
+def _load_previous(key: str):
+    try:
+        with open(_versions_path(key), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _save_version(key: str, source_sha256: str, hashes: list):
+    DOCUMENT_VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    path = _versions_path(key)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"source_sha256": source_sha256, "chunks": hashes}, f)
+    os.replace(tmp_path, path)
+
+
+def _sentences_by_category(results) -> dict:
+    delta = {}
+    for category in rule_categories():
+        sentences = [s for r in results for s in r.get(category, [])]
+        if sentences:
+            delta[category] = sentences
+    return delta
+
+
+def analyze_incremental(pages, filename: str, source_sha256: str = None, url: str = None) -> dict:
+    """
+    Analyzes a document, re-running NLP only on chunks not seen before.
+    Pages are consumed lazily; only chunk hashes and results are kept.
+    """
+    for event in stream_incremental(pages, filename, source_sha256, url, batch_size=NLP_BATCH_SIZE):
+        if event[0] == "result":
+            return event[1]
+
+
+def stream_incremental(pages, filename: str, source_sha256: str = None, url: str = None,
+                       batch_size: int = NLP_STREAM_BATCH_SIZE):
+    """
+    Streaming form of analyze_incremental(). Yields ("chunk", page number,
+    result) for every chunk as soon as it is available (cached chunks
+    straight away, new ones as spaCy finishes them), then ("result", merged)
+    with the same content analyze_incremental() would return.
+    """
+    hashes = []
+    results = {}
+    ready = deque()
+
+    def uncached():
+        # Feeds only new chunks to spaCy; cached ones queue up for the caller
+        for number, chunk in iter_page_chunks(pages):
+            h = _chunk_hash(chunk)
+            hashes.append(h)
+            if h in results:
+                continue
+            cached = block_cache.get(h)
+            results[h] = cached
+            if cached is None:
+                yield chunk, (number, h)
+            else:
+                ready.append((number, cached))
+
+    reanalyzed = 0
+    for (number, h), result in analyze_chunk_stream(uncached(), batch_size):
+        while ready:
+            yield ("chunk",) + ready.popleft()
+        block_cache.put(h, result)
+        results[h] = result
+        reanalyzed += 1
+        yield "chunk", number, result
+    while ready:
+        yield ("chunk",) + ready.popleft()
+
+    yield "result", _finish(hashes, results, reanalyzed, document_key(filename, url), source_sha256)
+
+
+def _finish(hashes: list, results: dict, reanalyzed: int, key: str, source_sha256: str) -> dict:
+    """
+    Merges the chunk results and records this version, adding the
+    amendment delta when it replaces an earlier version.
+    """
+    merged = merge_results(results[h] for h in hashes)
+
+    previous = _load_previous(key)
+    if previous and previous.get("source_sha256") != source_sha256:
+        old, new = set(previous["chunks"]), set(hashes)
+        added = [results[h] for h in dict.fromkeys(hashes) if h not in old]
+        # Removed chunks are only described if still in the block cache
+        removed = [r for r in (block_cache.get(h) for h in dict.fromkeys(previous["chunks"]) if h not in new) if r]
+        merged["amendments"] = {
+            "previous_sha256": previous.get("source_sha256"),
+            "total_blocks": len(hashes),
+            "changed_blocks": len(new - old),
+            "removed_blocks": len(old - new),
+            "reanalyzed_blocks": reanalyzed,
+            "added": _sentences_by_category(added),
+            "removed": _sentences_by_category(removed),
+        }
+    _save_version(key, source_sha256, hashes)
+    return merged
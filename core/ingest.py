@@ -0,0 +1,221 @@
+"""
+Bulk ingestion of a directory tree of regulation PDFs.
+
+Every PDF under the root is extracted and analyzed in a process pool (each
+worker loads the model once) and saved through save_json_audit, exactly as
+/documents/analyze-latest would. Progress is checkpointed in SQLite after
+every document, so an interrupted run picks up where it stopped; files
+whose content is already in the audit index are skipped.
+
+    python -m core.ingest /data/mnre_archive --workers 8
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, ALL_COMPLETED, FIRST_COMPLETED
+from contextlib import contextmanager
+from pathlib import Path
+from core.config import INGEST_WORKERS, INGEST_CHECKPOINT_DB
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingested (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    status TEXT NOT NULL,
+    sha256 TEXT,
+    audit_path TEXT,
+    pages INTEGER,
+    error TEXT,
+    finished_at REAL NOT NULL
+);
+"""
+
+
+class IngestCheckpoint:
+    """
+    Per-file outcome of earlier runs; a file is done once it is recorded
+    with the same size and mtime it has now.
+    """
+
+    def __init__(self, db_path=INGEST_CHECKPOINT_DB):
+        self.db_path = Path(db_path)
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                self._initialized = True
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def completed(self) -> dict:
+        """
+        Maps path -> (size, mtime) for every file that needs no more work.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT path, size, mtime FROM ingested WHERE status IN ('saved', 'duplicate')")
+            return {row["path"]: (row["size"], row["mtime"]) for row in rows}
+
+    def record(self, path: str, size: int, mtime: float, outcome: dict):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ingested (path, size, mtime, status, sha256, audit_path, pages, error, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime, outcome["status"], outcome.get("sha256"), outcome.get("audit_path"),
+                 outcome.get("pages"), outcome.get("error"), time.time()))
+
+    def summary(self) -> dict:
+        with self._connect() as conn:
+            return {row[0]: row[1] for row in conn.execute("SELECT status, COUNT(*) FROM ingested GROUP BY status")}
+
+
+def iter_pdfs(root: Path):
+    """
+    Yields (path, size, mtime) for every PDF under root, in a stable order.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(".pdf"):
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+
+def _init_worker(pool_size: int):
+    from core.jobs import mark_job_worker
+    from core.models import prewarm
+    # Keeps nested extraction pools to this worker's share of the CPUs
+    mark_job_worker(pool_size)
+    prewarm(freeze=False)
+
+
+def ingest_file(path: str, audit_name: str) -> dict:
+    """
+    Analyzes and saves one PDF inside a pool worker; returns its outcome.
+    """
+    from core.analyzer import analyze_pages
+    from core.audit_index import audit_index, EXTERNAL
+    from core.cache import analysis_cache
+    from core.file_utils import iter_pdf_pages, open_pdf, sha256_file, save_json_audit
+
+    try:
+        digest = sha256_file(path)
+        existing = audit_index.find_by_source_hash(digest, EXTERNAL)
+        if existing and audit_index.exists(existing):
+            return {"status": "duplicate", "sha256": digest, "audit_path": existing["path"], "pages": 0}
+
+        with open_pdf(path) as doc:
+            pages = doc.page_count
+        # One process per document already; don't fan extraction out any further
+        result = analysis_cache.get_or_compute(digest, lambda: analyze_pages(iter_pdf_pages(path, workers=1)))
+        result["filename"] = os.path.basename(path)
+        result["source_sha256"] = digest
+        result["source_path"] = path
+        audit_path = save_json_audit(result, audit_name, source_hash=digest)
+        return {"status": "saved", "sha256": digest, "audit_path": str(audit_path), "pages": pages}
+    except Exception as e:
+        return {"status": "failed", "error": f"{type(e).__name__}: {e}", "pages": 0}
+
+
+def _audit_name(root: Path, path: str) -> str:
+    # Archives reuse names like "notification.pdf" across folders, so keep the relative path
+    relative = os.path.relpath(path, root)
+    return relative.replace(os.sep, "__")
+
+
+def ingest(root, workers: int = INGEST_WORKERS, checkpoint: IngestCheckpoint = None,
+           progress_every: int = 25) -> dict:
+    # Absolute paths, so resuming from another working directory still matches the checkpoint
+    root = Path(root).resolve()
+    checkpoint = checkpoint or IngestCheckpoint()
+    done = checkpoint.completed()
+
+    counts = {"saved": 0, "duplicate": 0, "failed": 0, "skipped": 0}
+    pages = 0
+    start = time.perf_counter()
+
+    def report(final: bool = False):
+        elapsed = time.perf_counter() - start
+        processed = counts["saved"] + counts["duplicate"] + counts["failed"]
+        logger.info("[Ingest] %d docs (%d saved, %d duplicate, %d failed, %d already done) in %.1fs - "
+                    "%.2f docs/s, %.1f pages/s%s",
+                    processed, counts["saved"], counts["duplicate"], counts["failed"], counts["skipped"], elapsed,
+                    processed / elapsed if elapsed else 0, pages / elapsed if elapsed else 0,
+                    " [done]" if final else "")
+
+    # Keep a bounded window of documents in flight so huge trees aren't all queued up front
+    max_in_flight = workers * 4
+    in_flight = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(workers,)) as executor:
+        def drain(return_when):
+            nonlocal pages
+            finished, _ = wait(in_flight, return_when=return_when)
+            for future in finished:
+                path, size, mtime = in_flight.pop(future)
+                outcome = future.result()
+                checkpoint.record(path, size, mtime, outcome)
+                counts[outcome["status"]] += 1
+                pages += outcome.get("pages") or 0
+                if outcome["status"] == "failed":
+                    logger.warning("[Ingest] Failed %s: %s", path, outcome["error"])
+                processed = counts["saved"] + counts["duplicate"] + counts["failed"]
+                if processed % progress_every == 0:
+                    report()
+
+        for path, size, mtime in iter_pdfs(root):
+            if done.get(path) == (size, mtime):
+                counts["skipped"] += 1
+                continue
+            future = executor.submit(ingest_file, path, _audit_name(root, path))
+            in_flight[future] = (path, size, mtime)
+            if len(in_flight) >= max_in_flight:
+                drain(FIRST_COMPLETED)
+        if in_flight:
+            drain(ALL_COMPLETED)
+
+    report(final=True)
+    elapsed = time.perf_counter() - start
+    processed = counts["saved"] + counts["duplicate"] + counts["failed"]
+    return {**counts, "pages": pages, "seconds": round(elapsed, 2),
+            "docs_per_second": round(processed / elapsed, 2) if elapsed else None,
+            "pages_per_second": round(pages / elapsed, 2) if elapsed else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.ingest",
+                                     description="Analyze every PDF under a directory and save audit logs.")
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--checkpoint", type=Path, default=INGEST_CHECKPOINT_DB,
+                        help="progress database; reuse it to resume an interrupted run")
+    parser.add_argument("--progress-every", type=int, default=25)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if not args.root.is_dir():
+        parser.error(f"{args.root} is not a directory")
+    summary = ingest(args.root, args.workers, IngestCheckpoint(args.checkpoint), args.progress_every)
+    print(summary)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,418 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import queue
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from core.config import JOB_WORKERS, JOB_MAX_PENDING, JOB_TTL_SECONDS, NLP_PRELOAD, JOB_BACKEND, BROKER_POLL_SECONDS
+from core.metrics import metrics, profile_request, timed, profile_call, reset_worker_metrics
+
+FINISHED_STATES = ("completed", "failed", "cancelled")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# Size of the job pool this process belongs to, if it is a job worker
+_job_pool_size = None
+
+
+def mark_job_worker(pool_size: int):
+    global _job_pool_size
+    _job_pool_size = pool_size
+
+
+def in_job_worker() -> bool:
+    return _job_pool_size is not None
+
+
+def nested_workers(requested: int) -> int:
+    """
+    Processes a pool started inside a job may use. The job pool already
+    spreads jobs over the CPUs, so a nested pool only gets this worker's
+    share of them instead of oversubscribing the machine.
+    """
+    if _job_pool_size is None:
+        return requested
+    return max(1, min(requested, (os.cpu_count() or 1) // _job_pool_size))
+
+
+def _init_worker(pool_size: int = JOB_WORKERS):
+    mark_job_worker(pool_size)
+    reset_worker_metrics()
+    # Give each pool process a warm model unless loading is left fully lazy
+    if NLP_PRELOAD != "lazy":
+        from core.models import prewarm
+        prewarm(freeze=False)
+
+
+def _discard(files):
+    for path in files:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _stream_to_queue(fn, args, queue, stop) -> dict:
+    # Runs a generator job, handing each item to the API process as it is
+    # produced, until it is exhausted or the consumer sets stop
+    count = 0
+    items = fn(*args)
+    try:
+        for item in items:
+            if stop.is_set():
+                break
+            queue.put(("item", item))
+            count += 1
+    finally:
+        items.close()
+        queue.put(("end", None))
+    return {"records": count, "stopped": stop.is_set()}
+
+
+def _run_instrumented(fn, args, profile: bool, label: str) -> dict:
+    """
+    Runs a job in the worker and returns its result together with the
+    metrics recorded in this process since the last job. A failed job
+    raises with its metrics attached instead.
+    """
+    profile_path = None
+    try:
+        with timed(f"job:{label}"):
+            if profile:
+                result, profile_path = profile_call(label, fn, *args)
+            else:
+                result = fn(*args)
+    except Exception as e:
+        metrics.attach(e)
+        raise
+    return {"result": result, "metrics": metrics.drain(), "profile": profile_path}
+
+
+class Job:
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.exception = None
+        self.task = None
+        self.profile = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "profile": self.profile
+        }
+
+
+class JobManager:
+    """
+    Runs CPU-bound work in a process pool so the event loop stays responsive.
+
+    At most max_workers jobs run at once; up to max_pending more may wait
+    for a slot before submissions are rejected with JobQueueFull.
+
+    Files passed to submit() (uploads the job reads) belong to the job and
+    are deleted once it ends, whether it completed, failed, was cancelled
+    or was never accepted.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.jobs = {}
+        self._executor = None
+        self._slots = None
+        self._manager = None
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                                 initargs=(self.max_workers,))
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+    def shutdown(self):
+        for job in self.jobs.values():
+            if job.task and not job.task.done():
+                job.task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        for job_id in [j.id for j in self.jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def submit(self, kind: str, fn, *args, files=()) -> Job:
+        self.start()
+        self._prune()
+        active = sum(1 for j in self.jobs.values() if not j.finished)
+        if active >= self.max_workers + self.max_pending:
+            _discard(files)
+            raise JobQueueFull(f"{active} jobs already queued or running.")
+
+        job = Job(kind)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._execute(job, fn, args))
+        job.task.add_done_callback(functools.partial(self._settle, job, files))
+        return job
+
+    async def submit_async(self, kind: str, fn, *args, files=()) -> Job:
+        return self.submit(kind, fn, *args, files=files)
+
+    def _settle(self, job: Job, files, task):
+        # A job cancelled before its coroutine started never reaches _execute's finally
+        if not job.finished:
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            metrics.inc("jobs", kind=job.kind, status=job.status)
+        # A cancelled job may still be running in its worker; its open file handle survives the unlink
+        _discard(files)
+
+    async def _execute(self, job: Job, fn, args):
+        loop = asyncio.get_running_loop()
+        # The submitting request's profiling holder, if it asked for a profile
+        profile = profile_request.get()
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                payload = await loop.run_in_executor(self._executor, _run_instrumented, fn, args,
+                                                     profile is not None, job.kind)
+                metrics.merge(payload["metrics"])
+                job.result = payload["result"]
+                job.profile = payload["profile"]
+                if job.profile and profile is not None:
+                    profile.append(job.profile)
+                job.status = "completed"
+        except asyncio.CancelledError:
+            # A job already running in a worker process cannot be interrupted;
+            # its result is simply discarded when it finishes.
+            job.status = "cancelled"
+        except Exception as e:
+            metrics.merge_attached(e)
+            job.status = "failed"
+            job.error = str(e)
+            job.exception = e
+        finally:
+            job.finished_at = time.time()
+            metrics.inc("jobs", kind=job.kind, status=job.status)
+            if job.started_at:
+                metrics.observe("job_duration_seconds", job.finished_at - job.started_at, kind=job.kind)
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def list(self) -> list:
+        return list(self.jobs.values())
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.task.cancel()
+        return True
+
+    async def wait(self, job_id: str, timeout: float = None):
+        job = self.jobs.get(job_id)
+        if job is not None and not job.finished:
+            try:
+                await asyncio.wait_for(asyncio.shield(job.task), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def stream(self, kind: str, fn, *args, files=()):
+        """
+        Submits a generator function as a job and returns (job, async iterator
+        over the items it yields as the worker produces them). Submission
+        happens here, so JobQueueFull is raised before any item is awaited;
+        the iterator re-raises the job's exception (or JobCancelled) once the
+        items run out.
+        Closing the iterator early (the client went away) stops the
+        generator at its next item and cancels the job.
+        """
+        if self._manager is None:
+            self._manager = multiprocessing.Manager()
+        items = self._manager.Queue()
+        stop = self._manager.Event()
+        job = self.submit(kind, _stream_to_queue, fn, args, items, stop, files=files)
+
+        async def iterate():
+            exhausted = False
+            try:
+                while True:
+                    try:
+                        tag, item = await asyncio.to_thread(items.get, True, 0.5)
+                    except queue.Empty:
+                        # The worker always sends "end", unless it never ran or died
+                        if job.finished:
+                            break
+                        continue
+                    if tag == "end":
+                        break
+                    yield item
+                exhausted = True
+            finally:
+                if not exhausted:
+                    stop.set()
+                    self.cancel(job.id)
+            await asyncio.shield(job.task)
+            if job.exception is not None:
+                raise job.exception
+            if exhausted and job.status == "cancelled":
+                raise JobCancelled(f"Job {job.id} was cancelled.")
+
+        return job, iterate()
+
+    async def run(self, kind: str, fn, *args, files=()):
+        """
+        Submit a job and wait for it, re-raising the job's exception on failure
+        and raising JobCancelled if it was cancelled meanwhile.
+        """
+        job = self.submit(kind, fn, *args, files=files)
+        await asyncio.shield(job.task)
+        if job.exception is not None:
+            raise job.exception
+        if job.status == "cancelled":
+            raise JobCancelled(f"Job {job.id} was cancelled.")
+        return job.result
+
+
+class BrokerJob:
+    """
+    A job row from the shared broker, shaped like Job for the API.
+    """
+
+    def __init__(self, row: dict):
+        self.id = row["id"]
+        self.kind = row["kind"]
+        self.status = row["status"]
+        self.created_at = row["created_at"]
+        self.started_at = row["started_at"]
+        self.finished_at = row["finished_at"]
+        self.result = row["result"]
+        self.error = row["error"]
+        self.error_type = row["error_type"]
+        self.attempts = row["attempts"]
+        self.lease_owner = row["lease_owner"]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def exception(self) -> Exception:
+        # Errors cross process and host boundaries as text; keep "not found" distinguishable
+        if self.error_type == "FileNotFoundError":
+            return FileNotFoundError(self.error)
+        return RuntimeError(self.error)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "worker": self.lease_owner
+        }
+
+
+class BrokerJobManager:
+    """
+    JobManager interface over the shared broker: jobs are queued for
+    whichever worker (python -m core.worker, on any node) leases them.
+    Streaming jobs still run in this process's pool, since their output is
+    tied to the open response.
+    """
+
+    def __init__(self, broker=None, poll_seconds: float = BROKER_POLL_SECONDS):
+        from core.broker import broker as shared_broker
+        self.broker = broker or shared_broker
+        self.poll_seconds = poll_seconds
+        self.local = JobManager()
+
+    def start(self):
+        # The local pool starts on the first streaming job
+        pass
+
+    def shutdown(self):
+        self.local.shutdown()
+
+    def submit(self, kind: str, fn, *args, files=()) -> BrokerJob:
+        from core.tasks import BROKER_TASKS
+        if BROKER_TASKS.get(fn.__name__) is not fn:
+            _discard(files)
+            raise ValueError(f"{fn.__name__} is not a broker task")
+        job_id = self.broker.enqueue(kind, fn.__name__, list(args), files=list(files))
+        return BrokerJob(self.broker.get(job_id))
+
+    async def submit_async(self, kind: str, fn, *args, files=()) -> BrokerJob:
+        # Enqueueing takes the broker's write lock, which may wait on other processes
+        return await asyncio.to_thread(self.submit, kind, fn, *args, files=files)
+
+    def get(self, job_id: str):
+        row = self.broker.get(job_id)
+        return BrokerJob(row) if row else None
+
+    def list(self) -> list:
+        return [BrokerJob(row) for row in self.broker.list()]
+
+    def cancel(self, job_id: str) -> bool:
+        return self.broker.cancel(job_id)
+
+    async def wait(self, job_id: str, timeout: float = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = await asyncio.to_thread(self.get, job_id)
+            if job is None or job.finished or (deadline is not None and time.monotonic() >= deadline):
+                return job
+            await asyncio.sleep(self.poll_seconds)
+
+    async def run(self, kind: str, fn, *args, files=()):
+        job = await self.submit_async(kind, fn, *args, files=files)
+        job = await self.wait(job.id)
+        if job.status == "failed":
+            raise job.exception
+        if job.status == "cancelled":
+            raise JobCancelled(f"Job {job.id} was cancelled.")
+        return job.result
+
+    def stream(self, kind: str, fn, *args, files=()):
+        return self.local.stream(kind, fn, *args, files=files)
+
+
+job_manager = BrokerJobManager() if JOB_BACKEND == "broker" else JobManager()
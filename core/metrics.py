@@ -0,0 +1,289 @@
+"""
+Lightweight in-process instrumentation: stage timings, counters and HTTP
+latency, rendered in the Prometheus text format by GET /metrics.
+
+    with timed("report_pdf"):            # context manager
+    @instrument("risk_compare")          # decorator, sync or async
+    for page in timed_iter("pdf_extraction", pages, counter="pages"):
+    count("comparisons")
+
+Stages nest: time spent in an inner stage is also part of the outer one,
+unless the outer stage is exclusive, which reports only its own time.
+That is how "nlp" excludes the PDF pages it pulls lazily while parsing.
+
+Job pool processes record into their own registry; core.jobs ships each
+job's metrics back with its result so /metrics covers every process.
+Pools started inside a job do the same through run_drained(), and a
+failed call carries its metrics on the exception (see Metrics.attach).
+"""
+import asyncio
+import cProfile
+import functools
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from core.config import PROFILING, PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "compliance_"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+STAGE_METRIC = "stage_duration_seconds"
+
+# Set per request by the API middleware; jobs submitted while it is set are profiled
+profile_request = ContextVar("profile_request", default=None)
+
+
+class Metrics:
+    """
+    Thread-safe counters and histograms keyed by name and labels.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        # name/labels -> per-bucket counts (last slot is +Inf), then sum and count
+        self._histograms = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._key(name, labels)
+        slot = bisect_left(self.buckets, seconds)
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            h[slot] += 1
+            h[-2] += seconds
+            h[-1] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"counters": dict(self._counters),
+                    "histograms": {k: list(v) for k, v in self._histograms.items()}}
+
+    def drain(self) -> dict:
+        """
+        Returns everything recorded so far and resets the registry.
+        """
+        with self._lock:
+            snap = {"counters": self._counters, "histograms": self._histograms}
+            self._counters, self._histograms = {}, {}
+        return snap
+
+    def total(self, name: str, **labels) -> float:
+        """
+        Sum of a counter over every label set that includes labels.
+        """
+        wanted = set(self._key(name, labels)[1])
+        with self._lock:
+            return sum(value for (n, key), value in self._counters.items() if n == name and wanted <= set(key))
+
+    def attach(self, exc: BaseException):
+        """
+        Moves everything recorded so far onto exc, so the metrics of a
+        failed call in a worker process still reach the parent with the
+        exception. Metrics already attached by a nested worker are kept.
+        """
+        self.merge_attached(exc)
+        exc.worker_metrics = self.drain()
+
+    def merge_attached(self, exc: BaseException):
+        snap = exc.__dict__.pop("worker_metrics", None)
+        if snap:
+            self.merge(snap)
+
+    def merge(self, snap: dict):
+        with self._lock:
+            for key, value in snap["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, values in snap["histograms"].items():
+                h = self._histograms.get(key)
+                if h is None:
+                    self._histograms[key] = list(values)
+                else:
+                    for i, v in enumerate(values):
+                        h[i] += v
+
+    def render(self) -> str:
+        snap = self.snapshot()
+        lines = []
+        for name in sorted({name for name, _ in snap["counters"]}):
+            metric = f"{PREFIX}{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (n, labels), value in sorted(snap["counters"].items()):
+                if n == name:
+                    lines.append(f"{metric}{_labels(labels)} {value}")
+        for name in sorted({name for name, _ in snap["histograms"]}):
+            metric = f"{PREFIX}{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for (n, labels), h in sorted(snap["histograms"].items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, bucket in zip(self.buckets + ("+Inf",), h):
+                    cumulative += bucket
+                    lines.append(f"{metric}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{metric}_sum{_labels(labels)} {h[-2]:.6f}")
+                lines.append(f"{metric}_count{_labels(labels)} {h[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    escape = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}"
+
+
+metrics = Metrics()
+_local = threading.local()
+
+
+def _stack() -> list:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def count(name: str, value: float = 1, **labels):
+    metrics.inc(name, value, **labels)
+
+
+def reset_worker_metrics():
+    # Pool initializer: a forked worker starts with a copy of the parent's
+    # registry, which would be counted twice once drained back
+    metrics.drain()
+
+
+def run_drained(fn, *args):
+    """
+    Calls fn in a pool worker and returns (result, metrics recorded in
+    the worker) for the parent to merge.
+    """
+    try:
+        result = fn(*args)
+    except Exception as e:
+        metrics.attach(e)
+        raise
+    return result, metrics.drain()
+
+
+@contextmanager
+def timed(stage: str, exclusive: bool = False):
+    stack = _stack()
+    frame = [0.0]  # time spent in nested stages
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        if stack:
+            stack[-1][0] += elapsed
+        metrics.observe(STAGE_METRIC, elapsed - frame[0] if exclusive else elapsed, stage=stage)
+
+
+def timed_iter(stage: str, iterable, counter: str = None, exclusive: bool = False):
+    """
+    Yields from iterable, timing only the work done producing each item,
+    not what the consumer does with it. Observes one total when exhausted.
+    """
+    iterator = iter(iterable)
+    stack = _stack()
+    total = 0.0
+    items = 0
+    try:
+        while True:
+            frame = [0.0]
+            stack.append(frame)
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                elapsed = time.perf_counter() - start
+                stack.pop()
+                if stack:
+                    stack[-1][0] += elapsed
+                total += elapsed - frame[0] if exclusive else elapsed
+            items += 1
+            yield item
+    finally:
+        metrics.observe(STAGE_METRIC, total, stage=stage)
+        if counter:
+            metrics.inc(counter, items)
+
+
+def instrument(stage: str = None, exclusive: bool = False):
+    """
+    Decorator form of timed(); the stage defaults to the function's qualified name.
+    """
+    def decorate(fn):
+        name = stage or fn.__qualname__
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    metrics.observe(STAGE_METRIC, time.perf_counter() - start, stage=name)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(name, exclusive):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def profile_call(label: str, fn, *args):
+    """
+    Runs fn under the configured profiler and returns (result, profile path).
+    pyinstrument writes an HTML report; cProfile writes a .prof file for
+    pstats/snakeviz. Falls back to cProfile when pyinstrument isn't installed.
+    """
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stem = PROFILE_DIR / f"{time.strftime('%Y%m%d_%H%M%S')}_{label}_{os.getpid()}_{uuid.uuid4().hex[:6]}"
+    if PROFILING == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed; profiling with cProfile instead")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                result = fn(*args)
+            finally:
+                profiler.stop()
+                path = stem.with_suffix(".html")
+                path.write_text(profiler.output_html(), encoding="utf-8")
+            return result, str(path)
+
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(fn, *args)
+    finally:
+        path = stem.with_suffix(".prof")
+        profiler.dump_stats(str(path))
+    return result, str(path)
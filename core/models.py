@@ -0,0 +1,69 @@
+import gc
+import logging
+import threading
+import time
+from core.config import SPACY_MODEL
+from core.metrics import timed
+
+# Components the extractor never reads from: sentences come from the parser,
+# entities from ner, so tagging and lemmatization are wasted work.
+UNUSED_COMPONENTS = ["tagger", "attribute_ruler", "lemmatizer"]
+
+logger = logging.getLogger(__name__)
+
+_models = {}
+_load_seconds = {}
+_lock = threading.Lock()
+
+
+def _load_spacy(name: str):
+    # spaCy itself takes a while to import, so defer it until a model is needed
+    import spacy
+    nlp = spacy.load(name)
+    for component in UNUSED_COMPONENTS:
+        if component in nlp.pipe_names:
+            nlp.disable_pipe(component)
+    return nlp
+
+
+def get_nlp(name: str = SPACY_MODEL):
+    """
+    Return the spaCy pipeline for the given model, loading it on first use.
+    """
+    nlp = _models.get(name)
+    if nlp is None:
+        with _lock:
+            if name not in _models:
+                start = time.perf_counter()
+                with timed("model_load"):
+                    _models[name] = _load_spacy(name)
+                _load_seconds[name] = round(time.perf_counter() - start, 3)
+                logger.info("[Models] Loaded %s in %ss", name, _load_seconds[name])
+            nlp = _models[name]
+    return nlp
+
+
+def prewarm(name: str = SPACY_MODEL, freeze: bool = True):
+    """
+    Load the model ahead of the first request.
+
+    With freeze=True the loaded objects are moved to the permanent GC
+    generation, so processes forked afterwards (e.g. gunicorn --preload)
+    share the model pages copy-on-write instead of touching them on every
+    collection.
+    """
+    nlp = get_nlp(name)
+    if freeze:
+        gc.freeze()
+    return nlp
+
+
+def is_loaded(name: str = SPACY_MODEL) -> bool:
+    return name in _models
+
+
+def model_stats() -> dict:
+    return {
+        "loaded": list(_models.keys()),
+        "load_seconds": dict(_load_seconds)
+    }
@@ -0,0 +1,67 @@
+import json
+from functools import lru_cache
+from core.config import RULES_FILE
+from core.models import get_nlp
+
+_engine = None
+
+
+def load_rules(path=RULES_FILE) -> dict:
+    """
+    Loads category -> keyword phrase lists, keeping the file's category order.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=1)
+def rule_categories() -> tuple:
+    """
+    Category names in rule order, without building the matcher (or loading the model).
+    """
+    return tuple(load_rules().keys())
+
+
+class RuleEngine:
+    """
+    Classifies sentences into keyword categories with one PhraseMatcher pass.
+
+    All phrases from all categories are compiled into a single matcher, so
+    a doc is scanned once no matter how many categories are configured, and
+    a sentence lands in every category that has a phrase inside it.
+    """
+
+    def __init__(self, rules: dict, nlp):
+        from spacy.matcher import PhraseMatcher
+        self.categories = list(rules.keys())
+        self.matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        for category, phrases in rules.items():
+            self.matcher.add(category, [nlp.make_doc(phrase) for phrase in phrases])
+        self._labels = {nlp.vocab.strings[c]: c for c in self.categories}
+
+    def classify(self, doc) -> dict:
+        """
+        Returns {sentence start token index: set of categories} for matching sentences.
+        """
+        matched = {}
+        for match_id, start, _ in self.matcher(doc):
+            sent_start = doc[start].sent.start
+            matched.setdefault(sent_start, set()).add(self._labels[match_id])
+        return matched
+
+    def classify_sentences(self, doc):
+        """
+        Yields (sentence text, categories in rule order) for each matching sentence.
+        """
+        matched = self.classify(doc)
+        for sent in doc.sents:
+            categories = matched.get(sent.start)
+            if categories:
+                yield sent.text.strip(), [c for c in self.categories if c in categories]
+
+
+def get_rule_engine() -> RuleEngine:
+    global _engine
+    if _engine is None:
+        _engine = RuleEngine(load_rules(), get_nlp())
+    return _engine
@@ -0,0 +1,122 @@
+import hashlib
+import math
+from collections import Counter
+from difflib import SequenceMatcher
+from core.config import SIMILARITY_NGRAM, SIMILARITY_TOP_K
+
+
+def similarity_ratio(a: str, b: str) -> float:
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+def item_hash(text: str) -> str:
+    # Matching is case-insensitive, so items differing only in case share a hash
+    return hashlib.sha256(text.lower().encode("utf-8")).hexdigest()[:20]
+
+
+def char_ngrams(text: str, n: int = SIMILARITY_NGRAM) -> Counter:
+    padded = f" {text.lower()} "
+    return Counter(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+
+
+class SimilarityIndex:
+    """
+    Character n-gram TF-IDF index over a fixed list of strings.
+
+    Built once, then each query walks only the postings of its own n-grams
+    to rank candidates by cosine similarity. The exact SequenceMatcher ratio
+    is computed for the top_k candidates alone. N-grams found in more than
+    max_df of the items carry almost no signal and are left out of the
+    postings so common fragments don't turn every lookup into a full scan.
+
+    Both cuts make this an approximation of checking every item: an item
+    above the threshold that shares only common n-grams with the query, or
+    ranks below top_k by cosine, is never scored. With up to top_k items
+    every item is scored and the result is exact. tests/test_similarity.py
+    checks agreement with the all-pairs check on a regulatory-style corpus.
+    """
+
+    def __init__(self, items: list, n: int = SIMILARITY_NGRAM, top_k: int = SIMILARITY_TOP_K, max_df: float = 0.5):
+        self.items = list(items)
+        self.n = n
+        self.top_k = top_k
+
+        grams = [char_ngrams(item, n) for item in self.items]
+        df = Counter(g for counts in grams for g in counts)
+        total = len(self.items)
+        self.idf = {g: math.log((1 + total) / (1 + d)) + 1 for g, d in df.items()}
+
+        max_postings = max(1, int(total * max_df))
+        self.postings = {}
+        self.norms = []
+        for idx, counts in enumerate(grams):
+            weights = {g: tf * self.idf[g] for g, tf in counts.items()}
+            self.norms.append(math.sqrt(sum(w * w for w in weights.values())) or 1.0)
+            for g, w in weights.items():
+                if df[g] <= max_postings:
+                    self.postings.setdefault(g, []).append((idx, w))
+
+    def candidates(self, query: str) -> list:
+        """
+        Returns item indices ranked by TF-IDF cosine similarity, best first (at most top_k).
+        """
+        if len(self.items) <= self.top_k:
+            return list(range(len(self.items)))
+
+        counts = char_ngrams(query, self.n)
+        weights = {g: tf * self.idf.get(g, 0.0) for g, tf in counts.items()}
+        query_norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+
+        scores = {}
+        for g, qw in weights.items():
+            for idx, w in self.postings.get(g, ()):
+                scores[idx] = scores.get(idx, 0.0) + qw * w
+        ranked = sorted(scores, key=lambda idx: scores[idx] / (self.norms[idx] * query_norm), reverse=True)
+        return ranked[:self.top_k]
+
+    def first_match(self, query: str, threshold: float, scorer=None):
+        """
+        Returns (item index, ratio) for the first candidate whose exact ratio
+        is above threshold, or (None, best ratio seen). `scorer(idx)` may
+        supply the ratio instead, e.g. from previously computed scores.
+        """
+        if scorer is None:
+            scorer = lambda idx: similarity_ratio(query, self.items[idx])
+        query_len = len(query)
+        best = 0.0
+        for idx in self.candidates(query):
+            item_len = len(self.items[idx])
+            # ratio() can never exceed 2 * shorter / total length
+            if 2 * min(query_len, item_len) <= threshold * (query_len + item_len):
+                continue
+            ratio = scorer(idx)
+            if ratio > threshold:
+                return idx, ratio
+            best = max(best, ratio)
+        return None, best
+
+    def best_above(self, query: str, threshold: float, scorer=None):
+        """
+        Returns (item index, ratio) for the highest-scoring candidate above
+        threshold, or (None, best ratio seen). Unlike first_match() every
+        candidate is considered, except those whose length bound can't beat
+        the best ratio found so far.
+        """
+        if scorer is None:
+            scorer = lambda idx: similarity_ratio(query, self.items[idx])
+        query_len = len(query)
+        best_idx, best = None, 0.0
+        for idx in self.candidates(query):
+            item_len = len(self.items[idx])
+            if 2 * min(query_len, item_len) <= max(threshold, best) * (query_len + item_len):
+                continue
+            ratio = scorer(idx)
+            if ratio > best:
+                best_idx, best = idx, ratio
+        return (best_idx, best) if best > threshold else (None, best)
+
+    def has_match(self, query: str, threshold: float) -> bool:
+        """
+        True if any candidate's exact ratio is above threshold.
+        """
+        return self.first_match(query, threshold)[0] is not None
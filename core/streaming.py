@@ -0,0 +1,60 @@
+"""
+Record shapes and wire encodings for streamed analysis results.
+
+A stream is a sequence of "chunk" records, one per analyzed chunk that
+found something, followed by one "summary" record (or an "error" record if
+the work failed). Entities and dates already sent earlier in the same
+stream are not repeated.
+"""
+import json
+
+ENTITY_KEYS = ("entities", "dates")
+
+
+class ChunkRecords:
+    """
+    Turns per-chunk analysis results into chunk records for one document.
+    """
+
+    def __init__(self):
+        self.seen = {key: set() for key in ENTITY_KEYS}
+        self.chunks = 0
+
+    def record(self, page, result: dict):
+        self.chunks += 1
+        record = {"type": "chunk", "page": page}
+        for key, values in result.items():
+            if key == "normalized_dates" or not isinstance(values, list):
+                continue
+            if key in self.seen:
+                values = [v for v in values if v not in self.seen[key]]
+                self.seen[key].update(values)
+            if values:
+                record[key] = values
+        return record if len(record) > 2 else None
+
+
+def summary_record(result: dict, **extra) -> dict:
+    counts = {key: len(values) for key, values in result.items()
+              if isinstance(values, list) and key != "normalized_dates"}
+    return {"type": "summary", "filename": result.get("filename"), "counts": counts, **extra}
+
+
+def error_record(detail: str) -> dict:
+    return {"type": "error", "detail": detail}
+
+
+def ndjson(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+def sse(record: dict) -> str:
+    data = json.dumps(record, ensure_ascii=False, default=str)
+    return f"event: {record['type']}\ndata: {data}\n\n"
+
+
+# format name -> (media type, encoder)
+STREAM_FORMATS = {
+    "ndjson": ("application/x-ndjson", ndjson),
+    "sse": ("text/event-stream", sse),
+}
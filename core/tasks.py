@@ -0,0 +1,196 @@
+"""
+Job entry points run inside the process pool.
+
+Each function is a top-level callable taking only picklable arguments, so it
+can be shipped to a worker process by core.jobs.
+"""
+import os
+from pathlib import Path
+from fastapi import UploadFile
+
+import time
+import uuid
+from core.audit_index import audit_index, EXTERNAL, INTERNAL
+from core.comparison_store import comparison_store
+from core.metrics import instrument
+from core.streaming import ChunkRecords, summary_record
+from core.file_utils import save_json_audit
+from agents.analyzing_agent import AnalyzingAgent
+from agents.company_policy_agent import CompanyPolicyAgent
+from agents.risk_flagger_agent import RiskFlaggerAgent
+from agents.reporting_agent import ReportingAgent
+from agents.compliance_matrix_agent import ComplianceMatrixAgent
+
+
+@instrument("file_discovery")
+def find_latest_audit_pair():
+    """
+    Return the latest (external, internal) audit JSON paths; either may be None.
+    """
+    return audit_index.latest_path(EXTERNAL), audit_index.latest_path(INTERNAL)
+
+
+def _save_external(result: dict) -> dict:
+    # Same PDF bytes already analyzed and saved: point at that audit instead of writing a duplicate
+    existing = audit_index.find_by_source_hash(result["source_sha256"], EXTERNAL)
+    if existing and audit_index.exists(existing):
+        result["already_processed"] = True
+        result["audit_saved_to"] = existing["path"]
+        result["download_url"] = f"/documents/audit/{existing['filename']}"
+        return result
+
+    audit_path = save_json_audit(result, result["filename"], source_hash=result["source_sha256"])
+    result["audit_saved_to"] = audit_path
+    result["download_url"] = f"/documents/audit/{os.path.basename(audit_path)}"
+    return result
+
+
+def analyze_latest_task() -> dict:
+    agent = AnalyzingAgent()
+    result = agent.analyze_latest()
+
+    if "error" not in result:
+        _save_external(result)
+
+    return result
+
+
+def analyze_latest_stream_task():
+    """
+    Generator form of analyze_latest_task for streaming responses: yields a
+    record per analyzed chunk, then a summary once the audit is saved.
+    """
+    records = ChunkRecords()
+    for event in AnalyzingAgent().analyze_latest_stream():
+        if event[0] == "result":
+            result = _save_external(event[1])
+            yield summary_record(result, chunks=records.chunks, source_sha256=result["source_sha256"],
+                                 already_processed=result.get("already_processed", False),
+                                 audit_saved_to=result["audit_saved_to"], download_url=result["download_url"],
+                                 amendments=result.get("amendments"))
+        else:
+            record = records.record(event[1], event[2])
+            if record:
+                yield record
+
+
+# The uploaded PDF is submitted as one of the job's files, so the job manager
+# (or broker) deletes it once the job ends; a failed attempt leaves it in
+# place for the retry.
+def company_policy_task(pdf_path: str, filename: str) -> dict:
+    with open(pdf_path, "rb") as f:
+        agent = CompanyPolicyAgent(UploadFile(file=f, filename=filename))
+        return agent.extract_and_save()
+
+
+def company_policy_stream_task(pdf_path: str, filename: str):
+    records = ChunkRecords()
+    with open(pdf_path, "rb") as f:
+        agent = CompanyPolicyAgent(UploadFile(file=f, filename=filename))
+        for event in agent.extract_and_save_stream():
+            if event[0] == "result":
+                yield summary_record(event[1], chunks=records.chunks, audit_saved_to=event[1]["audit_saved_to"])
+            else:
+                record = records.record(event[1], event[2])
+                if record:
+                    yield record
+
+
+def flag_latest_task() -> dict:
+    latest_external, latest_internal = find_latest_audit_pair()
+    if not latest_internal:
+        raise FileNotFoundError("No internal policy files found.")
+    if not latest_external:
+        raise FileNotFoundError("No external regulation files found.")
+
+    agent = RiskFlaggerAgent(str(latest_external), str(latest_internal))
+    result = agent.compare()
+    comparison_store.record(latest_external.name, latest_internal.name, result)
+
+    # Include which files were compared
+    result["compared_files"] = {
+        "external": latest_external.name,
+        "internal": latest_internal.name
+    }
+    return result
+
+
+def report_latest_task() -> dict:
+    latest_external, latest_internal = find_latest_audit_pair()
+    if not latest_internal or not latest_external:
+        raise FileNotFoundError("Missing required input files.")
+
+    flagger = RiskFlaggerAgent(str(latest_external), str(latest_internal))
+    flagged = flagger.compare()
+    comparison_store.record(latest_external.name, latest_internal.name, flagged)
+
+    reporter = ReportingAgent()
+    filename = Path(latest_external).stem + "__vs__" + Path(latest_internal).stem
+
+    flagged["filename"] = filename  # required by ReportingAgent
+    excel_path, pdf_path = reporter.generate_reports(flagged, filename)
+
+    return {
+        "message": "Risk analysis completed, reports generated.",
+        "compliance_score": flagged.get("compliance_score"),
+        "risk_flags": flagged.get("risk_flags"),
+        "report_files": {
+            "excel": str(excel_path),
+            "pdf": str(pdf_path)
+        },
+        "compared_files": {
+            "external": Path(latest_external).name,
+            "internal": Path(latest_internal).name
+        }
+    }
+
+
+def compliance_matrix_task(external_name: str = None) -> dict:
+    """
+    Checks one regulation (the latest unless named) against every internal policy.
+    """
+    if external_name:
+        row = audit_index.find(Path(external_name).name, EXTERNAL)
+        if not row or not audit_index.exists(row):
+            raise FileNotFoundError(f"External regulation file not found: {external_name}")
+        latest_external = Path(row["path"])
+    else:
+        latest_external, _ = find_latest_audit_pair()
+        if not latest_external:
+            raise FileNotFoundError("No external regulation files found.")
+
+    internal_files = audit_index.paths(INTERNAL)
+    if not internal_files:
+        raise FileNotFoundError("No internal policy files found.")
+
+    matrix = ComplianceMatrixAgent([latest_external], internal_files).run()
+    for comparison in matrix["comparisons"]:
+        comparison_store.record(comparison["external"], comparison["internal"], comparison)
+    return matrix
+
+
+def portfolio_report_task(since: float = None, latest_only: bool = True) -> dict:
+    """
+    Renders every stored comparison (optionally since a timestamp) into one
+    workbook and summary PDF.
+    """
+    if comparison_store.count(since, latest_only) == 0:
+        raise FileNotFoundError("No stored comparisons to report on.")
+    name = f"portfolio_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{uuid.uuid4().hex[:6]}"
+    return ReportingAgent().generate_portfolio(comparison_store.iter_comparisons(since, latest_only), name)
+
+
+# Everything a broker worker may run, by function name
+BROKER_TASKS = {fn.__name__: fn for fn in [
+    analyze_latest_task, company_policy_task, flag_latest_task, report_latest_task,
+    compliance_matrix_task, portfolio_report_task,
+]}
+
+# Jobs that can be submitted by name through the /jobs API
+JOB_TASKS = {
+    "analyze-latest": analyze_latest_task,
+    "flag-latest": flag_latest_task,
+    "report": report_latest_task,
+    "matrix": compliance_matrix_task,
+    "portfolio": portfolio_report_task,
+}
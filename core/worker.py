@@ -0,0 +1,143 @@
+"""
+Broker worker: leases queued jobs from the shared broker and runs them in a
+local process pool, each pool process with a warm model.
+
+Start one per node (any number of nodes can share the broker database, and
+must share the audit_logs/, downloads/, reports/ and upload directories
+with the API, since jobs exchange files by path):
+
+    python -m core.worker --concurrency 4
+
+Leases are renewed while jobs run, so a job only moves to another worker
+if this one stops heartbeating. If a pool process dies (e.g. OOM-killed),
+the jobs it took down are failed back to the broker for a retry and the
+pool is replaced. The worker also takes part in the
+retention leader election, so cleanup runs on exactly one process.
+"""
+import argparse
+import logging
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from core.broker import broker, node_id
+from core.config import WORKER_CONCURRENCY, BROKER_LEASE_SECONDS, BROKER_POLL_SECONDS, CLEANUP_INTERVAL_SECONDS
+from core.jobs import _init_worker
+
+logger = logging.getLogger(__name__)
+
+# Deterministic errors that another attempt can't fix
+NON_RETRYABLE = (FileNotFoundError, ValueError)
+
+
+class BrokerWorker:
+    def __init__(self, concurrency: int = WORKER_CONCURRENCY, lease_seconds: float = BROKER_LEASE_SECONDS,
+                 poll_seconds: float = BROKER_POLL_SECONDS, job_broker=broker):
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.broker = job_broker
+        self.worker_id = node_id()
+        self.stopping = threading.Event()
+
+    def stop(self, *_):
+        self.stopping.set()
+
+    def _retention_loop(self):
+        from core.cleaner import run_retention_if_leader
+        while not self.stopping.is_set():
+            try:
+                run_retention_if_leader(self.worker_id)
+            except Exception:
+                logger.exception("[Cleanup] Retention run failed")
+            self.stopping.wait(CLEANUP_INTERVAL_SECONDS)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.concurrency, initializer=_init_worker,
+                                   initargs=(self.concurrency,))
+
+    def _finish(self, job: dict, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            retry = not isinstance(e, NON_RETRYABLE)
+            logger.warning("[Worker] Job %s (%s) attempt %d failed: %s", job["id"], job["kind"], job["attempts"], e)
+            self.broker.fail(job["id"], self.worker_id, e, retry=retry)
+            return
+        if not self.broker.complete(job["id"], self.worker_id, result):
+            # Lease was lost (e.g. a long stall) and another worker took the job over
+            logger.warning("[Worker] Discarded result of job %s: lease no longer held", job["id"])
+
+    def run(self):
+        from core.tasks import BROKER_TASKS
+
+        threading.Thread(target=self._retention_loop, daemon=True).start()
+        running = {}
+        last_heartbeat = time.monotonic()
+        logger.info("[Worker] %s started with %d slots", self.worker_id, self.concurrency)
+        executor = self._pool()
+        try:
+            while not self.stopping.is_set() or running:
+                broken = False
+                # Stop taking new work once asked to stop, but finish what is running
+                while not broken and not self.stopping.is_set() and len(running) < self.concurrency:
+                    job = self.broker.lease(self.worker_id, self.lease_seconds)
+                    if job is None:
+                        break
+                    fn = BROKER_TASKS.get(job["task"])
+                    if fn is None:
+                        self.broker.fail(job["id"], self.worker_id, ValueError(f"Unknown task {job['task']}"), retry=False)
+                        continue
+                    logger.info("[Worker] Running job %s (%s), attempt %d", job["id"], job["kind"], job["attempts"])
+                    try:
+                        running[executor.submit(fn, *job["args"])] = job
+                    except BrokenProcessPool as e:
+                        # The job never started; hand it back for a retry
+                        self.broker.fail(job["id"], self.worker_id, e)
+                        broken = True
+
+                if running:
+                    done, _ = wait(running, timeout=self.poll_seconds, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        broken = broken or isinstance(future.exception(), BrokenProcessPool)
+                        self._finish(running.pop(future), future)
+                elif not broken:
+                    self.stopping.wait(self.poll_seconds)
+
+                if broken:
+                    # Every job in a broken pool fails at once, so nothing is
+                    # left running in it; its replacement takes the retries
+                    logger.error("[Worker] Process pool broke (a worker process died); starting a new one")
+                    for future, job in list(running.items()):
+                        self._finish(job, future)
+                    running.clear()
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = self._pool()
+
+                if time.monotonic() - last_heartbeat >= self.lease_seconds / 3:
+                    for job in running.values():
+                        self.broker.heartbeat(job["id"], self.worker_id, self.lease_seconds)
+                    last_heartbeat = time.monotonic()
+        finally:
+            executor.shutdown()
+        self.broker.release_leadership("retention", self.worker_id)
+        logger.info("[Worker] %s stopped", self.worker_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.worker", description="Run jobs from the shared broker.")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    worker = BrokerWorker(concurrency=args.concurrency)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,64 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse, PlainTextResponse
 from contextlib import asynccontextmanager
-import os
 import asyncio
+import logging
+import time
+import shutil
+import tempfile
 from pathlib import Path
 
-from core.cleaner import delete_old_audit_logs
-from core.config import AUDIT_DIR, RETENTION_DAYS, CLEANUP_INTERVAL_SECONDS
+from core.cleaner import run_retention, run_retention_if_leader
+from core.broker import node_id
+from core.config import AUDIT_DIR, RETENTION_DAYS, CLEANUP_INTERVAL_SECONDS, NLP_PRELOAD, DOWNLOAD_DIR, PROFILING, UPLOAD_DIR
+from core import models
+from core import tasks
+from core.jobs import job_manager, JobCancelled, JobQueueFull
+from core.metrics import metrics, profile_request
+from core.streaming import STREAM_FORMATS, error_record
+from core.cache import analysis_cache
+from core.audit_index import audit_index, EXTERNAL
+from core.audit_store import read_audit_bytes
+from core.file_utils import iter_zip_stream
 from core.file_utils import save_json_audit
-from agents.extraction_agent import ExtractionAgent
-from agents.monitoring_agent import monitor_and_download_top_pdf
+from agents.monitoring_agent import monitor_and_download_pdfs
 from agents.analyzing_agent import AnalyzingAgent
 from agents.reporting_agent import ReportingAgent
 from agents.company_policy_agent import CompanyPolicyAgent
-
-
-from fastapi import Form
 from agents.risk_flagger_agent import RiskFlaggerAgent
 
-DOWNLOAD_DIR = Path("downloads")
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
 DOWNLOAD_DIR.mkdir(exist_ok=True)
 
+# Load the model in the parent process so forked workers share it copy-on-write
+if NLP_PRELOAD == "import":
+    models.prewarm()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print(f"[Startup] RETENTION_DAYS set to {RETENTION_DAYS}")
+    await asyncio.to_thread(audit_index.ensure_built)
+    if NLP_PRELOAD == "startup":
+        # Warm the model in the background so non-NLP endpoints serve immediately
+        asyncio.create_task(asyncio.to_thread(models.prewarm, freeze=False))
     async def cleanup_loop():
         while True:
-            delete_old_audit_logs()
+            # Scans can touch hundreds of thousands of files, so keep them off the event loop;
+            # with several API processes or workers only the elected leader runs them
+            try:
+                await asyncio.to_thread(run_retention_if_leader, node_id())
+            except Exception:
+                # One bad run must not stop retention for the life of the process
+                logger.exception("[Cleanup] Retention run failed")
             await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
 
     task = asyncio.create_task(cleanup_loop())
+    job_manager.start()
     yield
     task.cancel()
+    job_manager.shutdown()
 
 app = FastAPI(
     title="Autonomous Compliance Agent API",
@@ -40,19 +67,103 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Records latency per route and status. With PROFILING enabled, `?profile=1`
+    profiles the job work behind the request; report paths come back in X-Profile.
+    """
+    profiles = None
+    if PROFILING != "off" and request.query_params.get("profile") == "1":
+        profiles = []
+        profile_request.set(profiles)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        # Route templates, not raw paths, so job IDs and filenames don't explode the label set
+        route = request.scope.get("route")
+        metrics.observe("http_request_duration_seconds", time.perf_counter() - start,
+                        method=request.method, route=getattr(route, "path", "unmatched"), status=status)
+    if profiles:
+        response.headers["X-Profile"] = ",".join(profiles)
+    return response
+
+
+async def run_job(kind: str, fn, *args, files=()):
+    """
+    Runs a CPU-bound task in the job pool and maps task errors to HTTP errors.
+    files (uploads the task reads) are deleted by the job manager once the job ends.
+    """
+    try:
+        return await job_manager.run(kind, fn, *args, files=files)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except JobCancelled as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def stream_format(fmt: str):
+    """
+    Returns (media type, encoder) for a stream format, or raises a 400.
+    """
+    if fmt not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{fmt}', expected one of {list(STREAM_FORMATS)}.")
+    return STREAM_FORMATS[fmt]
+
+
+def stream_job(kind: str, fmt: str, fn, *args, files=()) -> StreamingResponse:
+    """
+    Runs a generator task in the job pool and streams its records as NDJSON or
+    Server-Sent Events while the worker produces them. Failures after the first
+    byte can't change the status code, so they arrive as a final error record.
+    """
+    media_type, encode = stream_format(fmt)
+    try:
+        _, records = job_manager.stream(kind, fn, *args, files=files)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    async def body():
+        try:
+            async for record in records:
+                yield encode(record)
+        except Exception as e:
+            yield encode(error_record(str(e)))
+        finally:
+            # On disconnect this stops the worker instead of letting it run to completion
+            await records.aclose()
+
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+async def save_upload_to_temp(file: UploadFile) -> str:
+    """
+    Copies an upload to a temporary file so a worker process can open it.
+    UPLOAD_DIR must be shared storage when workers run on other nodes.
+    """
+    def copy():
+        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf", dir=UPLOAD_DIR) as tmp:
+            shutil.copyfileobj(file.file, tmp)
+            return tmp.name
+    return await asyncio.to_thread(copy)
+
+
 # ────────────────────────────────────────────────
 # 📡 Regulatory Monitoring Endpoint
 # ────────────────────────────────────────────────
 @app.get("/regulations/monitor", tags=["Regulatory Monitoring"], summary="Monitor & Fetch Regulation PDFs")
 async def monitor_regulations():
     """
-    Scrapes known regulatory websites (MNRE, SECI, CERC), finds policy update PDFs, and downloads the most recent one.
+    Scrapes known regulatory websites (MNRE, SECI, CERC), finds policy update PDFs, and downloads every new one.
+    Sources and their link-extraction rules are configured in assets/sources.json.
     """
-    return monitor_and_download_top_pdf([
-        "https://mnre.gov.in/en/monthly-updates/?utm_source"
-        # "https://seci.co.in/category/monthly-reports",
-        # "https://cercind.gov.in/whatsnew.html"
-    ])
+    return await monitor_and_download_pdfs()
 
 # ────────────────────────────────────────────────
 
@@ -64,15 +175,16 @@ async def analyze_latest_pdf():
     """
     Analyzes the most recently downloaded PDF from monitored regulatory sources and saves extracted data.
     """
-    agent = AnalyzingAgent()
-    result = agent.analyze_latest()
+    return await run_job("analyze-latest", tasks.analyze_latest_task)
 
-    if "error" not in result:
-        audit_path = save_json_audit(result, result["filename"])
-        result["audit_saved_to"] = audit_path
-        result["download_url"] = f"/documents/audit/{os.path.basename(audit_path)}"
-
-    return result
+@app.get("/documents/analyze-latest/stream", tags=["Compliance Analysis"], summary="Stream Analysis of the Latest Regulation PDF")
+async def analyze_latest_pdf_stream(format: str = "ndjson"):
+    """
+    Same analysis as /documents/analyze-latest, streamed as each chunk finishes: one record per chunk with the
+    obligations, penalties, entities and dates found there, then a summary once the audit JSON is saved.
+    `format` is `ndjson` or `sse`.
+    """
+    return stream_job("analyze-latest-stream", format, tasks.analyze_latest_stream_task)
 
 # 📄 PDF Upload Endpoint
 # ────────────────────────────────────────────────
@@ -98,12 +210,24 @@ async def upload_internal_policy(file: UploadFile = File(...)):
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
-    agent = CompanyPolicyAgent(file)
-    result = agent.extract_and_save()
-    return result
+    pdf_path = await save_upload_to_temp(file)
+    return await run_job("company-policy", tasks.company_policy_task, pdf_path, file.filename, files=[pdf_path])
 
 
-from agents.risk_flagger_agent import RiskFlaggerAgent
+@app.post("/upload-company-policy/stream", tags=["Compliance Analysis"], summary="Stream Extraction of a Company Policy PDF")
+async def upload_internal_policy_stream(file: UploadFile = File(...), format: str = "ndjson"):
+    """
+    Streaming form of /upload-company-policy/: chunk records as the policy is analyzed, then a summary once it is saved.
+    """
+    if file.content_type != "application/pdf":
+        raise HTTPException(status_code=400, detail="Only PDF files are supported.")
+    # Checked before the upload is saved, so a bad format leaves nothing behind
+    stream_format(format)
+
+    pdf_path = await save_upload_to_temp(file)
+    return stream_job("company-policy-stream", format, tasks.company_policy_stream_task, pdf_path, file.filename,
+                      files=[pdf_path])
+
 
 @app.get("/flag-compliance-risk/latest", tags=["Risk Analysis"], summary="Compare Latest MNRE & Internal Policy JSONs")
 async def flag_latest_compliance_risks():
@@ -111,80 +235,39 @@ async def flag_latest_compliance_risks():
     Automatically compares the latest extracted MNRE regulation file
     with the latest internal policy file and flags compliance risks.
     """
-    from pathlib import Path
-
-    internal_dir = Path("audit_logs/internal")
-    external_dir = Path("audit_logs")
-
-    # Get latest internal file
-    internal_files = list(internal_dir.glob("*.json"))
-    if not internal_files:
-        raise HTTPException(status_code=404, detail="No internal policy files found.")
-    latest_internal = max(internal_files, key=lambda f: f.stat().st_mtime)
-
-    # Get latest external file (excluding the internal folder)
-    external_files = [f for f in external_dir.glob("*.json") if "internal" not in str(f)]
-    if not external_files:
-        raise HTTPException(status_code=404, detail="No external regulation files found.")
-    latest_external = max(external_files, key=lambda f: f.stat().st_mtime)
+    return await run_job("flag-latest", tasks.flag_latest_task)
 
-    # Run risk comparison
-    agent = RiskFlaggerAgent(str(latest_external), str(latest_internal))
-    result = agent.compare()
-
-    # Include which files were compared
-    result["compared_files"] = {
-        "external": latest_external.name,
-        "internal": latest_internal.name
-    }
-    return result
 
+@app.get("/flag-compliance-risk/matrix", tags=["Risk Analysis"], summary="Compare a Regulation Against All Internal Policies")
+async def flag_compliance_matrix(external: str = None):
+    """
+    Compares one extracted regulation (the latest, or the audit file named by `external`)
+    against every internal policy and returns a score matrix with per-pair risk flags.
+    """
+    return await run_job("matrix", tasks.compliance_matrix_task, external)
 
-from agents.risk_flagger_agent import RiskFlaggerAgent
-from agents.reporting_agent import ReportingAgent
-from pathlib import Path
 
 @app.post("/report-and-notify", tags=["Automation"], summary="Analyze, Generate Report, Flag Risk (No Email)")
 async def report_and_notify_demo():
-    # Step 1: Load latest MNRE (external) and internal JSONs
-    external_dir = Path("audit_logs")
-    internal_dir = Path("audit_logs/internal")
-
-    internal_files = list(internal_dir.glob("*.json"))
-    external_files = [f for f in external_dir.glob("*.json") if "internal" not in str(f)]
-
-    if not internal_files or not external_files:
-        raise HTTPException(status_code=404, detail="Missing required input files.")
-
-    latest_internal = max(internal_files, key=lambda f: f.stat().st_mtime)
-    latest_external = max(external_files, key=lambda f: f.stat().st_mtime)
-
-    # Step 2: Run comparison
-    flagger = RiskFlaggerAgent(str(latest_external), str(latest_internal))
-    flagged = flagger.compare()
-
-    # Step 3: Generate reports (PDF/Excel)
-    reporter = ReportingAgent()
-    filename = Path(latest_external).stem + "__vs__" + Path(latest_internal).stem
-
-    flagged["filename"] = filename  # required by ReportingAgent
-    excel_path = reporter.generate_excel(flagged, filename)
-    pdf_path = reporter.generate_pdf(flagged, filename)
-
-    # Step 4: Return all in response
-    return {
-        "message": "Risk analysis completed, reports generated.",
-        "compliance_score": flagged.get("compliance_score"),
-        "risk_flags": flagged.get("risk_flags"),
-        "report_files": {
-            "excel": str(excel_path),
-            "pdf": str(pdf_path)
-        },
-        "compared_files": {
-            "external": Path(latest_external).name,
-            "internal": Path(latest_internal).name
-        }
-    }
+    # Loads the latest MNRE (external) and internal JSONs, runs the comparison
+    # and generates PDF/Excel reports in a worker process
+    return await run_job("report", tasks.report_latest_task)
+
+
+@app.get("/reports/portfolio", tags=["Automation"], summary="Portfolio Report Across All Stored Comparisons")
+async def portfolio_report(since: float = None, latest_only: bool = True):
+    """
+    Builds one workbook (summary sheet plus one sheet per regulation/policy pair) and a summary PDF
+    from stored comparison results, and streams both back as a zip archive. The files are deleted once sent.
+    `since` is a Unix timestamp; `latest_only` keeps just the newest result per pair.
+    """
+    report = await run_job("portfolio", tasks.portfolio_report_task, since, latest_only)
+    name = Path(report["excel"]).stem
+    return StreamingResponse(
+        iter_zip_stream([report["excel"], report["pdf"]], delete=True),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{name}.zip"'}
+    )
 
 
 # @app.post("/report-and-notify", tags=["Automation"], summary="Analyze, Generate Report, Simulate Notification")
@@ -222,15 +305,126 @@ async def report_and_notify_demo():
 #     return result
 
 
+# ────────────────────────────────────────────────
+# ⏳ Background Job Endpoints
+# ────────────────────────────────────────────────
+@app.post("/jobs/upload-company-policy/", tags=["Jobs"], summary="Submit a Company Policy Extraction Job")
+async def submit_policy_job(file: UploadFile = File(...)):
+    if file.content_type != "application/pdf":
+        raise HTTPException(status_code=400, detail="Only PDF files are supported.")
+
+    pdf_path = await save_upload_to_temp(file)
+    try:
+        # The job manager deletes the upload when the job ends, is cancelled or is rejected
+        job = await job_manager.submit_async("company-policy", tasks.company_policy_task, pdf_path, file.filename,
+                                             files=[pdf_path])
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+
+@app.post("/jobs/{kind}", tags=["Jobs"], summary="Submit a Background Job")
+async def submit_job(kind: str):
+    """
+    Queues an analysis or report job (analyze-latest, flag-latest, report) and returns its ID immediately.
+    """
+    fn = tasks.JOB_TASKS.get(kind)
+    if fn is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind: {kind}")
+    try:
+        job = await job_manager.submit_async(kind, fn)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+
+@app.get("/jobs", tags=["Jobs"], summary="List Background Jobs")
+async def list_jobs():
+    return [job.to_dict() for job in job_manager.list()]
+
+
+@app.get("/jobs/{job_id}", tags=["Jobs"], summary="Get Job Status")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Returns the job status and result. Pass `wait` (seconds) to block until the job finishes or the wait elapses.
+    """
+    job = await job_manager.wait(job_id, timeout=wait) if wait > 0 else job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
+
+
+@app.delete("/jobs/{job_id}", tags=["Jobs"], summary="Cancel a Job")
+async def cancel_job(job_id: str):
+    if job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return {"job_id": job_id, "cancelled": job_manager.cancel(job_id)}
+
+
+# ────────────────────────────────────────────────
+# 🧹 Retention Endpoint
+# ────────────────────────────────────────────────
+@app.post("/system/retention", tags=["System"], summary="Run Retention Cleanup")
+async def run_retention_now(dry_run: bool = True):
+    """
+    Applies the per-directory age and size quotas now. Defaults to a dry run that only reports what would be deleted.
+    """
+    return await asyncio.to_thread(run_retention, None, dry_run)
+
+
+# ────────────────────────────────────────────────
+# ⚙️ System Status Endpoint
+# ────────────────────────────────────────────────
+@app.get("/metrics", tags=["System"], summary="Prometheus Metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Stage latency histograms, pipeline counters (pages, sentences, comparisons, cache hits)
+    and per-route request latency in the Prometheus text format, including work done in job workers.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/system/models", tags=["System"], summary="NLP Model Load Status")
+async def model_status():
+    """
+    Reports which NLP models are loaded in this worker and how long each took to load.
+    """
+    return models.model_stats()
+
+
+@app.get("/system/cache", tags=["System"], summary="Analysis Cache Statistics")
+async def cache_status():
+    """
+    Reports hit/miss counters of the content-addressed analysis cache, summed over the job workers,
+    and its size on disk. Jobs run by broker workers are not counted.
+    """
+    return await asyncio.to_thread(analysis_cache.pool_stats)
+
+
 # ────────────────────────────────────────────────
 # 📥 JSON Download Endpoint
 # ────────────────────────────────────────────────
+@app.get("/documents/audit", tags=["Audit Logs"], summary="List Audit Logs")
+async def list_audit_logs(source: str = None, limit: int = 50, offset: int = 0):
+    """
+    Lists indexed audit results, newest first. Filter by `source` (external or internal_policy).
+    """
+    limit = max(1, min(limit, 500))
+    items = await asyncio.to_thread(audit_index.list, source, limit, offset)
+    return {"items": items, "limit": limit, "offset": offset}
+
+
 @app.get("/documents/audit/{filename}", tags=["Audit Logs"], summary="Download Extracted Audit JSON")
 async def download_json(filename: str):
     """
     Downloads a previously extracted compliance audit result in JSON format.
     """
-    file_path = AUDIT_DIR / filename
-    if not file_path.exists():
+    row = await asyncio.to_thread(audit_index.find, filename, EXTERNAL)
+    if not row or not audit_index.exists(row):
         raise HTTPException(status_code=404, detail="Audit log not found.")
-    return FileResponse(path=file_path, filename=filename, media_type='application/json')
+    if row["segment"]:
+        # Stored as a segment record: rebuild the regular JSON layout on the fly
+        content = await asyncio.to_thread(read_audit_bytes, row["path"])
+        return Response(content=content, media_type='application/json',
+                        headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    return FileResponse(path=row["path"], filename=filename, media_type='application/json')
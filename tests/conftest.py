@@ -0,0 +1,58 @@
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class LocalSite:
+    """
+    A tiny in-thread HTTP server. Each route maps a path to a handler
+    taking the request headers and returning (status, headers, body);
+    every request is recorded as (path, headers).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.requests.append((self.path, dict(self.headers)))
+                route = site.routes.get(self.path)
+                if route is None:
+                    status, headers, body = 404, {}, b""
+                else:
+                    status, headers, body = route(self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path: str) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def hits(self, path: str) -> list:
+        return [headers for p, headers in self.requests if p == path]
+
+
+@pytest.fixture
+def local_site():
+    site = LocalSite()
+    site.thread.start()
+    yield site
+    site.server.shutdown()
+    site.server.server_close()
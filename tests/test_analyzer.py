@@ -0,0 +1,42 @@
+import pytest
+
+spacy = pytest.importorskip("spacy")
+
+from core.analyzer import _collect, _new_result
+from core.metrics import metrics
+from core.rules import RuleEngine
+
+RULES = {
+    "obligations": ["shall", "must"],
+    "penalties": ["penalty", "fine"],
+}
+TEXT = ("Developers shall submit the report. A penalty applies to late filings. "
+        "The committee met in March. Operators must pay a fine for each breach.")
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    metrics.drain()
+    yield
+    metrics.drain()
+
+
+def test_collect_matches_classify_sentences_and_counts_every_sentence():
+    # A blank pipeline with a rule-based sentencizer, so no trained model is needed
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    engine = RuleEngine(RULES, nlp)
+    doc = nlp(TEXT)
+
+    result = _new_result(engine.categories)
+    _collect(doc, result, engine)
+
+    expected = _new_result(engine.categories)
+    for sentence, categories in engine.classify_sentences(doc):
+        for category in categories:
+            expected[category].append(sentence)
+    assert {c: result[c] for c in RULES} == {c: expected[c] for c in RULES}
+    assert result["penalties"] == ["A penalty applies to late filings.",
+                                   "Operators must pay a fine for each breach."]
+    assert metrics.total("sentences") == 4
+    assert metrics.total("matched_sentences") == 3
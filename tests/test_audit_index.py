@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+import core.audit_index
+import core.audit_store
+from core.audit_index import AuditIndex, EXTERNAL, INTERNAL
+from core.audit_store import SegmentStore
+
+
+@pytest.fixture
+def audit_dirs(tmp_path, monkeypatch):
+    external, internal = tmp_path / "audit_logs", tmp_path / "audit_logs" / "internal"
+    internal.mkdir(parents=True)
+    monkeypatch.setattr(core.audit_index, "AUDIT_DIR", external)
+    monkeypatch.setattr(core.audit_index, "INTERNAL_POLICY_DIR", internal)
+    monkeypatch.setattr(core.audit_store, "segment_store", SegmentStore(tmp_path / "segments"))
+    return external, internal
+
+
+def write(path, obligations):
+    path.write_text(json.dumps({"filename": path.stem + ".pdf", "obligations": ["x"] * obligations}))
+    return path
+
+
+def test_rebuild_indexes_files_and_segments(audit_dirs, tmp_path):
+    external, internal = audit_dirs
+    write(external / "reg.json", 2)
+    write(internal / "policy.json", 1)
+    (external / "broken.json").write_text("{")
+    core.audit_store.segment_store.append({"path": str(external / "seg.json"), "source": EXTERNAL,
+                                           "created_at": 5.0, "data": {"obligations": ["x"] * 3}})
+
+    index = AuditIndex(tmp_path / "index.sqlite3")
+    counts = index.rebuild()
+
+    assert counts == {EXTERNAL: 1, INTERNAL: 1, "skipped": 1, "segment_records": 1}
+    assert index.get(external / "reg.json")["obligations"] == 2
+    assert index.get(internal / "policy.json")["source"] == INTERNAL
+    assert index.get(external / "seg.json")["segment"] == "segment_000001.seg"
+
+
+def test_failed_rebuild_leaves_the_old_index_in_place(audit_dirs, tmp_path, monkeypatch):
+    external, _ = audit_dirs
+    index = AuditIndex(tmp_path / "index.sqlite3")
+    index.record(write(external / "old.json", 1), {"obligations": ["x"]}, EXTERNAL)
+    write(external / "new.json", 2)
+
+    def fail_midway(conn, rows):
+        conn.execute("INSERT INTO audit_files (path, filename, source, content_hash, created_at, size) "
+                     "VALUES ('partial', 'partial', 'external', '', 0, 0)")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(core.audit_index, "_insert", fail_midway)
+    with pytest.raises(OSError):
+        index.rebuild()
+
+    # The delete and the partial insert were rolled back together
+    assert [row["filename"] for row in index.list()] == ["old.json"]
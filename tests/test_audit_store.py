@@ -0,0 +1,92 @@
+import pytest
+
+import core.audit_store
+from core.audit_index import AuditIndex, EXTERNAL
+from core.audit_store import HEADER, SegmentStore, reindex_segments
+
+
+def envelope(name: str, obligations: int = 1, created_at: float = 1.0) -> dict:
+    return {"path": f"audit_logs/{name}.json", "source": EXTERNAL, "created_at": created_at,
+            "source_hash": None, "data": {"filename": f"{name}.pdf", "obligations": ["x"] * obligations}}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SegmentStore(tmp_path / "segments")
+    monkeypatch.setattr(core.audit_store, "segment_store", store)
+    return store
+
+
+def records(store, segment):
+    return [data["path"] for _, _, data in store.iter_records(segment)]
+
+
+def test_records_read_back_by_offset(store):
+    locations = [store.append(envelope(f"doc{i}")) for i in range(3)]
+    for i, (segment, offset, length) in enumerate(locations):
+        assert store.read(segment, offset, length)["path"] == f"audit_logs/doc{i}.json"
+    assert records(store, "segment_000001.seg") == [f"audit_logs/doc{i}.json" for i in range(3)]
+
+
+def test_full_segment_rotates(tmp_path):
+    store = SegmentStore(tmp_path / "segments", max_segment_bytes=1)
+    first = store.append(envelope("a"))
+    second = store.append(envelope("b"))
+    assert (first[0], second[0]) == ("segment_000001.seg", "segment_000002.seg")
+    assert second[1] == 0
+
+
+def test_torn_tail_is_skipped(store):
+    store.append(envelope("kept"))
+    segment, offset, length = store.append(envelope("torn"))
+    path = store.segment_dir / segment
+    # A crash mid-append leaves only part of the last record
+    with open(path, "r+b") as f:
+        f.truncate(offset + length - 5)
+
+    assert records(store, segment) == ["audit_logs/kept.json"]
+
+
+def test_torn_header_is_skipped(store):
+    segment, _, _ = store.append(envelope("kept"))
+    with open(store.segment_dir / segment, "ab") as f:
+        f.write(b"ACR")
+    assert records(store, segment) == ["audit_logs/kept.json"]
+
+
+def test_garbled_record_stops_the_scan(store):
+    store.append(envelope("kept"))
+    segment, offset, length = store.append(envelope("garbled"))
+    store.append(envelope("after"))
+    path = store.segment_dir / segment
+    data = bytearray(path.read_bytes())
+    data[offset + HEADER.size:offset + HEADER.size + 4] = b"\xff\xff\xff\xff"
+    path.write_bytes(bytes(data))
+
+    assert records(store, segment) == ["audit_logs/kept.json"]
+
+
+def test_empty_segment_yields_nothing(store):
+    store.append(envelope("a"))
+    # A crash right after rotating leaves an empty segment behind
+    (store.segment_dir / "segment_000002.seg").touch()
+    assert records(store, "segment_000002.seg") == []
+    assert store.append(envelope("b"))[0] == "segment_000002.seg"
+
+
+def test_reindex_rebuilds_the_index_from_segments(store, tmp_path):
+    store.append(envelope("a", obligations=1, created_at=1.0))
+    store.append(envelope("b", obligations=2, created_at=2.0))
+    segment, offset, length = store.append(envelope("a", obligations=3, created_at=3.0))
+    (store.segment_dir / "segment_000002.seg").touch()
+    with open(store.segment_dir / segment, "ab") as f:
+        f.write(b"\x00" * 3)
+
+    index = AuditIndex(tmp_path / "index.sqlite3")
+    assert reindex_segments(index) == 3
+
+    row = index.get("audit_logs/a.json")
+    # The later record for the same path wins
+    assert (row["segment"], row["seg_offset"], row["seg_length"]) == (segment, offset, length)
+    assert row["obligations"] == 3
+    assert index.get("audit_logs/b.json")["obligations"] == 2
@@ -0,0 +1,174 @@
+import pytest
+
+import core.broker
+from core.broker import JobBroker
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(core.broker, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def broker(tmp_path, clock):
+    return JobBroker(tmp_path / "broker.sqlite3", max_attempts=3, retry_backoff=10)
+
+
+@pytest.fixture
+def upload(tmp_path):
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    return path
+
+
+def test_identical_queued_jobs_are_coalesced(broker):
+    first = broker.enqueue("report", "report", [])
+    assert broker.enqueue("report", "report", []) == first
+    assert broker.enqueue("analyze", "analyze_latest", ["a.pdf"]) != first
+    assert len(broker.list()) == 2
+
+
+def test_running_job_is_not_coalesced(broker):
+    first = broker.enqueue("report", "report", [])
+    broker.lease("w1", lease_seconds=30)
+    assert broker.enqueue("report", "report", []) != first
+
+
+def test_lease_hands_out_oldest_job_once(broker, clock):
+    first = broker.enqueue("a", "task", [1])
+    clock.advance(1)
+    second = broker.enqueue("b", "task", [2])
+
+    assert broker.lease("w1")["id"] == first
+    assert broker.lease("w2")["id"] == second
+    assert broker.lease("w3") is None
+
+
+def test_expired_lease_goes_to_another_worker(broker, clock):
+    job_id = broker.enqueue("a", "task", [])
+    broker.lease("w1", lease_seconds=30)
+
+    clock.advance(20)
+    assert broker.lease("w2", lease_seconds=30) is None
+    assert broker.heartbeat(job_id, "w1", lease_seconds=30)
+
+    clock.advance(31)
+    job = broker.lease("w2", lease_seconds=30)
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+    # The first worker lost the job and can no longer report on it
+    assert not broker.heartbeat(job_id, "w1")
+    assert not broker.complete(job_id, "w1", "late")
+    assert broker.complete(job_id, "w2", {"ok": True})
+    assert broker.get(job_id)["result"] == {"ok": True}
+
+
+def test_lease_expiry_on_last_attempt_fails_the_job(broker, clock, upload):
+    job_id = broker.enqueue("a", "task", [], max_attempts=1, files=[str(upload)])
+    broker.lease("w1", lease_seconds=30)
+
+    clock.advance(31)
+    assert broker.lease("w2") is None
+    job = broker.get(job_id)
+    assert job["status"] == "failed"
+    assert job["error_type"] == "LeaseExpired"
+    assert not upload.exists()
+
+
+def test_failed_attempt_is_retried_with_backoff(broker, clock, upload):
+    job_id = broker.enqueue("a", "task", [], files=[str(upload)])
+
+    broker.lease("w1")
+    assert broker.fail(job_id, "w1", ValueError("boom"))
+    job = broker.get(job_id)
+    assert (job["status"], job["error"], job["error_type"]) == ("queued", "boom", "ValueError")
+    assert upload.exists()
+
+    # First retry after retry_backoff, the second after twice that
+    clock.advance(9)
+    assert broker.lease("w1") is None
+    clock.advance(1)
+    assert broker.lease("w1")["attempts"] == 2
+    broker.fail(job_id, "w1", ValueError("boom"))
+    clock.advance(19)
+    assert broker.lease("w1") is None
+    clock.advance(1)
+    assert broker.lease("w1")["attempts"] == 3
+
+    broker.fail(job_id, "w1", ValueError("boom"))
+    assert broker.get(job_id)["status"] == "failed"
+    assert not upload.exists()
+
+
+def test_non_retryable_failure_is_final(broker, upload):
+    job_id = broker.enqueue("a", "task", [], files=[str(upload)])
+    broker.lease("w1")
+    broker.fail(job_id, "w1", ValueError("bad input"), retry=False)
+    assert broker.get(job_id)["status"] == "failed"
+    assert not upload.exists()
+
+
+def test_completing_deletes_the_upload(broker, upload):
+    job_id = broker.enqueue("a", "task", [], files=[str(upload)])
+    broker.lease("w1")
+    broker.complete(job_id, "w1", None)
+    assert broker.get(job_id)["status"] == "completed"
+    assert not upload.exists()
+
+
+def test_only_queued_jobs_can_be_cancelled(broker, upload):
+    queued = broker.enqueue("a", "task", [1], files=[str(upload)])
+    assert broker.cancel(queued)
+    assert broker.get(queued)["status"] == "cancelled"
+    assert not upload.exists()
+
+    running = broker.enqueue("a", "task", [2])
+    broker.lease("w1")
+    assert not broker.cancel(running)
+    assert broker.get(running)["status"] == "running"
+
+
+def test_leadership_is_exclusive_until_it_lapses(broker, clock):
+    assert broker.acquire_leadership("retention", "a", ttl=60)
+    assert not broker.acquire_leadership("retention", "b", ttl=60)
+    # Other names are independent; the holder renews its own lease
+    assert broker.acquire_leadership("other", "b", ttl=60)
+    clock.advance(50)
+    assert broker.acquire_leadership("retention", "a", ttl=60)
+
+    clock.advance(50)
+    assert not broker.acquire_leadership("retention", "b", ttl=60)
+    clock.advance(11)
+    assert broker.acquire_leadership("retention", "b", ttl=60)
+    assert not broker.acquire_leadership("retention", "a", ttl=60)
+
+
+def test_released_leadership_is_free_at_once(broker):
+    broker.acquire_leadership("retention", "a", ttl=60)
+    broker.release_leadership("retention", "b")
+    assert not broker.acquire_leadership("retention", "b", ttl=60)
+    broker.release_leadership("retention", "a")
+    assert broker.acquire_leadership("retention", "b", ttl=60)
+
+
+def test_broker_state_is_shared_between_instances(tmp_path, clock):
+    # What separate API and worker processes see through the same file
+    api = JobBroker(tmp_path / "broker.sqlite3")
+    worker = JobBroker(tmp_path / "broker.sqlite3")
+    job_id = api.enqueue("a", "task", ["x"])
+    assert worker.lease("w1")["args"] == ["x"]
+    worker.complete(job_id, "w1", 42)
+    assert api.get(job_id)["result"] == 42
@@ -0,0 +1,65 @@
+import hashlib
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import UploadFile
+
+import agents.company_policy_agent as policy_agent
+import core.audit_store
+from agents.company_policy_agent import CompanyPolicyAgent
+from core.audit_index import AuditIndex
+
+
+class FakeExtraction:
+    # Stands in for spaCy analysis; the saved layout is what's under test
+    def __init__(self, file):
+        self.file = file
+        self.digest = None
+
+    def run(self, progress=None):
+        data = getattr(self.file, "file", self.file).read()
+        self.digest = hashlib.sha256(data).hexdigest()
+        return {"obligations": [data.decode()]}
+
+
+@pytest.fixture
+def policies(tmp_path, monkeypatch):
+    monkeypatch.setattr(policy_agent, "ExtractionAgent", FakeExtraction)
+    monkeypatch.setattr(policy_agent, "INTERNAL_POLICY_DIR", tmp_path)
+    monkeypatch.setattr(core.audit_store, "audit_index", AuditIndex(tmp_path / "index.sqlite3"))
+    return tmp_path
+
+
+def upload(content: bytes, filename="policy.pdf"):
+    return CompanyPolicyAgent(UploadFile(file=io.BytesIO(content), filename=filename)).extract_and_save()
+
+
+def test_same_filename_with_different_content_keeps_both(policies):
+    first = upload(b"Keep records for five years")
+    second = upload(b"Keep records for seven years")
+
+    assert first["audit_saved_to"] != second["audit_saved_to"]
+    saved = {json.loads(p.read_text())["obligations"][0] for p in policies.glob("*.json")}
+    assert saved == {"Keep records for five years", "Keep records for seven years"}
+
+
+def test_reupload_of_the_same_document_replaces_its_own_file(policies):
+    first = upload(b"Keep records for five years")
+    again = upload(b"Keep records for five years")
+
+    assert again["audit_saved_to"] == first["audit_saved_to"]
+    assert len(list(policies.glob("*.json"))) == 1
+    assert first["audit_saved_to"].endswith(
+        f"policy_{hashlib.sha256(b'Keep records for five years').hexdigest()[:12]}.json")
+
+
+def test_plain_file_objects_take_the_filename_separately(policies):
+    result = CompanyPolicyAgent(io.BytesIO(b"Report incidents within 24 hours"),
+                                filename="sop.pdf").extract_and_save()
+
+    assert result["filename"] == "sop.pdf"
+    assert Path(result["audit_saved_to"]).name.startswith("sop_")
@@ -0,0 +1,62 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import agents.compliance_matrix_agent as matrix_agent
+import agents.risk_flagger_agent
+import core.jobs
+from agents.compliance_matrix_agent import ComplianceMatrixAgent
+from core.flagger_state import FlaggerState
+
+
+class RecordingPool(ProcessPoolExecutor):
+    sizes = []
+
+    def __init__(self, max_workers=None, **kwargs):
+        RecordingPool.sizes.append(max_workers)
+        super().__init__(max_workers=max_workers, **kwargs)
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    monkeypatch.setattr(agents.risk_flagger_agent, "flagger_state", FlaggerState(tmp_path / "flagger.sqlite3"))
+    paths = {"external": [], "internal": []}
+    for side, count in (("external", 2), ("internal", 3)):
+        for i in range(count):
+            path = tmp_path / f"{side}_{i}.json"
+            path.write_text(json.dumps({
+                "obligations": [f"Operators shall file report {n}" for n in range(i, i + 4)],
+                "penalties": [f"Fine of {100 * (i + 1)} rupees"],
+                "entities": ["MNRE", f"Agency {i}"],
+                "dates": [],
+            }))
+            paths[side].append(path)
+    return paths
+
+
+@pytest.fixture
+def recording_pool(monkeypatch):
+    RecordingPool.sizes = []
+    monkeypatch.setattr(matrix_agent, "ProcessPoolExecutor", RecordingPool)
+    return RecordingPool.sizes
+
+
+def test_matrix_runs_in_parallel_inside_a_job_worker(corpus, recording_pool, monkeypatch):
+    serial = ComplianceMatrixAgent(corpus["external"], corpus["internal"]).run(workers=1)
+
+    # A worker of a 2-process job pool on an 8-CPU machine gets 4 CPUs
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(core.jobs, "_job_pool_size", 2)
+    parallel = ComplianceMatrixAgent(corpus["external"], corpus["internal"]).run(workers=8)
+
+    assert recording_pool == [4]
+    assert parallel == serial
+
+
+def test_nested_matrix_pool_is_capped_to_the_workers_share(corpus, recording_pool, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(core.jobs, "_job_pool_size", 4)
+    ComplianceMatrixAgent(corpus["external"], corpus["internal"]).run(workers=8)
+    assert recording_pool == []
@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("bs4")
+
+import core.crawler
+from core.crawler import CrawlState, RegulatoryCrawler
+
+PAGE = b"""
+<html><body>
+  <a href="/docs/policy-update-2024.pdf">Policy update 2024</a>
+  <a href="/docs/annual-report.pdf">Annual report</a>
+  <a href="/about.html">Regulatory update overview</a>
+</body></html>
+"""
+
+
+def etag_page(etag='"v1"', body=PAGE):
+    def route(headers):
+        if headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag, "Content-Type": "text/html"}, body
+    return route
+
+
+def make_crawler(site, tmp_path, **kwargs):
+    kwargs.setdefault("backoff", 0)
+    return RegulatoryCrawler([site.url("/news")], state=CrawlState(tmp_path / "state.json"), **kwargs)
+
+
+def test_first_crawl_extracts_matching_links(local_site, tmp_path):
+    local_site.routes["/news"] = etag_page()
+    updates, statuses = asyncio.run(make_crawler(local_site, tmp_path).crawl())
+
+    assert [u["url"] for u in updates] == [local_site.url("/docs/policy-update-2024.pdf")]
+    assert list(statuses.values()) == ["fetched"]
+    assert (tmp_path / "state.json").exists()
+
+
+def test_unchanged_page_is_served_from_state_via_304(local_site, tmp_path):
+    local_site.routes["/news"] = etag_page()
+    first, _ = asyncio.run(make_crawler(local_site, tmp_path).crawl())
+
+    # A fresh crawler reloads the saved validators and links from disk
+    second, statuses = asyncio.run(make_crawler(local_site, tmp_path).crawl())
+
+    assert second == first
+    assert list(statuses.values()) == ["not_modified"]
+    conditional = local_site.hits("/news")[1]
+    assert conditional.get("If-None-Match") == '"v1"'
+
+
+def test_changed_etag_refetches(local_site, tmp_path):
+    local_site.routes["/news"] = etag_page('"v1"')
+    asyncio.run(make_crawler(local_site, tmp_path).crawl())
+
+    changed = PAGE.replace(b"policy-update-2024", b"policy-update-2025")
+    local_site.routes["/news"] = etag_page('"v2"', changed)
+    updates, statuses = asyncio.run(make_crawler(local_site, tmp_path).crawl())
+
+    assert [u["url"] for u in updates] == [local_site.url("/docs/policy-update-2025.pdf")]
+    assert list(statuses.values()) == ["fetched"]
+
+
+def test_retries_transient_errors(local_site, tmp_path):
+    responses = [(503, {}, b""), (503, {}, b"")]
+
+    def flaky(headers):
+        return responses.pop(0) if responses else etag_page()(headers)
+
+    local_site.routes["/news"] = flaky
+    updates, statuses = asyncio.run(make_crawler(local_site, tmp_path, retries=3).crawl())
+
+    assert len(local_site.hits("/news")) == 3
+    assert list(statuses.values()) == ["fetched"]
+    assert len(updates) == 1
+
+
+def test_exhausted_retries_report_an_error(local_site, tmp_path):
+    local_site.routes["/news"] = lambda headers: (503, {}, b"")
+    updates, statuses = asyncio.run(make_crawler(local_site, tmp_path, retries=1).crawl())
+
+    assert len(local_site.hits("/news")) == 2
+    assert "error" in updates[0]
+    assert list(statuses.values())[0].startswith("error:")
+
+
+def test_304_without_stored_state_falls_back_to_a_full_fetch(local_site, tmp_path):
+    def cache_in_between(headers):
+        # Answers 304 unless told not to use a cached copy
+        if headers.get("Cache-Control") == "no-cache":
+            return 200, {"ETag": '"v1"'}, PAGE
+        return 304, {}, b""
+
+    local_site.routes["/news"] = cache_in_between
+    updates, statuses = asyncio.run(make_crawler(local_site, tmp_path).crawl())
+
+    assert [u["url"] for u in updates] == [local_site.url("/docs/policy-update-2024.pdf")]
+    assert list(statuses.values()) == ["fetched"]
+
+
+def test_failed_state_save_keeps_the_previous_state(tmp_path, monkeypatch):
+    state = CrawlState(tmp_path / "state.json")
+    state.pages = {"https://a.example/": {"etag": '"v1"', "links": []}}
+    state.save()
+
+    def torn_dump(obj, f):
+        f.write('{"https://a.example/": {"et')
+        raise OSError("disk full")
+
+    state.pages = {"https://b.example/": {"etag": '"v2"', "links": []}}
+    monkeypatch.setattr(core.crawler.json, "dump", torn_dump)
+    with pytest.raises(OSError):
+        state.save()
+    monkeypatch.undo()
+
+    assert CrawlState(tmp_path / "state.json").pages == {"https://a.example/": {"etag": '"v1"', "links": []}}
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_sync_entry_points_run_to_completion(local_site, tmp_path, monkeypatch):
+    from agents.monitoring_agent import MonitoringAgent, monitor_and_download_top_pdf
+
+    monkeypatch.chdir(tmp_path)
+    local_site.routes["/news"] = etag_page()
+    local_site.routes["/docs/policy-update-2024.pdf"] = lambda headers: (200, {}, b"%PDF-1.4 update")
+
+    agent = MonitoringAgent([local_site.url("/news")])
+    assert [u["url"] for u in agent.fetch_and_extract()] == [local_site.url("/docs/policy-update-2024.pdf")]
+
+    result = monitor_and_download_top_pdf([local_site.url("/news")])
+    update = result["regulatory_updates"][0]
+    assert update["download_status"] == "downloaded"
+    with open(update["downloaded_to"], "rb") as f:
+        assert f.read() == b"%PDF-1.4 update"
+
+
+def test_fetch_and_extract_inside_a_running_loop_does_not_block_it(local_site, tmp_path):
+    from agents.monitoring_agent import MonitoringAgent
+
+    local_site.routes["/news"] = etag_page()
+    agent = MonitoringAgent([local_site.url("/news")])
+    agent.crawler.state = CrawlState(tmp_path / "state.json")
+
+    async def caller():
+        pending = agent.fetch_and_extract()
+        # Handed back at once; the crawl runs on this loop when awaited
+        assert not pending.done()
+        return await pending
+
+    updates = asyncio.run(caller())
+    assert [u["url"] for u in updates] == [local_site.url("/docs/policy-update-2024.pdf")]
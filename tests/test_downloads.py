@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import os
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("bs4")
+
+from core.crawler import CrawlState, RegulatoryCrawler
+from core.downloads import DownloadManager, DownloadManifest, DownloadTooLarge
+
+URL = "https://regulator.example/docs/guidelines.pdf"
+BODY = bytes(range(256)) * 800  # 200 KiB, several download chunks
+
+
+class DroppedStream(httpx.AsyncByteStream):
+    # Sends part of the body, then the connection drops
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data
+        raise httpx.ReadError("connection dropped")
+
+
+class PdfServer:
+    """
+    Serves one document with an ETag, honouring conditional GETs and
+    Range requests guarded by If-Range.
+    """
+
+    def __init__(self, body=BODY, etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.drop_after = None
+        self.failures = []  # statuses to answer with before serving normally
+        self.range_shift = 0  # misreports where a 206 starts
+        self.requests = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.failures:
+            return httpx.Response(self.failures.pop(0))
+        headers = {"ETag": self.etag}
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304, headers=headers)
+        range_header = request.headers.get("Range")
+        if range_header and request.headers.get("If-Range") == self.etag:
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            if start >= len(self.body):
+                return httpx.Response(416, headers={**headers, "Content-Range": f"bytes */{len(self.body)}"})
+            start += self.range_shift
+            headers["Content-Range"] = f"bytes {start}-{len(self.body) - 1}/{len(self.body)}"
+            return httpx.Response(206, headers=headers, content=self.body[start:])
+        if self.drop_after is not None:
+            drop_after, self.drop_after = self.drop_after, None
+            headers["Content-Length"] = str(len(self.body))
+            return httpx.Response(200, headers=headers, stream=DroppedStream(self.body[:drop_after]))
+        return httpx.Response(200, headers=headers, content=self.body)
+
+
+@pytest.fixture
+def server():
+    return PdfServer()
+
+
+@pytest.fixture
+def manager(tmp_path, server):
+    crawler = RegulatoryCrawler([], state=CrawlState(tmp_path / "state.json"), backoff=0,
+                                transport=httpx.MockTransport(server.handle))
+    return DownloadManager(crawler, download_dir=tmp_path / "downloads",
+                           manifest=DownloadManifest(tmp_path / "manifest.sqlite3"))
+
+
+def fetch(manager, url=URL):
+    async def run():
+        async with manager.crawler.client() as client:
+            return await manager.download(client, {"url": url, "source": "test", "title": "Guidelines"})
+    return asyncio.run(run())
+
+
+def seed_partial(manager, data: bytes, validator: str, url=URL):
+    part = manager._partial_path(url)
+    part.parent.mkdir(parents=True, exist_ok=True)
+    part.write_bytes(data)
+    part.with_suffix(".meta").write_text(json.dumps({"validator": validator}))
+    return part
+
+
+def assert_downloaded(manager, record, body=BODY):
+    assert record["status"] == "downloaded"
+    assert record["sha256"] == hashlib.sha256(body).hexdigest()
+    with open(record["path"], "rb") as f:
+        assert f.read() == body
+    assert list(manager.partial_dir.iterdir()) == []
+    assert manager.manifest.by_url(URL)["sha256"] == record["sha256"]
+
+
+def test_fresh_download(manager, server):
+    record = fetch(manager)
+    assert_downloaded(manager, record)
+    assert record["path"].endswith("guidelines.pdf")
+    assert "Range" not in server.requests[0].headers
+
+
+def test_dropped_connection_resumes_with_a_range_request(manager, server):
+    server.drop_after = 100 * 1024
+    record = fetch(manager)
+
+    assert_downloaded(manager, record)
+    first, retry = server.requests
+    assert "Range" not in first.headers
+    assert retry.headers["If-Range"] == '"v1"'
+    offset = int(retry.headers["Range"].removeprefix("bytes=").rstrip("-"))
+    assert 0 < offset <= 100 * 1024
+
+
+def test_partial_of_an_older_version_is_refetched_in_full(manager, server):
+    seed_partial(manager, b"stale bytes", '"v0"')
+    record = fetch(manager)
+
+    assert_downloaded(manager, record)
+    assert server.requests[0].headers["If-Range"] == '"v0"'
+
+
+def test_complete_partial_is_finalized_on_416(manager, server):
+    seed_partial(manager, BODY, '"v1"')
+    record = fetch(manager)
+
+    assert_downloaded(manager, record)
+    assert len(server.requests) == 1
+
+
+def test_416_for_a_different_size_restarts_from_zero(manager, server):
+    seed_partial(manager, BODY + b"leftover from a longer version", '"v1"')
+    record = fetch(manager)
+
+    assert_downloaded(manager, record)
+    first, restart = server.requests
+    assert first.headers["Range"] == f"bytes={len(BODY) + 30}-"
+    assert "Range" not in restart.headers
+
+
+def test_known_url_is_revalidated_with_a_conditional_get(manager, server):
+    first = fetch(manager)
+    second = fetch(manager)
+
+    assert second["status"] == "not_modified"
+    assert second["path"] == first["path"]
+    assert server.requests[1].headers["If-None-Match"] == '"v1"'
+
+
+def test_missing_file_is_downloaded_again(manager, server):
+    first = fetch(manager)
+    os.unlink(first["path"])
+
+    record = fetch(manager)
+    assert_downloaded(manager, record)
+    assert "If-None-Match" not in server.requests[1].headers
+
+
+def test_same_content_at_another_url_is_a_duplicate(manager, server):
+    first = fetch(manager)
+    record = fetch(manager, "https://mirror.example/copy.pdf")
+
+    assert record["status"] == "duplicate"
+    assert record["path"] == first["path"]
+    assert sorted(p.name for p in manager.download_dir.iterdir()) == [".partial", "guidelines.pdf"]
+
+
+def test_oversized_download_is_abandoned(manager, server):
+    manager.max_bytes = 1024
+    with pytest.raises(DownloadTooLarge):
+        fetch(manager)
+    assert list(manager.partial_dir.iterdir()) == []
+    assert manager.manifest.by_url(URL) is None
+
+
+def test_206_starting_elsewhere_restarts_from_zero(manager, server):
+    seed_partial(manager, BODY[:1000], '"v1"')
+    server.range_shift = 24
+    record = fetch(manager)
+
+    assert_downloaded(manager, record)
+    first, restart = server.requests
+    assert first.headers["Range"] == "bytes=1000-"
+    assert "Range" not in restart.headers
+
+
+def test_not_modified_discards_a_leftover_partial(manager, server):
+    fetch(manager)
+    # A .part without its .meta can't be resumed, so the URL is revalidated instead
+    manager._partial_path(URL).write_bytes(b"orphaned bytes")
+
+    record = fetch(manager)
+    assert record["status"] == "not_modified"
+    assert list(manager.partial_dir.iterdir()) == []
+
+
+def test_server_errors_are_retried(manager, server):
+    server.failures = [503, 502]
+    record = fetch(manager)
+
+    assert_downloaded(manager, record)
+    assert len(server.requests) == 3
+
+
+def test_client_errors_are_not_retried(manager, server):
+    server.failures = [404]
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch(manager)
+    assert len(server.requests) == 1
+
+
+def test_chunks_are_written_in_blocks(manager, server, monkeypatch):
+    writes = []
+    real_to_thread = asyncio.to_thread
+
+    async def to_thread(func, *args, **kwargs):
+        if getattr(func, "__name__", None) in ("write", "_write_and_close"):
+            writes.append(func)
+        return await real_to_thread(func, *args, **kwargs)
+
+    monkeypatch.setattr("core.downloads.DOWNLOAD_WRITE_BYTES", 128 * 1024)
+    monkeypatch.setattr(asyncio, "to_thread", to_thread)
+    record = fetch(manager)
+
+    assert_downloaded(manager, record)
+    # 200 KiB in 64 KiB chunks: one 128 KiB block, then the rest on close
+    assert len(writes) == 2
@@ -0,0 +1,53 @@
+import pytest
+
+from core.incremental import document_key
+
+
+@pytest.mark.parametrize("filename", [
+    "MNRE_Guidelines.pdf",
+    "MNRE_Guidelines_v2.pdf",
+    "MNRE Guidelines V3.pdf",
+    "MNRE Guidelines (1).pdf",
+    "MNRE-Guidelines-rev2.pdf",
+    "MNRE_Guidelines_revised.pdf",
+    "MNRE_Guidelines_Amended.pdf",
+    "MNRE_Guidelines_v2 (1).pdf",
+])
+def test_versions_of_a_document_share_a_key(filename):
+    assert document_key(filename) == "mnre_guidelines"
+
+
+@pytest.mark.parametrize("a, b", [
+    ("CERC_Order_12345.pdf", "CERC_Order_12346.pdf"),
+    ("Notification 2023.pdf", "Notification 2024.pdf"),
+    ("Circular_No_7.pdf", "Circular_No_8.pdf"),
+])
+def test_document_numbers_are_not_version_markers(a, b):
+    assert document_key(a) != document_key(b)
+    assert document_key(a) == document_key(a.replace(".pdf", "_v2.pdf"))
+
+
+def test_version_words_inside_the_name_are_kept():
+    assert document_key("Revised_Tariff_Policy.pdf") == "revised_tariff_policy"
+    assert document_key("Grid_v2_Code.pdf") == "grid_v2_code"
+
+
+def test_name_made_only_of_a_marker_is_kept():
+    assert document_key("v2.pdf") == "v2"
+
+
+def test_downloaded_documents_are_keyed_on_their_url():
+    url = "https://mnre.gov.in/docs/Solar_Guidelines_v2.pdf"
+    # The download manager may have renamed the file to avoid an overwrite
+    assert document_key("Solar_Guidelines_v2_1a2b3c4d.pdf", url) == "mnre_gov_in_solar_guidelines"
+    assert document_key("other.pdf", "https://mnre.gov.in/docs/Solar_Guidelines_v3.pdf") == "mnre_gov_in_solar_guidelines"
+
+
+def test_same_name_on_different_sites_gets_different_keys():
+    a = document_key("guidelines.pdf", "https://mnre.gov.in/guidelines.pdf")
+    b = document_key("guidelines.pdf", "https://cercind.gov.in/guidelines.pdf")
+    assert a != b
+
+
+def test_url_without_a_file_name_falls_back_to_the_filename():
+    assert document_key("Tariff_Order_v2.pdf", "https://cercind.gov.in/") == "cercind_gov_in_tariff_order"
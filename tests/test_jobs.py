@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+import pytest
+
+from core.jobs import JobCancelled, JobManager
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_waiting_on_a_cancelled_job_raises_job_cancelled():
+    async def run():
+        manager = JobManager(max_workers=1, max_pending=4)
+        try:
+            busy = manager.submit("busy", _sleep, 0.5)
+            waiting = asyncio.create_task(manager.run("queued", _sleep, 0))
+            await asyncio.sleep(0.05)
+            queued = next(j for j in manager.list() if j.kind == "queued")
+            assert manager.cancel(queued.id)
+            with pytest.raises(JobCancelled):
+                await waiting
+            # The caller's own task was not cancelled, only the job
+            assert not waiting.cancelled()
+            await manager.wait(busy.id)
+        finally:
+            manager.shutdown()
+
+    asyncio.run(run())
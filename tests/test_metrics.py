@@ -0,0 +1,49 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from core.metrics import Metrics, metrics, reset_worker_metrics, run_drained
+
+
+def _count_pages(n):
+    metrics.inc("pages", n)
+    return n
+
+
+def _fail_after_counting(n):
+    metrics.inc("pages", n)
+    raise ValueError("bad page")
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    metrics.drain()
+    yield
+    metrics.drain()
+
+
+def test_attach_moves_metrics_onto_the_exception_once():
+    registry = Metrics()
+    registry.inc("pages", 2)
+    exc = ValueError()
+    registry.attach(exc)
+    assert registry.snapshot()["counters"] == {}
+
+    parent = Metrics()
+    parent.merge_attached(exc)
+    parent.merge_attached(exc)
+    assert parent.total("pages") == 2
+
+
+def test_nested_pool_metrics_reach_the_parent():
+    metrics.inc("pages", 100)  # recorded before the fork; must not come back twice
+    with ProcessPoolExecutor(max_workers=1, initializer=reset_worker_metrics) as executor:
+        result, snap = executor.submit(run_drained, _count_pages, 3).result()
+        metrics.merge(snap)
+
+        with pytest.raises(ValueError) as info:
+            executor.submit(run_drained, _fail_after_counting, 4).result()
+        metrics.merge_attached(info.value)
+
+    assert result == 3
+    assert metrics.total("pages") == 107
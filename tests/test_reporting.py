@@ -0,0 +1,90 @@
+import importlib.util
+import re
+import shutil
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fpdf")
+pytest.importorskip("openpyxl")
+
+REPO_FONT = Path(__file__).resolve().parent.parent / "assets" / "fonts" / "DejaVuSans.ttf"
+
+
+def _find_font():
+    # The font isn't checked in; matplotlib bundles the same file
+    if REPO_FONT.exists():
+        return REPO_FONT
+    spec = importlib.util.find_spec("matplotlib")
+    if spec and spec.submodule_search_locations:
+        bundled = Path(spec.submodule_search_locations[0]) / "mpl-data" / "fonts" / "ttf" / "DejaVuSans.ttf"
+        if bundled.exists():
+            return bundled
+    return None
+
+
+@pytest.fixture
+def reporting(tmp_path, monkeypatch):
+    font = _find_font()
+    if font is None:
+        pytest.skip("DejaVuSans.ttf not available")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "assets" / "fonts").mkdir(parents=True)
+    shutil.copy(font, tmp_path / "assets" / "fonts" / "DejaVuSans.ttf")
+    import agents.reporting_agent as reporting
+    for directory in (reporting.EXCEL_DIR, reporting.PDF_DIR, reporting.REPORT_CACHE_DIR, reporting.PORTFOLIO_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+    reporting._pdf_template.cache_clear()
+    yield reporting
+    reporting._pdf_template.cache_clear()
+
+
+def report(score, flags):
+    return {"obligations": ["Submit quarterly returns"], "penalties": [], "entities": ["MNRE"],
+            "dates": [], "compliance_score": score, "risk_flags": flags}
+
+
+def pages(path) -> int:
+    return len(re.findall(rb"/Type /Page\b(?!s)", Path(path).read_bytes()))
+
+
+def without_dates(path) -> bytes:
+    return re.sub(rb"\(D:\d+\)", b"", Path(path).read_bytes())
+
+
+def test_pdfs_rendered_from_the_cached_template_are_independent(reporting, tmp_path):
+    reporting._render_pdf(report(40, ["Missing clause"] * 80), str(tmp_path / "long.pdf"))
+    reporting._render_pdf(report(90, []), str(tmp_path / "short.pdf"))
+    reporting._render_pdf(report(40, ["Missing clause"] * 80), str(tmp_path / "long_again.pdf"))
+
+    assert pages(tmp_path / "long.pdf") > 1
+    # Nothing from the long report leaks into the next one through the template
+    assert pages(tmp_path / "short.pdf") == 1
+    assert without_dates(tmp_path / "long.pdf") == without_dates(tmp_path / "long_again.pdf")
+    template = reporting._pdf_template()
+    assert template.page == 0 and not template.pages
+
+
+def test_generate_reports_renders_both_formats(reporting):
+    excel, pdf = reporting.ReportingAgent().generate_reports(report(75, ["Missing clause"]), "pair")
+
+    assert excel.endswith("pair.xlsx") and Path(excel).stat().st_size > 0
+    assert Path(pdf).read_bytes().startswith(b"%PDF")
+    # Unchanged input comes from the report cache
+    assert reporting.ReportingAgent().generate_reports(report(75, ["Missing clause"]), "pair") == (excel, pdf)
+
+
+def test_portfolio_uses_a_fixed_number_of_sheets(reporting):
+    from openpyxl import load_workbook
+
+    pairs = ({"external": f"reg_{i}.json", "internal": "policy.json", "compliance_score": 50,
+              "risk_flags": [f"flag {i}a", f"flag {i}b"]} for i in range(300))
+    result = reporting.ReportingAgent().generate_portfolio(pairs, "portfolio")
+
+    assert result["comparisons"] == 300
+    workbook = load_workbook(result["excel"], read_only=True)
+    assert workbook.sheetnames == ["Summary", "Details"]
+    details = list(workbook["Details"].iter_rows(min_row=2, values_only=True))
+    assert len(details) == 600
+    assert details[-1] == (300, "reg_299.json", "policy.json", "flag 299b")
+    workbook.close()
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from core.similarity import SimilarityIndex, similarity_ratio
+
+SUBJECTS = ["The licensee", "Every distribution company", "The generating company", "Each operator",
+            "The developer", "A transmission licensee"]
+VERBS = ["shall submit", "shall maintain", "must file", "shall publish", "shall report", "must retain"]
+OBJECTS = ["quarterly compliance returns", "records of all meter readings", "the annual renewable purchase statement",
+           "grid connectivity documents", "audited accounts", "a safety inspection report", "tariff petitions",
+           "net metering applications", "curtailment data", "solar park land records"]
+TAILS = ["to the Commission", "within thirty days", "before the end of each financial year", "on its website",
+         "to the nodal agency", "in the prescribed format", ""]
+
+
+def corpus(seed: int):
+    # Shared boilerplate makes many n-grams common, which is what max_df drops
+    rng = random.Random(seed)
+
+    def sentence():
+        parts = [rng.choice(SUBJECTS), rng.choice(VERBS), rng.choice(OBJECTS), rng.choice(TAILS)]
+        return " ".join(p for p in parts if p) + "."
+
+    def reworded(text):
+        words = text.split()
+        for _ in range(rng.randint(0, 4)):
+            i = rng.randrange(len(words))
+            words[i] = rng.choice(["the", "such", "all", words[i][::-1], words[i].upper()])
+        return " ".join(words)
+
+    items = sorted({sentence() for _ in range(80)})
+    queries = [reworded(rng.choice(items)) for _ in range(25)] + [sentence() for _ in range(25)]
+    return items, queries
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_index_agrees_with_the_all_pairs_check(seed):
+    items, queries = corpus(seed)
+    index = SimilarityIndex(items)
+    assert len(items) > index.top_k
+
+    for query in queries:
+        ratios = [similarity_ratio(query, item) for item in items]
+        best = max(ratios)
+        for threshold in (0.75, 0.85):
+            assert index.has_match(query, threshold) == (best > threshold), query
+            idx, ratio = index.best_above(query, threshold)
+            if best > threshold:
+                assert ratio == best and ratios[idx] == best, query
+            else:
+                assert idx is None
+
+
+def test_small_index_scores_every_item():
+    items = ["alpha", "beta", "gamma"]
+    assert SimilarityIndex(items, top_k=10).candidates("zzz") == [0, 1, 2]
@@ -0,0 +1,57 @@
+import os
+import threading
+import time
+
+import pytest
+
+import core.jobs
+import core.tasks
+from core.broker import JobBroker
+from core.worker import BrokerWorker
+
+
+def crash():
+    # What an OOM kill looks like from the pool's side
+    os._exit(1)
+
+
+def echo(value):
+    return value
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.jobs, "NLP_PRELOAD", "lazy")
+    monkeypatch.setattr(core.tasks, "BROKER_TASKS", {"crash": crash, "echo": echo})
+    monkeypatch.setattr(BrokerWorker, "_retention_loop", lambda self: None)
+    broker = JobBroker(tmp_path / "broker.sqlite3", retry_backoff=0)
+    return BrokerWorker(concurrency=1, lease_seconds=30, poll_seconds=0.05, job_broker=broker)
+
+
+def run_until(worker, finished, timeout=60):
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    try:
+        deadline = time.monotonic() + timeout
+        while not finished() and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        worker.stop()
+        thread.join(timeout)
+    assert not thread.is_alive()
+
+
+def test_dead_pool_process_fails_the_job_and_the_pool_is_replaced(worker):
+    broker = worker.broker
+    crashed = broker.enqueue("crash", "crash", [], max_attempts=2)
+    after = broker.enqueue("echo", "echo", ["still running"])
+
+    done = lambda job_id: broker.get(job_id)["status"] in ("completed", "failed")
+    run_until(worker, lambda: done(crashed) and done(after))
+
+    job = broker.get(crashed)
+    assert (job["status"], job["error_type"], job["attempts"]) == ("failed", "BrokenProcessPool", 2)
+    assert job["lease_owner"] is None
+    # Work leased after the crash runs on the replacement pool
+    assert broker.get(after)["status"] == "completed"
+    assert broker.get(after)["result"] == "still running"